@@ -0,0 +1,303 @@
+"""Benchmarks for the indexer's operations across backends and store sizes.
+
+Each measured operation prints one JSON line, so runs on different commits
+can be compared with any JSON tool:
+
+    python -m benchmarks.run --backends dict sqlite --sizes 1000 10000
+    python -m benchmarks.run --sizes 1000000 --fields 8 --cardinality 1000 \\
+        --output bench_output.txt
+"""
+
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from json import dumps
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List
+import dbm.dumb
+import os
+import platform
+import subprocess
+import sys
+
+from src.dbm_index import Indexer
+from src.dbm_index.backends import DbmStore, SqliteStore
+from src.dbm_index.metrics import Metrics
+from src.dbm_index.schemas import Filter
+
+try:
+    import dbm.gnu as gnu
+except ImportError:
+    gnu = None
+
+
+LOAD_CHUNK_SIZE = 1000
+
+
+@contextmanager
+def dict_store(directory):
+    yield {}
+
+
+@contextmanager
+def dumb_store(directory):
+    store = DbmStore(dbm.dumb.open(os.path.join(directory, "store"), "n"))
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+@contextmanager
+def gnu_store(directory):
+    store = DbmStore(gnu.open(os.path.join(directory, "store"), "nf"))
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+@contextmanager
+def sqlite_store(directory):
+    store = SqliteStore(os.path.join(directory, "store.sqlite3"))
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+BACKENDS: Dict[str, Callable] = {
+    "dict": dict_store,
+    "dumb": dumb_store,
+    "sqlite": sqlite_store,
+}
+if gnu is not None:
+    BACKENDS["gnu"] = gnu_store
+
+
+def make_resource(random: Random, fields: int, cardinality: int):
+    return {f"f{field}": random.randrange(cardinality) for field in range(fields)}
+
+
+def summarize(latencies: List[float]):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    return {
+        "operations": len(latencies),
+        "seconds": total,
+        "ops_per_second": len(latencies) / total if total else None,
+        "mean_us": total / len(latencies) * 1e6,
+        "p50_us": percentile(0.5) * 1e6,
+        "p95_us": percentile(0.95) * 1e6,
+        "p99_us": percentile(0.99) * 1e6,
+    }
+
+
+def measure(calls) -> List[float]:
+    latencies = []
+
+    for call in calls:
+        start = perf_counter()
+        call()
+        latencies.append(perf_counter() - start)
+
+    return latencies
+
+
+def run_benchmark(
+    backend: str,
+    size: int,
+    fields=4,
+    cardinality=100,
+    operations=200,
+    seed=0,
+    options: Dict = {},
+    metrics=False,
+) -> Iterator[dict]:
+    """Loads size resources into a fresh store, then times each operation.
+
+    With metrics, each result also has the backend calls, bytes, hashes and
+    JSON decodes per call of the operation.
+    """
+    random = Random(seed)
+
+    with TemporaryDirectory() as directory, BACKENDS[backend](directory) as store:
+        indexer = Indexer(store, metrics=Metrics() if metrics else None, **options)
+
+        load_latencies = []
+        for start in range(0, size, LOAD_CHUNK_SIZE):
+            resources = [
+                make_resource(random, fields, cardinality)
+                for _ in range(min(LOAD_CHUNK_SIZE, size - start))
+            ]
+            load_latencies.extend(measure([lambda: indexer.create_many(resources)]))
+
+        def sample_ids():
+            return [str(random.randrange(size)) for _ in range(operations)]
+
+        def value():
+            return random.randrange(cardinality)
+
+        run = {
+            "backend": backend,
+            "size": size,
+            "fields": fields,
+            "cardinality": cardinality,
+            "options": options,
+        }
+
+        # EACH LOADING CALL CREATES LOAD_CHUNK_SIZE RESOURCES
+        yield {
+            **run,
+            "operation": "create_many",
+            "batch_size": LOAD_CHUNK_SIZE,
+            **summarize(load_latencies),
+            **per_call_stats(indexer),
+        }
+
+        benchmarks = {
+            "create": [
+                lambda resource=make_resource(
+                    random, fields, cardinality
+                ): indexer.create(resource)
+                for _ in range(operations)
+            ],
+            "retrieve_one": [
+                lambda resource_id=resource_id: indexer.retrieve_one(resource_id)
+                for resource_id in sample_ids()
+            ],
+            "retrieve_eq": [
+                lambda v=value(): indexer.retrieve([Filter("f0", v)])
+                for _ in range(operations)
+            ],
+            "retrieve_range_sorted": [
+                lambda v=value(): indexer.retrieve(
+                    [Filter("f0", v, "ge")], sort_key=f"f{fields - 1}"
+                )
+                for _ in range(operations)
+            ],
+            "retrieve_scan": [
+                lambda v=value(): indexer.retrieve([Filter("f0", v, "ne")])
+                for _ in range(operations)
+            ],
+            "count_eq": [
+                lambda v=value(): indexer.count([Filter("f0", v)])
+                for _ in range(operations)
+            ],
+            "update": [
+                lambda resource_id=resource_id, v=value(): indexer.update(
+                    resource_id, {"f0": v}
+                )
+                for resource_id in sample_ids()
+            ],
+            "delete": [
+                lambda resource_id=str(resource_id): indexer.delete(resource_id)
+                for resource_id in random.sample(range(size), min(size, operations))
+            ],
+        }
+
+        for operation, calls in benchmarks.items():
+            if indexer.metrics is not None:
+                indexer.metrics.reset()
+
+            yield {
+                **run,
+                "operation": operation,
+                **summarize(measure(calls)),
+                **per_call_stats(indexer),
+            }
+
+
+def per_call_stats(indexer):
+    if indexer.metrics is None:
+        return {}
+
+    stats = indexer.metrics.snapshot()
+    calls = sum(operation_stats.calls for operation_stats in stats.values())
+
+    return {
+        f"{stat}_per_call": sum(
+            getattr(operation_stats, stat) for operation_stats in stats.values()
+        )
+        / calls
+        for stat in [
+            "gets",
+            "sets",
+            "deletes",
+            "bytes_read",
+            "bytes_written",
+            "hashes",
+            "json_decodes",
+        ]
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {"commit": commit or None, "python": platform.python_version()}
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends", nargs="+", default=["dict"], choices=sorted(BACKENDS)
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--fields", type=int, default=4)
+    parser.add_argument("--cardinality", type=int, default=100)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--posting-format", choices=["chain", "packed"])
+    parser.add_argument("--storage", choices=["keys", "blob"])
+    parser.add_argument("--cache-size", type=int)
+    parser.add_argument(
+        "--metrics", action="store_true", help="count backend calls per operation"
+    )
+    parser.add_argument("--output", help="append results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    options = {
+        option: value
+        for option, value in [
+            ("posting_format", args.posting_format),
+            ("storage", args.storage),
+            ("cache_size", args.cache_size),
+        ]
+        if value is not None
+    }
+    run_environment = environment()
+    output = open(args.output, "a") if args.output else sys.stdout
+
+    try:
+        for backend in args.backends:
+            for size in args.sizes:
+                for result in run_benchmark(
+                    backend,
+                    size,
+                    args.fields,
+                    args.cardinality,
+                    args.operations,
+                    args.seed,
+                    options,
+                    args.metrics,
+                ):
+                    output.write(dumps({**run_environment, **result}) + "\n")
+                    output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
 from .indexer import Indexer
+from .aio import AsyncIndexer
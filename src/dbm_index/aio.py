@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+from itertools import islice
+from json import loads
+from typing import Iterable, List, Literal, Optional, Tuple, Union
+
+from .helpers import decode_cursor, encode_cursor, parse_comparable_json
+from .indexer import Indexer
+from .query import CompiledFilter
+from .schemas import Filter, Page, Plan
+from .types import JsonDict
+
+
+class AsyncDictStore:
+    """An in-process async backend over a dict, optionally with latency."""
+
+    def __init__(self, db: Optional[dict] = None, latency: float = 0):
+        self.db = {} if db is None else db
+        self.latency = latency
+
+    async def get(self, key, default=None):
+        await asyncio.sleep(self.latency)
+        return self.db.get(key, default)
+
+    async def set(self, key, value):
+        await asyncio.sleep(self.latency)
+        self.db[key] = value
+
+    async def delete(self, key):
+        await asyncio.sleep(self.latency)
+        del self.db[key]
+
+
+class SyncBridge:
+    """Blocking mapping over an async backend, for use off the event loop."""
+
+    def __init__(self, db, loop: asyncio.AbstractEventLoop):
+        self.db = db
+        self.loop = loop
+
+    def _wait(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def get(self, key, default=None):
+        value = self._wait(self.db.get(key))
+        return default if value is None else value
+
+    def get_many(self, keys):
+        return self._wait(self._gather(self.db.get(key) for key in keys))
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._wait(self.db.set(key, value))
+
+    def set_many(self, items):
+        self._wait(self._gather(self.db.set(key, value) for key, value in items))
+
+    def __delitem__(self, key):
+        self._wait(self.db.delete(key))
+
+    def delete_many(self, keys):
+        present_keys = [
+            key for key, value in zip(keys, self.get_many(keys)) if value is not None
+        ]
+        self._wait(self._gather(self.db.delete(key) for key in present_keys))
+
+    async def _gather(self, coroutines):
+        return list(await asyncio.gather(*coroutines))
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class AsyncIndexer:
+    """Indexer over an async backend with get, set and delete coroutines.
+
+    Writes, query planning and index walks run the synchronous Indexer in a
+    worker thread. Filter checks and resource reads are issued concurrently.
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        self.options = options
+        self._indexer: Optional[Indexer] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def create(self, resource: JsonDict) -> str:
+        return await self._run(Indexer.create, resource)
+
+    async def create_many(self, resources: Iterable[JsonDict]) -> List[str]:
+        return await self._run(Indexer.create_many, list(resources))
+
+    async def update(self, resource_id: str, update: JsonDict):
+        return await self._run(Indexer.update, resource_id, update)
+
+    async def patch_many(self, patches: Iterable[Tuple[str, JsonDict]]):
+        return await self._run(Indexer.patch_many, list(patches))
+
+    async def delete(self, resource_id: str):
+        return await self._run(Indexer.delete, resource_id)
+
+    async def migrate(self):
+        return await self._run(Indexer.migrate)
+
+    async def count(self, filters: List[Union[Filter, dict]] = []) -> int:
+        return await self._run(Indexer.count, filters)
+
+    async def explain(
+        self, filters: List[Union[Filter, dict]] = [], sort_key: Optional[str] = None
+    ) -> Plan:
+        return await self._run(Indexer.explain, filters, sort_key)
+
+    async def retrieve(
+        self,
+        filters: List[Union[Filter, dict]] = [],
+        keys: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 10,
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+        cursor: Optional[str] = None,
+    ) -> Page:
+        resources = Page()
+        if limit <= 0:
+            return resources
+
+        async with self._get_lock():
+            matches = await self._iter_matches(
+                filters, sort_key, sort_direction, cursor
+            )
+            page: List[Tuple[str, JsonDict, list]] = []
+
+            # EACH ROUND CHECKS AS MANY CANDIDATES AS ARE STILL NEEDED
+            while len(page) < limit:
+                chunk = await matches(offset + limit - len(page))
+                if chunk is None:
+                    break
+
+                for match in chunk:
+                    if offset > 0:
+                        offset -= 1
+                    elif len(page) < limit:
+                        page.append(match)
+
+            resources.extend(
+                await asyncio.gather(
+                    *(
+                        self._retrieve_resource(resource_id, keys, retrieved_values)
+                        for resource_id, retrieved_values, _ in page
+                    )
+                )
+            )
+
+        if len(resources) >= limit:
+            resources.cursor = encode_cursor(page[-1][2])
+
+        return resources
+
+    async def iter_retrieve(
+        self,
+        filters: List[Union[Filter, dict]] = [],
+        keys: Optional[List[str]] = None,
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+        cursor: Optional[str] = None,
+        chunk_size: int = 64,
+    ):
+        async with self._get_lock():
+            matches = await self._iter_matches(
+                filters, sort_key, sort_direction, cursor
+            )
+
+        while True:
+            async with self._get_lock():
+                chunk = await matches(chunk_size)
+                if chunk is None:
+                    return
+
+                resources = await asyncio.gather(
+                    *(
+                        self._retrieve_resource(resource_id, keys, retrieved_values)
+                        for resource_id, retrieved_values, _ in chunk
+                    )
+                )
+
+            for resource in resources:
+                yield resource
+
+    async def retrieve_one(self, resource_id: str, keys: Optional[List[str]] = None):
+        async with self._get_lock():
+            await self._load_indexer()
+            return await self._retrieve_resource(resource_id, keys)
+
+    def _get_lock(self):
+        # OPERATIONS RUN ONE AT A TIME, AS ON THE INDEXER. THE LOCK IS MADE
+        # INSIDE THE EVENT LOOP IT GUARDS
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _run(self, method, *args):
+        async with self._get_lock():
+            indexer = await self._load_indexer()
+            return await self._run_in_thread(partial(method, indexer, *args))
+
+    async def _run_in_thread(self, func):
+        return await asyncio.get_running_loop().run_in_executor(None, func)
+
+    async def _load_indexer(self) -> Indexer:
+        # THE STORE FORMAT IS READ WHEN THE FIRST OPERATION RUNS
+        if self._indexer is None:
+            bridge = SyncBridge(self.db, asyncio.get_running_loop())
+            self._indexer = await self._run_in_thread(
+                partial(Indexer, bridge, **self.options)
+            )
+        return self._indexer
+
+    async def _iter_matches(self, filters, sort_key, sort_direction, cursor):
+        # RETURNS A COROUTINE FUNCTION TAKING THE NEXT count CANDIDATES, WHICH
+        # THE INDEXER WALKS IN A THREAD, AND CHECKING THEM CONCURRENTLY. IT
+        # RETURNS THE MATCHES AMONG THEM, OR None ONCE THEY RUN OUT
+        indexer = await self._load_indexer()
+        filter_dataclasses = [
+            Filter(**f) if isinstance(f, dict) else f for f in filters
+        ]
+        position = decode_cursor(cursor) if cursor else None
+
+        plan = await self._run_in_thread(
+            partial(indexer._plan, filter_dataclasses, sort_key)
+        )
+        candidates = indexer._iter_candidates(plan, sort_key, sort_direction, position)
+        check_filters = indexer._compile_filters(plan.check_filters)
+
+        async def matches(count):
+            chunk = await self._run_in_thread(lambda: list(islice(candidates, count)))
+            if not chunk:
+                return None
+
+            checked = await asyncio.gather(
+                *(
+                    self._check_filters(resource_id, check_filters)
+                    for resource_id, _ in chunk
+                )
+            )
+
+            return [
+                (resource_id, retrieved_values, resource_position)
+                for (resource_id, resource_position), retrieved_values in zip(
+                    chunk, checked
+                )
+                if retrieved_values is not None
+            ]
+
+        return matches
+
+    async def _check_filters(self, resource_id, filters: List[CompiledFilter] = []):
+        indexer = await self._load_indexer()
+
+        if indexer.storage == "blob":
+            document = await self._retrieve_document(resource_id)
+            for f in filters:
+                value = document.get(f.filter.key)
+                if not f.compare(parse_comparable_json(value), f.comparable):
+                    return
+            return document
+
+        values = await asyncio.gather(
+            *(self._retrieve_value(resource_id, f.filter.key) for f in filters)
+        )
+        retrieved_values = {}
+
+        for f, value in zip(filters, values):
+            if not f.compare(parse_comparable_json(value), f.comparable):
+                return
+            retrieved_values[f.filter.key] = value
+        return retrieved_values
+
+    async def _retrieve_resource(
+        self,
+        resource_id: str,
+        keys: Optional[List[str]] = None,
+        retrieved_values: JsonDict = {},
+    ):
+        resource: JsonDict = {"id": resource_id}
+        indexer = await self._load_indexer()
+        key_delim = indexer.key_delim
+
+        if indexer.storage == "blob":
+            document = retrieved_values or await self._retrieve_document(resource_id)
+            if keys:
+                resource.update({key: document.get(key) for key in keys})
+            else:
+                resource.update(document)
+            return resource
+
+        if not keys:
+            # KEY IDS RUN FROM THE HEAD DOWN TO 0, EACH LINKED TO THE ONE BELOW
+            head_encoded = await self.db.get(key_delim.join([resource_id, "head"]))
+            if not head_encoded:
+                return resource
+
+            keys_encoded = await asyncio.gather(
+                *(
+                    self.db.get(key_delim.join([resource_id, str(key_id), "value"]))
+                    for key_id in range(int(head_encoded.decode()), -1, -1)
+                )
+            )
+            keys = [key_encoded.decode() for key_encoded in keys_encoded if key_encoded]
+
+        missing_keys = [key for key in keys if key not in retrieved_values]
+        values = dict(
+            zip(
+                missing_keys,
+                await asyncio.gather(
+                    *(self._retrieve_value(resource_id, key) for key in missing_keys)
+                ),
+            )
+        )
+
+        for key in keys:
+            resource[key] = retrieved_values.get(key, values.get(key))
+
+        return resource
+
+    async def _retrieve_value(self, resource_id, key):
+        indexer = await self._load_indexer()
+        value = await self.db.get(
+            indexer.key_delim.join([resource_id, indexer._hash(key)])
+        )
+
+        if value is not None:
+            return loads(value.decode())
+
+    async def _retrieve_document(self, resource_id):
+        indexer = await self._load_indexer()
+        blob = await self.db.get(indexer.key_delim.join([resource_id, "blob"]))
+        return loads(blob.decode()) if blob else {}
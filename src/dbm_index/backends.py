@@ -0,0 +1,237 @@
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+import sqlite3
+
+
+SQLITE_MAX_VARIABLES = 500
+
+
+def iter_many(db, keys: List[str]) -> Iterator[Optional[bytes]]:
+    # ONE get_many CALL WHEN THE BACKEND HAS IT, OTHERWISE A LAZY get PER KEY
+    if not keys:
+        return iter(())
+    if get_many := getattr(db, "get_many", None):
+        return iter(get_many(keys))
+    return (db.get(key) for key in keys)
+
+
+def get_many(db, keys: List[str]) -> List[Optional[bytes]]:
+    return list(iter_many(db, keys))
+
+
+def set_many(db, items: List[Tuple[str, bytes]]):
+    if backend_set_many := getattr(db, "set_many", None):
+        return backend_set_many(items)
+
+    for key, value in items:
+        db[key] = value
+
+
+def delete_many(db, keys: List[str]):
+    # MISSING KEYS ARE IGNORED
+    if backend_delete_many := getattr(db, "delete_many", None):
+        return backend_delete_many(keys)
+
+    for key in keys:
+        if key in db:
+            del db[key]
+
+
+def compare_and_set(db, key: str, expected: Optional[bytes], value: bytes) -> bool:
+    # SETS key ONLY IF IT STILL HOLDS expected, None MEANING ABSENT. ATOMIC
+    # ACROSS PROCESSES ONLY WHEN THE BACKEND HAS compare_and_set
+    if backend_compare_and_set := getattr(db, "compare_and_set", None):
+        return backend_compare_and_set(key, expected, value)
+
+    if db.get(key) != expected:
+        return False
+
+    db[key] = value
+    return True
+
+
+class SqliteStore(MutableMapping):
+    """A sqlite3 table as a mapping, with one statement per multi-key call."""
+
+    def __init__(self, connection, table="dbm_index"):
+        # A PATH IS OPENED FOR USE FROM ANY THREAD, AS PARALLEL SCANS DO
+        if isinstance(connection, str):
+            connection = sqlite3.connect(connection, check_same_thread=False)
+
+        self.connection = connection
+        self.table = table
+        self._depth = 0
+
+        self.connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}" '
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        row = self.connection.execute(
+            f'SELECT value FROM "{self.table}" WHERE key = ?', (key,)
+        ).fetchone()
+        return default if row is None else bytes(row[0])
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values = {}
+
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[start : start + SQLITE_MAX_VARIABLES]
+            values.update(
+                self.connection.execute(
+                    f'SELECT key, value FROM "{self.table}" WHERE key IN '
+                    f"({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+
+        return [
+            None if (value := values.get(key)) is None else bytes(value) for key in keys
+        ]
+
+    def __setitem__(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        self.connection.executemany(
+            f'INSERT OR REPLACE INTO "{self.table}" (key, value) VALUES (?, ?)',
+            [(key, _encode(value)) for key, value in items],
+        )
+        self._commit()
+
+    def compare_and_set(self, key: str, expected: Optional[bytes], value: bytes):
+        if expected is None:
+            cursor = self.connection.execute(
+                f'INSERT OR IGNORE INTO "{self.table}" (key, value) VALUES (?, ?)',
+                (key, _encode(value)),
+            )
+        else:
+            cursor = self.connection.execute(
+                f'UPDATE "{self.table}" SET value = ? WHERE key = ? AND value = ?',
+                (_encode(value), key, _encode(expected)),
+            )
+
+        self._commit()
+        return cursor.rowcount == 1
+
+    def __delitem__(self, key):
+        if (
+            self.connection.execute(
+                f'DELETE FROM "{self.table}" WHERE key = ?', (key,)
+            ).rowcount
+            == 0
+        ):
+            raise KeyError(key)
+        self._commit()
+
+    def delete_many(self, keys: Iterable[str]):
+        self.connection.executemany(
+            f'DELETE FROM "{self.table}" WHERE key = ?', [(key,) for key in keys]
+        )
+        self._commit()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        for (key,) in self.connection.execute(f'SELECT key FROM "{self.table}"'):
+            yield key
+
+    def __len__(self):
+        return self.connection.execute(
+            f'SELECT COUNT(*) FROM "{self.table}"'
+        ).fetchone()[0]
+
+    @contextmanager
+    def transaction(self):
+        # WRITES INSIDE ARE COMMITTED ONCE, OR ROLLED BACK IF IT RAISES. THE
+        # WRITE LOCK IS TAKEN UP FRONT, SO OTHER CONNECTIONS WAIT FOR IT
+        if not self._depth and not self.connection.in_transaction:
+            self.connection.execute("BEGIN IMMEDIATE")
+        self._depth += 1
+
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if not self._depth:
+                self.connection.rollback()
+            raise
+
+        self._depth -= 1
+        self._commit()
+
+    def _commit(self):
+        if not self._depth:
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class DbmStore(MutableMapping):
+    """A dbm.gnu or dbm.dumb database as a mapping of str keys to bytes.
+
+    Open dbm.gnu in fast mode ("cf"), so that a batch is synced to disk once
+    when it is flushed rather than on every write.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, key):
+        return self.db[key]
+
+    def get(self, key, default=None):
+        try:
+            return self.db[key]
+        except KeyError:
+            return default
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def __setitem__(self, key, value):
+        self.db[key] = value
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        for key, value in items:
+            self.db[key] = value
+
+    def __delitem__(self, key):
+        del self.db[key]
+
+    def delete_many(self, keys: Iterable[str]):
+        for key in keys:
+            if key in self.db:
+                del self.db[key]
+
+    def __contains__(self, key):
+        return key in self.db
+
+    def __iter__(self):
+        for key in self.db.keys():
+            yield key.decode() if isinstance(key, bytes) else key
+
+    def __len__(self):
+        return len(self.db)
+
+    def sync(self):
+        if sync := getattr(self.db, "sync", None):
+            sync()
+
+    def close(self):
+        self.db.close()
+
+
+def _encode(value):
+    return value.encode() if isinstance(value, str) else value
@@ -0,0 +1,91 @@
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+
+from .backends import delete_many, get_many, set_many
+
+
+DELETED = object()
+
+
+class WriteBatch(MutableMapping):
+    """Buffers writes to a mapping, reading its own writes, until flushed."""
+
+    def __init__(self, db):
+        self.db = db
+        self.writes: dict = {}
+
+    def __getitem__(self, key):
+        value = self.writes.get(key)
+
+        if value is None:
+            return self.db[key]
+        if value is DELETED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.writes.get(key)
+
+        if value is None:
+            return self.db.get(key, default)
+        if value is DELETED:
+            return default
+        return value
+
+    def get_many(self, keys):
+        values = [self.writes.get(key) for key in keys]
+        unwritten_keys = [key for key, value in zip(keys, values) if value is None]
+        unwritten_values = iter(get_many(self.db, unwritten_keys))
+
+        return [
+            next(unwritten_values)
+            if value is None
+            else (None if value is DELETED else value)
+            for value in values
+        ]
+
+    def __setitem__(self, key, value):
+        self.writes[key] = value
+
+    def __delitem__(self, key):
+        if self.get(key) is None:
+            raise KeyError(key)
+        self.writes[key] = DELETED
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        for key in self.db:
+            if key not in self.writes:
+                yield key
+
+        for key, value in self.writes.items():
+            if value is not DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def flush(self):
+        # ONE WRITE PER KEY, INSIDE THE BACKEND'S TRANSACTION WHEN IT HAS ONE
+        transaction = getattr(self.db, "transaction", None)
+
+        with transaction() if transaction else nullcontext():
+            set_many(
+                self.db,
+                [
+                    (key, value)
+                    for key, value in self.writes.items()
+                    if value is not DELETED
+                ],
+            )
+            delete_many(
+                self.db,
+                [key for key, value in self.writes.items() if value is DELETED],
+            )
+
+        self.writes.clear()
+
+        if sync := getattr(self.db, "sync", None):
+            sync()
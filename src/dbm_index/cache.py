@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from threading import Lock
+from typing import NamedTuple
+
+from .backends import compare_and_set, delete_many, get_many, set_many
+
+
+MISSING = object()
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class CachedStore(MutableMapping):
+    """Keeps recently read keys of a mapping, including misses, in memory.
+
+    Safe to share between threads. A value read from the backend is only
+    cached if no write invalidated any key while it was being read.
+    """
+
+    def __init__(self, db, max_size=4096):
+        self.db = db
+        self.max_size = max_size
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.generation = 0
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.get_many([key])[0]
+        return default if value is None else value
+
+    def get_many(self, keys):
+        with self.lock:
+            values = [self._lookup(key) for key in keys]
+            generation = self.generation
+
+        missing_keys = [key for key, value in zip(keys, values) if value is MISSING]
+        if not missing_keys:
+            return values
+
+        missing_values = iter(get_many(self.db, missing_keys))
+
+        with self.lock:
+            for index, value in enumerate(values):
+                if value is MISSING:
+                    values[index] = next(missing_values)
+
+                    if generation == self.generation:
+                        self.cache[keys[index]] = values[index]
+
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+        return values
+
+    def _lookup(self, key):
+        value = self.cache.get(key, MISSING)
+
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        # THE BACKEND MAY STORE A DIFFERENT TYPE THAN IT IS GIVEN, SO WRITES
+        # ONLY INVALIDATE
+        self.db[key] = value
+        self._invalidate([key])
+
+    def __delitem__(self, key):
+        try:
+            del self.db[key]
+        finally:
+            self._invalidate([key])
+
+    def set_many(self, items):
+        items = list(items)
+        set_many(self.db, items)
+        self._invalidate([key for key, _ in items])
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        delete_many(self.db, keys)
+        self._invalidate(keys)
+
+    def compare_and_set(self, key, expected, value):
+        try:
+            return compare_and_set(self.db, key, expected, value)
+        finally:
+            self._invalidate([key])
+
+    def _invalidate(self, keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                self.cache.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.db)
+
+    def __len__(self):
+        return len(self.db)
+
+    def __getattr__(self, name):
+        # EXPOSES BACKEND HOOKS SUCH AS transaction AND sync
+        return getattr(self.db, name)
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, len(self.cache), self.max_size)
+
+    def cache_clear(self):
+        with self.lock:
+            self.generation += 1
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
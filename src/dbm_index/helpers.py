@@ -1,24 +1,195 @@
-from hashlib import sha256
-from json import dumps
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from decimal import Decimal
+from hashlib import blake2b, sha256
+from json import JSONDecodeError, dumps, loads
+from math import inf
+from sys import float_info
+from typing import List, Optional
 
 from .types import JsonType
 
+try:
+    from xxhash import xxh3_128_hexdigest  # type: ignore
+except ImportError:
+    xxh3_128_hexdigest = None
+
+
+MAX_FLOAT = int(float_info.max)
+
+# TYPE TAGS, IN THE ORDER VALUES OF DIFFERENT TYPES SORT IN
+NULL_TAG = b"\x01"
+FALSE_TAG = b"\x02"
+TRUE_TAG = b"\x03"
+NUMBER_TAG = b"\x04"
+STRING_TAG = b"\x05"
+LIST_TAG = b"\x06"
+DICT_TAG = b"\x07"
+
+TERMINATOR = b"\x00"
+EXPONENT_BIAS = 2**31
+
 
 def custom_hash(val: str):
     return sha256(val.encode()).hexdigest()
 
 
-def lexographic_id(s: str):
-    return int(f"{sum(map(ord, s))}{str(int(custom_hash(s), 16))}")
+def blake2b_hash(val: str):
+    return blake2b(val.encode(), digest_size=16).hexdigest()
 
 
-def parse_comparable_json(x: JsonType) -> JsonType:
+def xxh3_hash(val: str):
+    return xxh3_128_hexdigest(val.encode())
+
+
+HASH_FUNCTIONS = {
+    "sha256": custom_hash,
+    "blake2b": blake2b_hash,
+    "xxh3": xxh3_hash if xxh3_128_hexdigest else None,
+}
+
+
+def parse_comparable_json(x: JsonType) -> bytes:
+    # ORDER PRESERVING ENCODING, COMPARING TWO ENCODINGS BYTEWISE ORDERS THE
+    # VALUES BY TYPE TAG, THEN NUMERICALLY, BY CODE POINT OR ELEMENTWISE
     if x is None:
-        return 0
-    if isinstance(x, dict) or isinstance(x, list):
-        x = dumps(x)
-    if isinstance(x, str):
-        return lexographic_id(x)
+        return NULL_TAG
     if isinstance(x, bool):
-        return 1 if x else 0
-    return x
+        return TRUE_TAG if x else FALSE_TAG
+    if isinstance(x, int) or isinstance(x, float):
+        return NUMBER_TAG + comparable_number(x)
+    if isinstance(x, str):
+        return STRING_TAG + comparable_string(x)
+    if isinstance(x, list):
+        return LIST_TAG + b"".join(map(parse_comparable_json, x)) + TERMINATOR
+    if isinstance(x, dict):
+        return (
+            DICT_TAG
+            + b"".join(
+                comparable_string(key) + parse_comparable_json(value)
+                for key, value in x.items()
+            )
+            + TERMINATOR
+        )
+    raise TypeError(f"{type(x).__name__} is not a JSON type")
+
+
+def comparable_number(x):
+    # NAN SORTS ABOVE INFINITY AND, UNLIKE IN PYTHON, EQUALS ITSELF
+    if x != x:
+        return b"\x06"
+    if x == inf:
+        return b"\x05"
+    if x == -inf:
+        return b"\x01"
+    if x == 0:
+        return b"\x03"
+
+    # DECIMAL DIGITS AFTER A BIASED EXPONENT, EXACT FOR INTS AND FLOATS ALIKE
+    sign, digits, exponent = Decimal(x).as_tuple()
+    digits_encoded = "".join(map(str, digits)).rstrip("0")
+    magnitude = (
+        (len(digits) + int(exponent) - 1 + EXPONENT_BIAS).to_bytes(4, "big")
+        + digits_encoded.encode()
+        + TERMINATOR
+    )
+
+    if sign:
+        return b"\x02" + bytes(0xFF - byte for byte in magnitude)
+    return b"\x04" + magnitude
+
+
+def comparable_string(x: str):
+    return (
+        x.encode("utf-8", "surrogatepass").replace(TERMINATOR, TERMINATOR + b"\xff")
+        + TERMINATOR
+        + b"\x01"
+    )
+
+
+def equivalent_dumps(x: JsonType) -> Optional[List[str]]:
+    # EVERY JSON DUMP WHOSE COMPARABLE FORM EQUALS THAT OF x, OR None WHEN
+    # THEY CANNOT BE LISTED, AS FOR CONTAINERS HOLDING NUMBERS (1 == 1.0)
+    if isinstance(x, bool) or x is None or isinstance(x, str):
+        return [dumps(x)]
+
+    if isinstance(x, int) or isinstance(x, float):
+        if x == 0:
+            return ["0", "0.0", "-0.0"]
+
+        value_dumps = [dumps(x)]
+        if isinstance(x, float) and x.is_integer():
+            value_dumps.append(dumps(int(x)))
+        elif isinstance(x, int) and abs(x) <= MAX_FLOAT and float(x) == x:
+            value_dumps.append(dumps(float(x)))
+        return value_dumps
+
+    if contains_number(x):
+        return None
+
+    return [dumps(x)]
+
+
+def contains_number(x: JsonType) -> bool:
+    if isinstance(x, bool) or x is None or isinstance(x, str):
+        return False
+    if isinstance(x, list):
+        return any(map(contains_number, x))
+    if isinstance(x, dict):
+        return any(map(contains_number, x.values()))
+    return True
+
+
+def encode_varints(values: List[int]) -> bytes:
+    encoded = bytearray()
+    for value in values:
+        while value > 0x7F:
+            encoded.append((value & 0x7F) | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varints(encoded: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in encoded:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def pack_ids(ids: List[int]) -> bytes:
+    # SORTED IDS AS VARINT DELTAS
+    return encode_varints([b - a for a, b in zip([0, *ids], ids)])
+
+
+def unpack_ids(encoded: bytes) -> List[int]:
+    ids = decode_varints(encoded)
+    for index in range(1, len(ids)):
+        ids[index] += ids[index - 1]
+    return ids
+
+
+def encode_cursor(position: List[str]) -> str:
+    return urlsafe_b64encode(dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[str]:
+    try:
+        position = loads(urlsafe_b64decode(cursor.encode()))
+    except (BinasciiError, JSONDecodeError, UnicodeDecodeError):
+        raise ValueError(f"invalid cursor {cursor}")
+
+    if (
+        not isinstance(position, list)
+        or not position
+        or not all(isinstance(part, str) for part in position)
+    ):
+        raise ValueError(f"invalid cursor {cursor}")
+
+    return position
@@ -2,550 +2,2728 @@ from __future__ import annotations
 
 from rtdce.enforce import enforce  # type: ignore
 
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import copy_context
+from dataclasses import asdict
+from functools import lru_cache
+from heapq import merge
+from itertools import chain
 from json import dumps, loads
-from typing import Optional, List, Literal, Union
-from operator import lt, gt
-
+from threading import Lock, RLock
+from typing import Dict, Iterable, Optional, List, Literal, Sequence, Tuple, Union
 import operator
 
-from .helpers import custom_hash, parse_comparable_json
+from .backends import compare_and_set, get_many, iter_many
+from .batch import WriteBatch
+from .cache import CachedStore
+from .locks import SharedLock, StripedLock
+from .metrics import (
+    InstrumentedStore,
+    Metrics,
+    OperationStats,
+    count_hashes,
+    count_json_decodes,
+    measured,
+)
+from .helpers import (
+    HASH_FUNCTIONS,
+    LIST_TAG,
+    decode_cursor,
+    decode_varints,
+    encode_cursor,
+    encode_varints,
+    equivalent_dumps,
+    pack_ids,
+    parse_comparable_json,
+    unpack_ids,
+)
+from .query import CompiledFilter, PreparedQuery
 from .types import JsonDict, JsonType
-from .schemas import Filter
+from .schemas import Filter, IndexSchema, Page, Plan
+
+
+FORMAT_VERSION = 1
+DEFAULT_FORMAT = {
+    "posting_format": "chain",
+    "hash_function": "sha256",
+    "storage": "keys",
+    "segment_size": 1024,
+}
+
+MAX_SORT_INDEX_HEIGHT = 16
+# PLANS ARE CHOSEN WITHOUT THE LIMIT, SO THEY CAN BE PREPARED, AND COST A
+# PAGE OF retrieve'S DEFAULT SIZE
+PLANNED_PAGE_SIZE = 10
+NULL_COMPARABLE = parse_comparable_json(None)
+RANGE_OPERATORS = ["lt", "le", "gt", "ge"]
 
 
 class Indexer:
-    def __init__(self, db, key_delim="#"):
-        self.db = db
+    def __init__(
+        self,
+        db,
+        key_delim="#",
+        posting_format: Optional[Literal["chain", "packed"]] = None,
+        posting_block_size=256,
+        hash_function: Optional[Literal["sha256", "blake2b", "xxh3"]] = None,
+        hash_cache_size=4096,
+        cache_size: Optional[int] = None,
+        storage: Optional[Literal["keys", "blob"]] = None,
+        lock_stripes=64,
+        id_lease_size: Optional[int] = None,
+        segment_size: Optional[int] = None,
+        scan_workers=1,
+        metrics: Optional[Metrics] = None,
+        composite_indexes: Optional[List[Sequence[str]]] = None,
+        index_schema: Optional[Union[IndexSchema, dict]] = None,
+    ):
+        # WRITERS TAKE THE GATE SHARED, THEN THE STRIPES FOR THE RESOURCE, THE
+        # KEY/VALUE POSTINGS AND THE KEY'S SORT INDEX, THEN THE RESOURCE LIST,
+        # ALWAYS IN THAT ORDER. BATCHES TAKE THE GATE EXCLUSIVELY. READERS
+        # TAKE NO LOCKS
+        self._gate = SharedLock()
+        self._resource_locks = StripedLock(lock_stripes)
+        self._posting_locks = StripedLock(lock_stripes)
+        self._key_locks = StripedLock(lock_stripes)
+        self._list_lock = RLock()
+        self._id_lock = Lock()
+        self._next_resource_id = 0
+
+        # WITH A LEASE SIZE, IDS ARE LEASED IN BLOCKS FROM THE SHARED STORE,
+        # SO PROCESSES WRITING TO IT NEVER HAND OUT THE SAME ONE
+        self.id_lease_size = id_lease_size
+        self._lease_end = 0
+
+        # WITH METRICS, BACKEND CALLS ARE COUNTED BELOW THE CACHE, SO ONLY
+        # THOSE REACHING THE BACKEND ARE
+        self.metrics = metrics
+        if metrics is not None:
+            db = InstrumentedStore(db)
+
+        self._store = db
+        self._cache = CachedStore(db, cache_size) if cache_size else None
+        self.db = db if self._cache is None else self._cache
         self.key_delim = key_delim
+        self.posting_block_size = posting_block_size
 
-    def create(self, resource: JsonDict) -> str:
-        resource_id = self._resource_id()
+        store_format = self._load_format(
+            posting_format=posting_format,
+            hash_function=hash_function,
+            storage=storage,
+            segment_size=segment_size,
+        )
+        self.posting_format = store_format["posting_format"]
+        self.hash_function = store_format["hash_function"]
+        self.storage = store_format["storage"]
+        self.segment_size = store_format["segment_size"]
+
+        # STORES WRITTEN BEFORE COUNTERS AND SEGMENTS EXISTED GET THEM FROM
+        # migrate. THEIR SORT INDEXES ARE ALSO IN THE OLD VALUE ORDER, SO THEY
+        # ARE NOT READ UNTIL migrate REBUILDS THEM
+        self._counted = "count" in self.db or "head" not in self.db
+        head_encoded = self.db.get("head")
+        self._segmented = not head_encoded or self._segment_key(head_encoded) in self.db
+
+        # FILTERED SCANS OF THE RESOURCE LIST ARE SPLIT BY SEGMENT OVER A POOL
+        # OF THREADS, MADE WHEN FIRST NEEDED
+        self.scan_workers = scan_workers
+        self._scan_executor: Optional[ThreadPoolExecutor] = None
+
+        hash_callable = HASH_FUNCTIONS[self.hash_function]
+        self._loads = loads
+
+        if metrics is not None:
+            hash_callable = count_hashes(hash_callable)
+            self._loads = count_json_decodes(loads)
+
+        # KEYS AND VALUES REPEAT CONSTANTLY, SO THEIR HASHES, ORDER PRESERVING
+        # FORMS AND KEY PREFIXES ARE KEPT IN BOUNDED CACHES
+        self._hash = lru_cache(maxsize=hash_cache_size)(hash_callable)
+        self._comparable = lru_cache(maxsize=hash_cache_size)(
+            lambda encoded_value_dump: parse_comparable_json(
+                self._loads(encoded_value_dump)
+            )
+        )
+        self._prefix = lru_cache(maxsize=hash_cache_size)(
+            lambda *parts: key_delim.join([*parts, ""])
+        )
 
-        self.db[self.key_delim.join([resource_id, "head"])] = str(
-            len(resource) - 1
-        ).encode()
+        self._load_indexes(index_schema, composite_indexes)
 
-        resource_id_encoded = resource_id.encode()
-        self.db["head"] = resource_id_encoded
+    def cache_info(self):
+        return None if self._cache is None else self._cache.cache_info()
 
-        for index, (key, value) in enumerate(resource.items()):
-            value_dump = dumps(value)
-            encoded_value_dump = value_dump.encode()
+    def metrics_snapshot(self) -> Optional[Dict[str, OperationStats]]:
+        return None if self.metrics is None else self.metrics.snapshot()
 
-            key_hash = custom_hash(key)
-            value_hash = custom_hash(value_dump)
+    @contextmanager
+    def batch(self):
+        # WRITES ARE BUFFERED IN self.db UNTIL THE OUTERMOST BATCH EXITS, AND
+        # DROPPED IF IT RAISES. OTHER THREADS' WRITES WAIT FOR IT
+        with self._gate.exclusive():
+            if isinstance(self.db, WriteBatch):
+                yield self.db
+                return
 
-            self.db[self.key_delim.join([resource_id, key_hash])] = encoded_value_dump
+            db = self.db
+            self.db = batch = WriteBatch(db)
 
-            self._create_key_index(resource_id, index, key)
-            self._create_filter_index(
-                key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+            try:
+                yield batch
+            finally:
+                self.db = db
+
+            batch.flush()
+
+    def _load_format(self, **options):
+        # STORES USING ONLY THE DEFAULTS CARRY NO FORMAT KEY
+        format_encoded = self.db.get("format")
+        store_format = loads(format_encoded.decode()) if format_encoded else {}
+
+        if store_format.get("version", FORMAT_VERSION) > FORMAT_VERSION:
+            raise ValueError(
+                f"store format version {store_format['version']} is not supported"
             )
 
-        return resource_id
+        for option, value in options.items():
+            stored_value = store_format.get(option, DEFAULT_FORMAT[option])
+            if value is not None and value != stored_value:
+                if format_encoded or any(self._iter_resource_ids()):
+                    raise ValueError(
+                        f"store was written with {option}={stored_value}, not {value}"
+                    )
+                store_format[option] = value
+
+        store_format = {**DEFAULT_FORMAT, **store_format, "version": FORMAT_VERSION}
+
+        # OPTIONS ARE CHECKED BEFORE ANY ARE WRITTEN, SO A BAD ONE LEAVES THE
+        # STORE AS IT WAS
+        if store_format["posting_format"] not in ["chain", "packed"]:
+            raise ValueError(f"unknown posting format {store_format['posting_format']}")
+        if store_format["hash_function"] not in HASH_FUNCTIONS:
+            raise ValueError(f"unknown hash function {store_format['hash_function']}")
+        if HASH_FUNCTIONS[store_format["hash_function"]] is None:
+            raise ValueError(
+                f"hash function {store_format['hash_function']} is not installed"
+            )
+        if store_format["storage"] not in ["keys", "blob"]:
+            raise ValueError(f"unknown storage {store_format['storage']}")
+        if not isinstance(store_format["segment_size"], int) or (
+            store_format["segment_size"] < 1
+        ):
+            raise ValueError(f"invalid segment size {store_format['segment_size']}")
+
+        if store_format != {**DEFAULT_FORMAT, "version": FORMAT_VERSION}:
+            encoded_store_format = dumps(store_format).encode()
+            if encoded_store_format != format_encoded:
+                self.db["format"] = encoded_store_format
+
+        return store_format
+
+    def _load_indexes(self, index_schema, composite_indexes):
+        # DECLARED INDEXES ARE KEPT IN THE STORE, SO None KEEPS THOSE DECLARED
+        # BEFORE. CHANGES ARE APPLIED TO THE STORED RESOURCES IN ONE BATCH
+        indexes_encoded = self.db.get("indexes")
+        indexes = loads(indexes_encoded.decode()) if indexes_encoded else {}
+
+        stored_schema = (
+            IndexSchema(**indexes["schema"]) if "schema" in indexes else None
+        )
+        stored_composites = [tuple(keys) for keys in indexes.get("composite", [])]
 
-    def retrieve(
-        self,
-        filters: List[Union[Filter, dict]] = [],
-        keys: Optional[List[str]] = None,
-        offset: int = 0,
-        limit: int = 10,
-        sort_key: Optional[str] = None,
-        sort_direction: Literal["asc", "desc"] = "asc",
-    ):
-        filter_dataclasses = [
-            Filter(**f) if isinstance(f, dict) else f for f in filters
-        ]
+        self._set_index_schema(stored_schema)
+        self.composite_indexes = stored_composites
 
-        resources: List[dict] = []
-        if limit <= 0:
-            return resources
+        if isinstance(index_schema, dict):
+            index_schema = IndexSchema(**index_schema)
 
-        if sort_key:
-            sort_key_hash = custom_hash(sort_key)
+        if index_schema is not None and (
+            set(index_schema.sortable) & set(index_schema.filter_only)
+        ):
+            raise ValueError("keys cannot be both sortable and filter only")
 
-            start_prop = "head" if sort_direction == "desc" else "toe"
-            link_prop = "next" if sort_direction == "desc" else "prev"
+        if composite_indexes is None:
+            composite_indexes = stored_composites
 
-            value_encoded = self.db.get(
-                self.key_delim.join([sort_key_hash, start_prop])
-            )
+        composite_indexes = [tuple(keys) for keys in composite_indexes]
 
-            while (offset > 0 or limit > 0) and value_encoded:
-                value = value_encoded.decode()
-                value_hash = custom_hash(value)
-                key_value_id_encoded = self.db.get(
-                    self.key_delim.join([sort_key_hash, value_hash, "head"])
+        for keys in composite_indexes:
+            if len(keys) < 2 or len(set(keys)) < len(keys):
+                raise ValueError(
+                    f"composite index {list(keys)} needs two or more distinct keys"
                 )
 
-                while (offset > 0 or limit > 0) and key_value_id_encoded:
-                    key_value_id = key_value_id_encoded.decode()
-                    resource_id = self.db.get(
-                        self.key_delim.join(
-                            [sort_key_hash, value_hash, key_value_id, "value"]
-                        )
-                    ).decode()
+        if index_schema is None:
+            index_schema = stored_schema
 
-                    if (
-                        retrieved_values := self._check_filters(
-                            resource_id, filter_dataclasses
-                        )
-                    ) is not None:
-                        if offset > 0:
-                            offset -= 1
-                        else:
-                            limit -= 1
-                            resources.append(
-                                self._retrieve_resource(
-                                    resource_id, keys, retrieved_values
-                                )
-                            )
-
-                    key_value_id_encoded = self.db.get(
-                        self.key_delim.join(
-                            [sort_key_hash, value_hash, key_value_id, "next"]
-                        )
-                    )
+        if index_schema == stored_schema and composite_indexes == stored_composites:
+            return
 
-                value_encoded = self.db.get(
-                    self.key_delim.join([sort_key_hash, value_hash, link_prop])
+        with self.batch():
+            if index_schema != stored_schema:
+                self._rebuild_key_indexes(index_schema)
+
+            if composite_indexes != stored_composites:
+                self._rebuild_composite_indexes(
+                    [
+                        keys
+                        for keys in composite_indexes
+                        if keys not in stored_composites
+                    ],
+                    [
+                        keys
+                        for keys in stored_composites
+                        if keys not in composite_indexes
+                    ],
                 )
+                self.composite_indexes = composite_indexes
 
-            return resources
+            indexes = {}
+            if index_schema is not None:
+                indexes["schema"] = asdict(index_schema)
+            if composite_indexes:
+                indexes["composite"] = [list(keys) for keys in composite_indexes]
 
+            if indexes:
+                self.db["indexes"] = dumps(indexes).encode()
+            elif "indexes" in self.db:
+                del self.db["indexes"]
+
+    def _set_index_schema(self, index_schema: Optional[IndexSchema]):
+        # WITHOUT A SCHEMA EVERY KEY IS INDEXED
+        self.index_schema = index_schema
+
+        if index_schema is None:
+            self._posted_key_hashes = self._sorted_key_hashes = None
         else:
-            resource_id_encoded = self.db.get("head")
+            self._posted_key_hashes = set(map(self._hash, index_schema.indexed_keys))
+            self._sorted_key_hashes = set(map(self._hash, index_schema.sortable))
+
+    def _rebuild_key_indexes(self, index_schema: Optional[IndexSchema]):
+        # KEYS LOSING THEIR POSTINGS OR SORT INDEX ARE CLEARED UNDER THE OLD
+        # SCHEMA, THEN THOSE GAINING THEM ARE BUILT UNDER THE NEW ONE, ADDED
+        # POSTINGS OLDEST FIRST AS _create_many DOES
+        postings: Dict[tuple, list] = {}
+        values: Dict[tuple, tuple] = {}
+        sorted_values: Dict[str, set] = {}
+        unsorted_key_hashes = set()
+
+        def key_indexes(schema, key):
+            if schema is None:
+                return True, True
+            return key in schema.indexed_keys, key in schema.sortable
+
+        for resource_id in self._iter_resource_ids():
+            resource_id_encoded = resource_id.encode()
+
+            if self.storage == "blob":
+                document = self._retrieve_document(resource_id)
+            else:
+                document = self._retrieve_present_values(
+                    resource_id, list(self._iter_resource_keys(resource_id))
+                )
 
-            while (offset > 0 or limit > 0) and resource_id_encoded:
-                resource_id = resource_id_encoded.decode()
+            for key, value in document.items():
+                was_posted, was_sorted = key_indexes(self.index_schema, key)
+                posted, sorted_ = key_indexes(index_schema, key)
 
-                if (
-                    retrieved_values := self._check_filters(
-                        resource_id, filter_dataclasses
-                    )
-                ) is not None:
-                    if offset > 0:
-                        offset -= 1
-                    else:
-                        limit -= 1
-                        resources.append(
-                            self._retrieve_resource(resource_id, keys, retrieved_values)
-                        )
+                key_hash = self._hash(key)
+                value_dump = dumps(value)
+                value_hash = self._hash(value_dump)
 
-                resource_id_encoded = self.db.get(
-                    self.key_delim.join([resource_id, "next"])
-                )
-        return resources
+                if was_posted and not posted:
+                    self._delete_filter_index(key_hash, value_hash, resource_id_encoded)
+                elif posted and not was_posted:
+                    postings.setdefault((key_hash, value_hash), []).append(
+                        resource_id_encoded
+                    )
+                    values[(key_hash, value_hash)] = (value_dump.encode(), value)
+                elif sorted_ and not was_sorted:
+                    sorted_values.setdefault(key_hash, set()).add(value_dump.encode())
+                elif was_sorted and not sorted_:
+                    unsorted_key_hashes.add(key_hash)
 
-    def retrieve_one(self, resource_id: str, keys: Optional[List[str]] = None):
-        return self._retrieve_resource(resource_id, keys=keys)
+        for key_hash in unsorted_key_hashes:
+            self._clear_sort_index(key_hash)
 
-    def _update_entry(self, resource_id, resource_id_encoded, key_id, update):
-        key = self._retrieve_key(resource_id, key_id)
+        self._set_index_schema(index_schema)
 
-        if key is None:
-            return
+        for resource_ids_encoded in postings.values():
+            resource_ids_encoded.reverse()
 
-        new_value = None
-        if key in update:
-            new_value = update.pop(key)
-        else:
-            return
+        self._create_postings_many(postings, values)
 
-        key_hash = custom_hash(key)
+        for key_hash, encoded_value_dumps in sorted_values.items():
+            self._rebuild_sort_index(key_hash, encoded_value_dumps)
 
-        current_value_dump = self.db.get(
-            self.key_delim.join([resource_id, key_hash])
-        ).decode()
-        current_value_hash = custom_hash(current_value_dump)
+    def _rebuild_composite_indexes(self, added, dropped):
+        # ADDED POSTINGS ARE APPENDED OLDEST FIRST, AS _create_many DOES
+        composite_keys = self._composite_keys(added + dropped)
+        postings: Dict[tuple, list] = {}
+        values: Dict[tuple, tuple] = {}
 
-        new_value_dump = dumps(new_value)
+        for resource_id in self._iter_resource_ids():
+            resource_id_encoded = resource_id.encode()
+            resource_values = self._retrieve_present_values(resource_id, composite_keys)
 
-        new_value_hash = custom_hash(new_value_dump)
-        encoded_new_value_dump = new_value_dump.encode()
+            for key_hash, value_hash, _, _ in self._composite_entries(
+                resource_values, dropped
+            ):
+                self._delete_filter_index(key_hash, value_hash, resource_id_encoded)
 
-        self._delete_filter_index(key_hash, current_value_hash, resource_id_encoded)
-        self._create_filter_index(
-            key_hash,
-            new_value_hash,
-            resource_id_encoded,
-            encoded_new_value_dump,
-            new_value,
-        )
+            for key_hash, value_hash, *encoded_value in self._composite_entries(
+                resource_values, added
+            ):
+                postings.setdefault((key_hash, value_hash), []).append(
+                    resource_id_encoded
+                )
+                values[(key_hash, value_hash)] = tuple(encoded_value)
 
-        self.db[self.key_delim.join([resource_id, key_hash])] = encoded_new_value_dump
+        for resource_ids_encoded in postings.values():
+            resource_ids_encoded.reverse()
 
-    def update(self, resource_id: str, update: JsonDict):
-        resource_id_encoded = resource_id.encode()
-        head_key_id_key = self.key_delim.join([resource_id, "head"])
-        head_key_id_encoded = self.db.get(head_key_id_key)
-        head_key_id = head_key_id_encoded.decode()
-        key_id_key = self.key_delim.join([resource_id, head_key_id, "next"])
+        self._create_postings_many(postings, values)
 
-        self._update_entry(resource_id, resource_id_encoded, head_key_id, update)
+    @measured
+    def create(self, resource: JsonDict) -> str:
+        with self._gate.shared():
+            resource_id = self._resource_id()
+            resource_id_encoded = resource_id.encode()
 
-        while key_id_encoded := self.db.get(key_id_key):
-            key_id = key_id_encoded.decode()
-            key_id_key = self.key_delim.join([resource_id, key_id, "next"])
+            for key_hash, value_hash, encoded_value_dump, value in chain(
+                self._create_entries(resource_id, resource),
+                self._composite_entries(resource),
+            ):
+                self._create_filter_index(
+                    key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+                )
 
-            self._update_entry(resource_id, resource_id_encoded, key_id, update)
+            # THE RESOURCE IS LISTED ONLY ONCE IT IS COMPLETE
+            self._link_resource_ids([resource_id])
 
-        self.db[head_key_id_key] = str(int(head_key_id) + len(update)).encode()
+        return resource_id
 
-        for index, (key, value) in enumerate(update.items()):
-            value_dump = dumps(value)
-            encoded_value_dump = value_dump.encode()
+    @measured
+    def create_many(self, resources: Iterable[JsonDict]) -> List[str]:
+        # EVERY WRITE IS BUFFERED AND FLUSHED AS ONE MULTI-KEY WRITE, AND THE
+        # RESOURCES ARE LISTED ONCE IT IS FLUSHED
+        with self.batch():
+            resource_ids = self._create_many(list(resources))
 
-            key_hash = custom_hash(key)
-            value_hash = custom_hash(value_dump)
+        with self._gate.shared():
+            self._link_resource_ids(resource_ids)
 
-            self.db[self.key_delim.join([resource_id, key_hash])] = encoded_value_dump
+        return resource_ids
 
-            self._create_key_index(resource_id, index + int(head_key_id) + 1, key)
-            self._create_filter_index(
-                key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
-            )
+    def _create_many(self, resources: List[JsonDict]) -> List[str]:
+        resource_ids = self._resource_ids(len(resources))
 
-    def delete(self, resource_id: str):
-        resource_id_encoded = resource_id.encode()
-        key_id_key = self.key_delim.join([resource_id, "head"])
+        # POSTINGS ARE WRITTEN ONCE PER KEY/VALUE PAIR, AND EACH KEY'S NEW
+        # VALUES ARE MERGED INTO ITS SORT INDEX IN DESCENDING ORDER
+        postings: Dict[tuple, list] = {}
+        values: Dict[tuple, tuple] = {}
 
-        while key_id_encoded := self.db.get(key_id_key):
-            key_id = key_id_encoded.decode()
+        for resource_id, resource in zip(resource_ids, resources):
+            for key_hash, value_hash, encoded_value_dump, value in chain(
+                self._create_entries(resource_id, resource),
+                self._composite_entries(resource),
+            ):
+                postings.setdefault((key_hash, value_hash), []).append(
+                    resource_id.encode()
+                )
+                values[(key_hash, value_hash)] = (encoded_value_dump, value)
 
-            del self.db[key_id_key]
+        self._create_postings_many(postings, values)
 
-            if int(key_id) < 0:
-                break
+        return resource_ids
 
-            key_id_key = self.key_delim.join([resource_id, key_id, "next"])
-            key = self._retrieve_key(resource_id, key_id)
-            del self.db[self.key_delim.join([resource_id, key_id, "value"])]
+    def _create_postings_many(self, postings, values):
+        # postings ARE NEW RESOURCE IDS PER (key_hash, value_hash), OLDEST
+        # FIRST, AND values THE (encoded_value_dump, value) OF EACH PAIR
+        new_values: Dict[str, list] = {}
 
-            key_hash = custom_hash(key)
+        for (key_hash, value_hash), resource_ids_encoded in postings.items():
+            if self._create_filter_index_many(
+                key_hash, value_hash, resource_ids_encoded
+            ):
+                new_values.setdefault(key_hash, []).append(
+                    (value_hash, *values[(key_hash, value_hash)])
+                )
 
-            encoded_value_dump = self.db.get(
-                self.key_delim.join([resource_id, key_hash])
-            )
-            value_dump = encoded_value_dump.decode()
+        for key_hash, key_new_values in new_values.items():
+            finger = None
 
-            value_hash = custom_hash(value_dump)
+            for value_hash, encoded_value_dump, value in sorted(
+                key_new_values,
+                key=lambda new_value: self._comparable(new_value[1]),
+                reverse=True,
+            ):
+                finger = self._create_sort_index(
+                    key_hash, value_hash, encoded_value_dump, value, finger
+                )
 
-            del self.db[self.key_delim.join([resource_id, key_hash])]
+    @measured
+    def retrieve(
+        self,
+        filters: List[Union[Filter, dict]] = [],
+        keys: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 10,
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+        cursor: Optional[str] = None,
+    ) -> Page:
+        return self._retrieve_page(
+            self._iter_matches(filters, sort_key, sort_direction, cursor),
+            keys,
+            offset,
+            limit,
+        )
 
-            self._delete_filter_index(key_hash, value_hash, resource_id_encoded)
+    def _retrieve_page(self, matches_iter, keys, offset, limit) -> Page:
+        resources = Page()
+        if limit <= 0:
+            return resources
 
-        lagging_resource_id = None
-        resource_id_key = "head"
+        # THE PAGE IS READ TOGETHER ONCE ITS MATCHES ARE KNOWN
+        matches = []
 
-        while retreived_resource_id_encoded := self.db.get(resource_id_key):
-            retreived_resource_id = retreived_resource_id_encoded.decode()
-            next_retreived_resource_id_key = self.key_delim.join(
-                [retreived_resource_id, "next"]
-            )
+        for resource_id, retrieved_values, position in matches_iter:
+            if offset > 0:
+                offset -= 1
+                continue
 
-            if retreived_resource_id == resource_id:
-                next_retreived_resource_id_encoded = self.db.get(
-                    next_retreived_resource_id_key
-                )
-                if lagging_resource_id:
-                    if next_retreived_resource_id_encoded:
-                        self.db[
-                            self.key_delim.join([lagging_resource_id, "next"])
-                        ] = next_retreived_resource_id_encoded
-                        del self.db[next_retreived_resource_id_key]
-                elif next_retreived_resource_id_encoded:
-                    self.db[resource_id_key] = next_retreived_resource_id_encoded
-                    del self.db[next_retreived_resource_id_key]
-                else:
-                    del self.db[resource_id_key]
+            matches.append((resource_id, retrieved_values))
 
-                return
+            if len(matches) >= limit:
+                resources.cursor = encode_cursor(position)
+                break
 
-            resource_id_key = next_retreived_resource_id_key
-            lagging_resource_id = retreived_resource_id
+        resources.extend(self._retrieve_resources(matches, keys))
+        return resources
 
-    def _check_filters(self, resource_id, filters: List[Filter] = []):
-        retrieved_values = {}
-        for f in filters:
-            value = self._retrieve_value(resource_id, f.key)
-            if not getattr(operator, f.operator)(
-                parse_comparable_json(value), parse_comparable_json(f.value)
-            ):
-                return
-            retrieved_values[f.key] = value
-        return retrieved_values
+    def prepare(
+        self,
+        filters: List[Union[Filter, dict]] = [],
+        keys: Optional[List[str]] = None,
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+    ) -> PreparedQuery:
+        return PreparedQuery(self, filters, keys, sort_key, sort_direction)
 
-    def _retrieve_resource(
+    def iter_retrieve(
         self,
-        resource_id: str,
+        filters: List[Union[Filter, dict]] = [],
         keys: Optional[List[str]] = None,
-        retrieved_values: JsonDict = {},
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+        cursor: Optional[str] = None,
     ):
-        resource: JsonDict = {"id": resource_id}
-
-        if keys:
-            for key in keys:
-                resource[key] = retrieved_values.get(
-                    key, self._retrieve_value(resource_id, key)
-                )
+        for resource_id, retrieved_values, _ in self._iter_matches(
+            filters, sort_key, sort_direction, cursor
+        ):
+            yield self._retrieve_resource(resource_id, keys, retrieved_values)
 
-        else:
-            key_id_encoded = self.db.get(self.key_delim.join([resource_id, "head"]))
-            if not key_id_encoded:
-                return resource
-            key_id = key_id_encoded.decode()
-            key = self._retrieve_key(resource_id, key_id)
+    @measured
+    def count(self, filters: List[Union[Filter, dict]] = []) -> int:
+        filter_dataclasses = [
+            Filter(**f) if isinstance(f, dict) else f for f in filters
+        ]
 
-            if key is None:
-                return resource
+        # SINGLE FILTERS ARE ANSWERED FROM THE COUNTERS
+        if self._counted and not filter_dataclasses:
+            return self._retrieve_count("count")
 
-            resource[key] = retrieved_values.get(
-                key, self._retrieve_value(resource_id, key)
-            )
+        if self._counted and len(filter_dataclasses) == 1:
+            f = filter_dataclasses[0]
 
-            while key_id_encoded := self.db.get(
-                self.key_delim.join([resource_id, key_id, "next"])
+            if (
+                f.operator in ["eq", "ne"]
+                and (equal_count := self._count_equal(f.key, f.value)) is not None
             ):
-                key_id = key_id_encoded.decode()
-                key = self._retrieve_key(resource_id, key_id)
-                resource[key] = retrieved_values.get(
-                    key, self._retrieve_value(resource_id, key)
-                )
+                if f.operator == "eq":
+                    return equal_count
+                return self._retrieve_count("count") - equal_count
 
-        return resource
+            if f.operator in RANGE_OPERATORS and self._is_indexable(f):
+                return self._estimate(f)
 
-    def _retrieve_key(self, resource_id, key_id):
-        key = self.db.get(self.key_delim.join([resource_id, key_id, "value"]))
-        if key is not None:
-            return key.decode()
+        return sum(1 for _ in self._iter_matches(filter_dataclasses, None, "asc", None))
 
-    def _retrieve_value(self, resource_id, key):
-        key_hash = custom_hash(key)
-        value = self.db.get(self.key_delim.join([resource_id, key_hash]))
+    def explain(
+        self, filters: List[Union[Filter, dict]] = [], sort_key: Optional[str] = None
+    ) -> Plan:
+        return self._plan(
+            [Filter(**f) if isinstance(f, dict) else f for f in filters], sort_key
+        )
 
-        if value is not None:
-            return loads(value.decode())
+    @measured
+    def retrieve_one(self, resource_id: str, keys: Optional[List[str]] = None):
+        return self._retrieve_resource(resource_id, keys=keys)
 
-    def _resource_id(self):
-        head_encoded = self.db.get("head", b"-1")
-        head = int(head_encoded.decode())
-        resource_id = str(head + 1)
+    @measured
+    def update(self, resource_id: str, update: JsonDict):
+        with self._gate.shared(), self._resource_locks(resource_id):
+            self._update(resource_id, update)
+
+    @measured
+    def patch_many(self, patches: Iterable[Tuple[str, JsonDict]]):
+        # (resource_id, update) PAIRS, APPLIED IN ORDER IN ONE BATCH
+        with self.batch():
+            for resource_id, update in patches:
+                self._update(resource_id, update)
+
+    def _update(self, resource_id: str, update: JsonDict):
+        # ONLY THE UPDATED KEYS ARE READ, AND ONLY THOSE WHOSE VALUE CHANGES
+        # ARE WRITTEN AND REINDEXED. NEW KEYS ARE APPENDED TO THE KEY LIST
+        resource_id_encoded = resource_id.encode()
+
+        if self.storage == "blob":
+            blob = self.db.get(self.key_delim.join([resource_id, "blob"]))
+
+            if blob is None:
+                raise KeyError(resource_id)
 
-        if head >= 0:
-            self.db[self.key_delim.join([resource_id, "next"])] = head_encoded
+            document = self._loads(blob.decode())
+            current_value_dumps = {
+                key: dumps(document[key]) for key in update if key in document
+            }
         else:
-            self.db["head"] = resource_id.encode()
+            current_value_dumps = {
+                key: value_encoded.decode()
+                for key, value_encoded in zip(
+                    update,
+                    get_many(
+                        self.db,
+                        [
+                            self.key_delim.join([resource_id, self._hash(key)])
+                            for key in update
+                        ],
+                    ),
+                )
+                if value_encoded is not None
+            }
 
-        return resource_id
+        changes = {}
+        for key, value in update.items():
+            value_dump = dumps(value)
+            if current_value_dumps.get(key) != value_dump:
+                changes[key] = (value, value_dump)
 
-    def _create_key_index(self, resource_id, key_index, key):
-        resource_key_id = str(key_index)
-        self.db[
-            self.key_delim.join([resource_id, resource_key_id, "value"])
-        ] = key.encode()
+        if not changes:
+            return
 
-        if key_index > 0:
-            self.db[self.key_delim.join([resource_id, resource_key_id, "next"])] = str(
-                key_index - 1
-            ).encode()
+        new_keys = [key for key in changes if key not in current_value_dumps]
 
-    def _create_filter_index(
-        self, key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
-    ):
-        key_value_head_key = self.key_delim.join([key_hash, value_hash, "head"])
-        key_value_head_encoded = self.db.get(key_value_head_key, b"-1")
-        key_value_head = int(key_value_head_encoded.decode())
+        if self.storage == "keys" and new_keys:
+            head_key_id_key = self.key_delim.join([resource_id, "head"])
 
-        if key_value_head == -1:
-            self._create_sort_index(key_hash, value_hash, encoded_value_dump, value)
+            if (head_key_id_encoded := self.db.get(head_key_id_key)) is None:
+                raise KeyError(resource_id)
 
-        key_value_id = str(key_value_head + 1)
-        self.db[
-            self.key_delim.join([key_hash, value_hash, key_value_id, "value"])
-        ] = resource_id_encoded
+            head_key_id = int(head_key_id_encoded.decode())
 
-        if key_value_head >= 0:
-            self.db[
-                self.key_delim.join([key_hash, value_hash, key_value_id, "next"])
-            ] = key_value_head_encoded
+            for offset, key in enumerate(new_keys):
+                self._create_key_index(resource_id, head_key_id + offset + 1, key)
 
-        self.db[key_value_head_key] = key_value_id.encode()
+            self.db[head_key_id_key] = str(head_key_id + len(new_keys)).encode()
 
-    def _delete_filter_index(self, key_hash, value_hash, resource_id_encoded):
-        lagging_key_value_id = None
-        key_value_id_key = self.key_delim.join([key_hash, value_hash, "head"])
+        self._update_composite_entries(
+            resource_id,
+            resource_id_encoded,
+            {key: value for key, (value, _) in changes.items()},
+        )
 
-        while key_value_id_encoded := self.db.get(key_value_id_key):
-            key_value_id = key_value_id_encoded.decode()
-            resource_id_encoded_retreived_key = self.key_delim.join(
-                [key_hash, value_hash, key_value_id, "value"]
-            )
-            resource_id_encoded_retreived = self.db.get(
-                resource_id_encoded_retreived_key
-            )
-
-            next_key_value_id_key = self.key_delim.join(
-                [key_hash, value_hash, key_value_id, "next"]
-            )
-
-            if resource_id_encoded_retreived == resource_id_encoded:
-                next_key_value_id_encoded = self.db.get(next_key_value_id_key)
-                if lagging_key_value_id:
-                    if next_key_value_id_encoded:
-                        self.db[
-                            self.key_delim.join(
-                                [key_hash, value_hash, lagging_key_value_id, "next"]
-                            )
-                        ] = next_key_value_id_encoded
-                        del self.db[next_key_value_id_key]
-                elif next_key_value_id_encoded:
-                    self.db[key_value_id_key] = next_key_value_id_encoded
-                    del self.db[next_key_value_id_key]
-                else:
-                    del self.db[key_value_id_key]
-                    self._delete_sort_index(key_hash, value_hash)
+        for key, (value, value_dump) in changes.items():
+            key_hash = self._hash(key)
+            encoded_value_dump = value_dump.encode()
 
-                del self.db[
-                    self.key_delim.join([key_hash, value_hash, key_value_id, "value"])
-                ]
+            if key in current_value_dumps:
+                self._delete_filter_index(
+                    key_hash,
+                    self._hash(current_value_dumps[key]),
+                    resource_id_encoded,
+                )
+            self._create_filter_index(
+                key_hash,
+                self._hash(value_dump),
+                resource_id_encoded,
+                encoded_value_dump,
+                value,
+            )
+
+            if self.storage == "blob":
+                document[key] = value
+            else:
+                self.db[
+                    self.key_delim.join([resource_id, key_hash])
+                ] = encoded_value_dump
+
+        if self.storage == "blob":
+            self.db[self.key_delim.join([resource_id, "blob"])] = dumps(
+                document
+            ).encode()
 
+    @measured
+    def delete(self, resource_id: str):
+        with self._gate.shared(), self._resource_locks(resource_id):
+            resource_id_encoded = resource_id.encode()
+            key_id_key = self.key_delim.join([resource_id, "head"])
+
+            # MISSING RESOURCES ARE NOT LOOKED FOR IN THE RESOURCE LIST
+            if (
+                self.key_delim.join([resource_id, "blob"])
+                if self.storage == "blob"
+                else key_id_key
+            ) not in self.db:
                 return
 
-            key_value_id_key = next_key_value_id_key
-            lagging_key_value_id = key_value_id
+            if self.composite_indexes:
+                for key_hash, value_hash, _, _ in self._composite_entries(
+                    self._retrieve_present_values(
+                        resource_id, self._composite_keys(self.composite_indexes)
+                    )
+                ):
+                    self._delete_filter_index(key_hash, value_hash, resource_id_encoded)
 
-    def _create_sort_index(self, key_hash, value_hash, encoded_value_dump, value):
-        key_head_key = self.key_delim.join([key_hash, "head"])
-        key_toe_key = self.key_delim.join([key_hash, "toe"])
-        key_head_encoded = self.db.get(key_head_key)
+            if self.storage == "blob":
+                for key, value in self._retrieve_document(resource_id).items():
+                    self._delete_filter_index(
+                        self._hash(key), self._hash(dumps(value)), resource_id_encoded
+                    )
 
-        if not key_head_encoded:
-            self.db[key_head_key] = encoded_value_dump
-            self.db[key_toe_key] = encoded_value_dump
-            return
+                blob_key = self.key_delim.join([resource_id, "blob"])
+                if blob_key in self.db:
+                    del self.db[blob_key]
 
-        key_toe_encoded = self.db.get(key_toe_key)
+            while key_id_encoded := self.db.get(key_id_key):
+                key_id = key_id_encoded.decode()
 
-        key_toe_dump = key_toe_encoded.decode()
-        key_head_dump = key_head_encoded.decode()
+                del self.db[key_id_key]
 
-        key_toe = loads(key_toe_dump)
-        key_head = loads(key_head_dump)
+                if int(key_id) < 0:
+                    break
 
-        comparable_value = parse_comparable_json(value)
+                key_id_key = self.key_delim.join([resource_id, key_id, "next"])
+                key = self._retrieve_key(resource_id, key_id)
+                del self.db[self.key_delim.join([resource_id, key_id, "value"])]
 
-        if (head_diff := (comparable_value - parse_comparable_json(key_head))) > 0:
-            self.db[key_head_key] = encoded_value_dump
-            self.db[
-                self.key_delim.join([key_hash, value_hash, "next"])
-            ] = key_head_encoded
-            self.db[
-                self.key_delim.join([key_hash, custom_hash(key_head_dump), "prev"])
-            ] = encoded_value_dump
-        elif (toe_diff := (parse_comparable_json(key_toe) - comparable_value)) > 0:
-            self.db[key_toe_key] = encoded_value_dump
-            self.db[
-                self.key_delim.join([key_hash, value_hash, "prev"])
-            ] = key_toe_encoded
-            self.db[
-                self.key_delim.join([key_hash, custom_hash(key_toe_dump), "next"])
-            ] = encoded_value_dump
-        else:
-            dir_flag = head_diff < toe_diff
+                key_hash = self._hash(key)
 
-            leading_value_encoded = key_head_encoded if dir_flag else key_toe_encoded
-            compare_func = gt if dir_flag else lt
-            link_prop, secondary_link_prop = (
-                ("next", "prev") if dir_flag else ("prev", "next")
-            )
+                encoded_value_dump = self.db.get(
+                    self.key_delim.join([resource_id, key_hash])
+                )
+                value_dump = encoded_value_dump.decode()
 
-            while leading_value_encoded:
-                leading_value_decoded = leading_value_encoded.decode()
-                leading_value = loads(leading_value_decoded)
+                value_hash = self._hash(value_dump)
 
-                if compare_func(comparable_value, parse_comparable_json(leading_value)):
-                    break
+                del self.db[self.key_delim.join([resource_id, key_hash])]
 
-                lagging_value = leading_value
-                leading_value_encoded = self.db.get(
-                    self.key_delim.join(
-                        [key_hash, custom_hash(leading_value_decoded), link_prop]
-                    )
+                self._delete_filter_index(key_hash, value_hash, resource_id_encoded)
+
+            with self._list_transaction():
+                if (
+                    self._unlink_resource_id(resource_id, resource_id_encoded)
+                    and self._counted
+                ):
+                    self._add_count("count", -1)
+
+    def migrate(self):
+        with self._gate.exclusive():
+            lagging_resource_id_encoded = None
+            encoded_value_dumps: Dict[str, set] = {}
+            counts: Dict[str, int] = {}
+
+            segments: Dict[str, bytes] = {}
+            postings = set()
+
+            for resource_id in self._iter_resource_ids():
+                counts["count"] = counts.get("count", 0) + 1
+                segments.setdefault(
+                    self._segment_key(resource_id), resource_id.encode()
                 )
+                if lagging_resource_id_encoded:
+                    self.db[
+                        self.key_delim.join([resource_id, "prev"])
+                    ] = lagging_resource_id_encoded
+
+                lagging_resource_id_encoded = resource_id.encode()
+
+                if self.storage == "blob":
+                    resource_entries = [
+                        (self._hash(key), dumps(value).encode())
+                        for key, value in self._retrieve_document(resource_id).items()
+                    ]
+                else:
+                    resource_entries = [
+                        (
+                            key_hash := self._hash(key),
+                            self.db.get(self.key_delim.join([resource_id, key_hash])),
+                        )
+                        for key in self._iter_resource_keys(resource_id)
+                    ]
 
-            lagging_value_dump = dumps(lagging_value)
+                for key_hash, encoded_value_dump in resource_entries:
+                    if not self._posts(key_hash):
+                        continue
 
-            if leading_value_encoded:
-                self.db[
-                    self.key_delim.join([key_hash, value_hash, link_prop])
-                ] = leading_value_encoded
-                self.db[
-                    self.key_delim.join(
-                        [
-                            key_hash,
-                            custom_hash(leading_value_decoded),
-                            secondary_link_prop,
-                        ]
-                    )
-                ] = encoded_value_dump
+                    if self._sorts(key_hash):
+                        encoded_value_dumps.setdefault(key_hash, set()).add(
+                            encoded_value_dump
+                        )
 
-            self.db[
-                self.key_delim.join([key_hash, value_hash, secondary_link_prop])
-            ] = lagging_value_dump.encode()
-            self.db[
-                self.key_delim.join(
-                    [key_hash, custom_hash(lagging_value_dump), link_prop]
-                )
-            ] = encoded_value_dump
+                    value_hash = self._hash(encoded_value_dump.decode())
+                    postings.add((key_hash, value_hash))
 
-    def _delete_sort_index(self, key_hash, value_hash):
-        prev_encoded_value_dump_key = self.key_delim.join(
-            [key_hash, value_hash, "prev"]
-        )
-        next_encoded_value_dump_key = self.key_delim.join(
-            [key_hash, value_hash, "next"]
-        )
+                    for count_key in [
+                        self.key_delim.join([key_hash, "count"]),
+                        self._prefix(key_hash, value_hash) + "count",
+                    ]:
+                        counts[count_key] = counts.get(count_key, 0) + 1
 
-        prev_encoded_value_dump = self.db.get(prev_encoded_value_dump_key)
-        next_encoded_value_dump = self.db.get(next_encoded_value_dump_key)
+            for key_hash, key_encoded_value_dumps in encoded_value_dumps.items():
+                self._rebuild_sort_index(key_hash, key_encoded_value_dumps)
 
-        head_key = self.key_delim.join([key_hash, "head"])
-        toe_key = self.key_delim.join([key_hash, "toe"])
+            if self.posting_format == "chain":
+                for key_hash, value_hash in postings:
+                    self._link_postings(key_hash, value_hash)
 
-        if prev_encoded_value_dump and next_encoded_value_dump:
-            # CASE 1: VALUES ABOVE AND BELOW
+            for count_key, count in counts.items():
+                self.db[count_key] = str(count).encode()
 
-            prev_value_dump = prev_encoded_value_dump.decode()
-            next_value_dump = next_encoded_value_dump.decode()
+            for segment_key, resource_id_encoded in segments.items():
+                self.db[segment_key] = resource_id_encoded
 
-            prev_value_dump_hash = custom_hash(prev_value_dump)
-            next_value_dump_hash = custom_hash(next_value_dump)
+            self._counted = True
+            self._segmented = True
 
-            self.db[
-                self.key_delim.join([key_hash, prev_value_dump_hash, "next"])
-            ] = next_encoded_value_dump
-            self.db[
-                self.key_delim.join([key_hash, next_value_dump_hash, "prev"])
-            ] = prev_encoded_value_dump
+    def _iter_matches(self, filters, sort_key, sort_direction, cursor):
+        filter_dataclasses = [
+            Filter(**f) if isinstance(f, dict) else f for f in filters
+        ]
+        plan = self._plan(filter_dataclasses, sort_key)
+
+        return self._iter_planned_matches(
+            plan,
+            self._compile_filters(plan.check_filters),
+            sort_key,
+            sort_direction,
+            decode_cursor(cursor) if cursor else None,
+        )
+
+    def _iter_planned_matches(
+        self,
+        plan: Plan,
+        check_filters: List[CompiledFilter],
+        sort_key,
+        sort_direction,
+        position=None,
+    ):
+        if (
+            plan.source == "resources"
+            and not sort_key
+            and check_filters
+            and self.scan_workers > 1
+            and self._segmented
+        ):
+            yield from self._scan_segments(check_filters, position and position[0])
+            return
 
-            del self.db[prev_encoded_value_dump_key]
-            del self.db[next_encoded_value_dump_key]
+        for resource_id, resource_position in self._iter_candidates(
+            plan, sort_key, sort_direction, position
+        ):
+            if (
+                retrieved_values := self._check_compiled_filters(
+                    resource_id, check_filters
+                )
+            ) is not None:
+                yield resource_id, retrieved_values, resource_position
+
+    def _scan_segments(self, filters: List[CompiledFilter], after=None):
+        # SEGMENTS ARE CHECKED BY THE WORKERS A FEW AHEAD OF THE ONE BEING
+        # YIELDED, AND YIELDED IN LIST ORDER
+        head_encoded = self.db.get("head")
+        if not head_encoded:
+            return
 
-        elif prev_encoded_value_dump:
-            # CASE 2: ONLY VALUE ABOVE
+        top = int(head_encoded if after is None else after) // self.segment_size
+        segments = iter(range(top, -1, -1))
+        pending: deque = deque()
+
+        if self._scan_executor is None:
+            self._scan_executor = ThreadPoolExecutor(self.scan_workers)
+
+        try:
+            while True:
+                while (
+                    len(pending) < 2 * self.scan_workers
+                    and (segment := next(segments, None)) is not None
+                ):
+                    pending.append(
+                        self._scan_executor.submit(
+                            copy_context().run,
+                            self._scan_segment,
+                            segment,
+                            filters,
+                            after if segment == top else None,
+                        )
+                    )
 
-            self.db[head_key] = prev_encoded_value_dump
-            del self.db[prev_encoded_value_dump_key]
+                if not pending:
+                    return
 
-        elif next_encoded_value_dump:
-            # CASE 3: ONLY VALUE BELOW
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
 
-            self.db[toe_key] = next_encoded_value_dump
-            del self.db[next_encoded_value_dump_key]
+    def _scan_segment(self, segment, filters: List[CompiledFilter], after=None):
+        # WALKS FROM THE SEGMENT'S NEWEST ID, OR FROM AFTER A CURSOR, DOWN TO
+        # ITS FIRST ID
+        lowest_resource_id = segment * self.segment_size
 
+        if after is None:
+            resource_id_encoded = self.db.get(self._segment_key(lowest_resource_id))
         else:
-            # CASE 4: ONLY VALUE
+            resource_id = next(self._iter_resource_ids(after), None)
+            resource_id_encoded = resource_id and resource_id.encode()
+
+        matches = []
+
+        while resource_id_encoded and int(resource_id_encoded) >= lowest_resource_id:
+            resource_id = resource_id_encoded.decode()
+
+            if (
+                retrieved_values := self._check_compiled_filters(resource_id, filters)
+            ) is not None:
+                matches.append((resource_id, retrieved_values, [resource_id]))
+
+            resource_id_encoded = self.db.get(
+                self.key_delim.join([resource_id, "next"])
+            )
+
+        return matches
+
+    def _plan(self, filters: List[Filter], sort_key):
+        # FILTERS ANSWERED BY AN INDEX ARE NOT CHECKED AGAIN. ESTIMATES COME
+        # FROM THE COUNTERS; EACH IS CUT SHORT ONCE IT EXCEEDS THE BEST SO FAR
+        if sort_key and (composite_plan := self._plan_composite(filters, sort_key)):
+            return composite_plan
+
+        estimates: Dict[int, Optional[int]] = {}
+        best_estimate = None
+        indexed_filters = [f for f in filters if self._is_indexable(f)]
+
+        for f in sorted(indexed_filters, key=lambda f: f.operator != "eq"):
+            estimates[id(f)] = estimate = self._estimate(f, best_estimate)
+
+            if estimate is not None and (
+                best_estimate is None or estimate < best_estimate
+            ):
+                best_estimate = estimate
+
+        def selectivity(f):
+            estimate = estimates.get(id(f))
+            return estimate is None, estimate or 0, f.operator != "eq"
+
+        sort_filters = [
+            f
+            for f in indexed_filters
+            if f.key == sort_key and f.operator in RANGE_OPERATORS
+        ]
+        other_estimates = [
+            estimates[id(f)]
+            for f in indexed_filters
+            if not any(f is sort_filter for sort_filter in sort_filters)
+        ]
+        sort_estimate = min(
+            [
+                estimate
+                for f in sort_filters
+                if (estimate := estimates[id(f)]) is not None
+            ],
+            default=None,
+        )
+
+        # A RANGE ON THE SORT KEY IS READ IN ORDER STRAIGHT FROM THE SORT INDEX,
+        # UNLESS ANOTHER INDEXED FILTER IS MORE SELECTIVE
+        if not sort_filters or not other_estimates:
+            use_sort_index = bool(sort_filters)
+        elif sort_estimate is None or None in other_estimates:
+            use_sort_index = not any(f.operator == "eq" for f in indexed_filters)
+        else:
+            use_sort_index = sort_estimate <= min(
+                estimate for estimate in other_estimates if estimate is not None
+            )
+
+        source: Literal["resources", "sort_index", "postings"] = "resources"
+        index_filters: List[Filter] = []
+        estimated_count: Optional[int] = None
+
+        if use_sort_index:
+            source = "sort_index"
+            index_filters = sort_filters
+            estimated_count = sort_estimate
+        elif indexed_filters:
+            posting_filters = sorted(indexed_filters, key=selectivity)[:1]
+            posting_count = estimates[id(posting_filters[0])]
+
+            for f in sorted(indexed_filters, key=selectivity)[1:]:
+                estimate = estimates[id(f)]
+
+                if self._intersects(estimate, posting_count):
+                    posting_filters.append(f)
+
+                    # AN UNKNOWN ESTIMATE LEAVES THE BOUND AS IT WAS
+                    if posting_count is not None and estimate is not None:
+                        posting_count = min(posting_count, estimate)
+
+            if not self._walk_is_cheaper(
+                filters, posting_filters, estimates, posting_count, sort_key
+            ):
+                source = "postings"
+                index_filters = posting_filters
+                estimated_count = posting_count
+
+        if source == "resources":
+            # A SORT KEY WITHOUT A SORT INDEX IS SORTED AFTER A SCAN
+            if sort_key and self._reads_sort_index(self._hash(sort_key)):
+                source = "sort_index"
+
+            if self._counted:
+                estimated_count = self._retrieve_count(
+                    self.key_delim.join([self._hash(sort_key), "count"])
+                    if source == "sort_index"
+                    else "count"
+                )
+
+        return Plan(
+            source=source,
+            index_filters=index_filters,
+            check_filters=sorted(
+                [
+                    f
+                    for f in filters
+                    if not any(f is index_filter for index_filter in index_filters)
+                ],
+                key=selectivity,
+            ),
+            estimated_count=estimated_count,
+        )
+
+    def _plan_composite(self, filters: List[Filter], sort_key):
+        # A COMPOSITE INDEX ENDING IN THE SORT KEY, WITH EQUALITY FILTERS ON
+        # ALL OF ITS OTHER KEYS, IS READ AS ONE RANGE IN ORDER. THE LONGEST
+        # SUCH INDEX IS USED
+        for keys in sorted(self.composite_indexes, key=len, reverse=True):
+            if keys[-1] != sort_key:
+                continue
+
+            index_filters = []
+
+            for key in keys[:-1]:
+                f = next(
+                    (
+                        f
+                        for f in filters
+                        if f.key == key
+                        and f.operator == "eq"
+                        and self._is_index_filter(f)
+                    ),
+                    None,
+                )
+                if f is None:
+                    break
+                index_filters.append(f)
+            else:
+                index_filters.extend(
+                    f
+                    for f in filters
+                    if f.key == sort_key
+                    and f.operator in ["eq", *RANGE_OPERATORS]
+                    and self._is_index_filter(f)
+                )
+
+                return Plan(
+                    source="composite",
+                    index_filters=index_filters,
+                    check_filters=[
+                        f
+                        for f in filters
+                        if not any(f is index_filter for index_filter in index_filters)
+                    ],
+                    index_keys=list(keys),
+                )
+
+    def _composite_bounds(self, plan: Plan):
+        # THE ENTRIES STARTING WITH THE EQUALITY FILTERS' VALUES, NARROWED BY
+        # THE FILTERS ON THE LAST KEY. NO ENCODED VALUE STARTS WITH \xff, SO
+        # APPENDING IT BOUNDS EVERY ENCODING THAT STARTS WITH THE OTHER BYTES
+        *prefix_keys, last_key = plan.index_keys or []
+        prefix = LIST_TAG
+
+        for key in prefix_keys:
+            f = next(f for f in plan.index_filters if f.key == key)
+            prefix += parse_comparable_json(f.value)
+
+        lower, upper = prefix, prefix + b"\xff"
+
+        for f in plan.index_filters:
+            if f.key != last_key:
+                continue
+
+            comparable_bound = prefix + parse_comparable_json(f.value)
+
+            if f.operator in ["ge", "eq"]:
+                lower = max(lower, comparable_bound)
+            elif f.operator == "gt":
+                lower = max(lower, comparable_bound + b"\xff")
+
+            if f.operator in ["le", "eq"]:
+                upper = min(upper, comparable_bound + b"\xff")
+            elif f.operator == "lt":
+                upper = min(upper, comparable_bound)
+
+        return [("ge", lower), ("lt", upper)]
+
+    def _comparable_bounds(self, filters: List[Filter]):
+        return [(f.operator, parse_comparable_json(f.value)) for f in filters]
+
+    def _estimate(self, f: Filter, limit=None):
+        # RESOURCES MATCHING AN INDEXED FILTER, COUNTED PAST limit AT MOST
+        if not self._counted:
+            return None
+
+        if f.operator == "eq":
+            return self._count_equal(f.key, f.value)
+
+        key_hash = self._hash(f.key)
+        estimate = 0
+
+        for value_hash in self._iter_sort_index_values(key_hash, f.operator, f.value):
+            estimate += self._retrieve_count(
+                self._prefix(key_hash, value_hash) + "count"
+            )
+
+            if limit is not None and estimate > limit:
+                break
+
+        return estimate
+
+    def _intersects(self, estimate, candidate_count):
+        # READING A POSTING LIST PAYS OFF WHEN IT COSTS FEWER READS THAN
+        # CHECKING THE FILTER ON EVERY CANDIDATE
+        if estimate is None or candidate_count is None:
+            return self.posting_format == "packed"
+
+        return self._posting_reads(estimate) < candidate_count
+
+    def _posting_reads(self, estimate):
+        # CHAINED POSTINGS COST TWO READS PER ENTRY, PACKED ONES A READ PER
+        # BLOCK
+        if self.posting_format == "packed":
+            return estimate // self.posting_block_size + 1
+
+        return 2 * estimate
+
+    def _walk_is_cheaper(
+        self,
+        filters: List[Filter],
+        posting_filters: List[Filter],
+        estimates: Dict[int, Optional[int]],
+        posting_count: Optional[int],
+        sort_key,
+    ):
+        # POSTINGS ARE READ WHOLE, WHILE WALKING THE RESOURCE LIST OR THE SORT
+        # KEY'S INDEX IN RESULT ORDER, CHECKING EVERY FILTER, STOPS ONCE A PAGE
+        # MATCHES. POSTINGS STREAMED IN ORDER, AND SORT KEYS WITHOUT A SORT
+        # INDEX, WHICH SORT EVERY RESOURCE, NEVER WALK
+        if self._streams_postings(posting_filters, sort_key):
+            return False
+
+        posting_estimates = [estimates[id(f)] for f in posting_filters]
+        if posting_count is None or None in posting_estimates:
+            return False
+
+        if sort_key:
+            if not self._reads_sort_index(sort_key_hash := self._hash(sort_key)):
+                return False
+
+            walked_count = self._retrieve_count(
+                self.key_delim.join([sort_key_hash, "count"])
+            )
+            # SORTED POSTINGS ALSO READ EACH CANDIDATE'S SORT VALUE
+            posting_reads = posting_count
+            row_reads = 2 + len(filters)
+        else:
+            walked_count = self._retrieve_count("count")
+            posting_reads = 0
+            row_reads = 1 + len(filters)
+
+        posting_reads += sum(
+            self._posting_reads(estimate) for estimate in posting_estimates
+        )
+        walk_reads = (
+            row_reads * PLANNED_PAGE_SIZE * walked_count // max(posting_count, 1)
+        )
+
+        return walk_reads < posting_reads
+
+    def _iter_candidates(self, plan: Plan, sort_key, sort_direction, position=None):
+        # YIELDS RESOURCE IDS IN RESULT ORDER, EACH WITH THE POSITION A CURSOR
+        # RESUMES AFTER: [resource_id, value_dump, posting_id] WHERE SORTED
+        if plan.source == "postings" and self._streams_postings(
+            plan.index_filters, sort_key
+        ):
+            for resource_id in self._iter_packed_intersection(
+                plan.index_filters, position and position[0]
+            ):
+                yield resource_id, [resource_id]
+        elif plan.source == "postings":
+            # CHAINED POSTINGS ARE NOT IN RESOURCE ID ORDER, AND RANGES AND
+            # SORT KEYS ARE NOT EITHER, SO THEIR MATCHES ARE ALL COLLECTED AND
+            # SORTED FOR EVERY PAGE. THE PLANNER ONLY READS THEM WHEN THAT
+            # COSTS LESS THAN A WALK RESUMED FROM THE CURSOR
+            yield from self._sort_resource_ids(
+                self._filter_index_lookup(plan.index_filters),
+                sort_key,
+                sort_direction,
+                position,
+            )
+        elif plan.source == "sort_index":
+            yield from self._iter_sort_index(
+                self._hash(sort_key),
+                sort_direction,
+                self._comparable_bounds(plan.index_filters),
+                position,
+            )
+        elif plan.source == "composite":
+            yield from self._iter_sort_index(
+                self._composite_key_hash(plan.index_keys),
+                sort_direction,
+                self._composite_bounds(plan),
+                position,
+            )
+        elif sort_key:
+            yield from self._sort_resource_ids(
+                self._iter_resource_ids(), sort_key, sort_direction, position
+            )
+        else:
+            for resource_id in self._iter_resource_ids(position and position[0]):
+                yield resource_id, [resource_id]
+
+    def _streams_postings(self, index_filters: List[Filter], sort_key):
+        # PACKED POSTINGS ARE READ IN DESCENDING RESOURCE ID ORDER, WHICH IS THE
+        # ORDER OF AN UNSORTED PAGE
+        return (
+            not sort_key
+            and self.posting_format == "packed"
+            and all(f.operator == "eq" for f in index_filters)
+        )
+
+    def _iter_packed_intersection(self, filters: List[Filter], after=None):
+        # EACH FILTER MERGES THE POSTINGS OF ITS EQUIVALENT VALUES, AND THE
+        # FIRST, MOST SELECTIVE ONE DRIVES THE OTHERS FORWARD, SO ONLY THE
+        # BLOCKS UP TO THE LAST RESOURCE YIELDED ARE READ
+        streams = []
+
+        for f in filters:
+            if (value_dumps := equivalent_dumps(f.value)) is None:
+                raise ValueError(f"cannot read the postings of {f.value}")
+
+            key_hash = self._hash(f.key)
+            streams.append(
+                merge(
+                    *(
+                        map(
+                            int,
+                            self._iter_packed_filter_index(
+                                key_hash, self._hash(value_dump), after
+                            ),
+                        )
+                        for value_dump in value_dumps
+                    ),
+                    reverse=True,
+                )
+            )
+
+        others = streams[1:]
+        heads = [next(stream, None) for stream in others]
+
+        for resource_id in streams[0]:
+            for i, stream in enumerate(others):
+                head = heads[i]
+
+                while head is not None and head > resource_id:
+                    head = next(stream, None)
+
+                if head is None:
+                    return
+                heads[i] = head
+
+            if all(head == resource_id for head in heads):
+                yield str(resource_id)
+
+    def _count_equal(self, key, value):
+        # RESOURCES WHOSE VALUE FOR key EQUALS value, WHICH FOR null INCLUDES
+        # THOSE WITHOUT THE KEY, OR None WHEN THE VALUE CANNOT BE COUNTED
+        key_hash = self._hash(key)
+
+        if (value_dumps := equivalent_dumps(value)) is None or not self._posts(
+            key_hash
+        ):
+            return None
+        equal_count = sum(
+            self._retrieve_count(
+                self._prefix(key_hash, self._hash(value_dump)) + "count"
+            )
+            for value_dump in value_dumps
+        )
+
+        if self._matches_missing(Filter(key, value)):
+            equal_count += self._retrieve_count("count") - self._retrieve_count(
+                self.key_delim.join([key_hash, "count"])
+            )
+
+        return equal_count
+
+    def _retrieve_count(self, count_key):
+        return int(self.db.get(count_key, b"0").decode())
+
+    def _add_count(self, count_key, delta):
+        count = self._retrieve_count(count_key) + delta
+
+        if count:
+            self.db[count_key] = str(count).encode()
+        elif count_key in self.db:
+            del self.db[count_key]
+
+    def _count_postings(self, key_hash, value_hash, delta):
+        # RESOURCES HOLDING THE KEY, AND HOLDING IT WITH THIS VALUE, UNDER THE
+        # POSTINGS' LOCK
+        if self._counted:
+            with self._key_locks(key_hash):
+                self._add_count(self.key_delim.join([key_hash, "count"]), delta)
+            self._add_count(self._prefix(key_hash, value_hash) + "count", delta)
+
+    def _compile_filters(self, filters: List[Filter]) -> List[CompiledFilter]:
+        return [
+            CompiledFilter(
+                filter=f,
+                key_hash=self._hash(f.key),
+                compare=getattr(operator, f.operator),
+                comparable=parse_comparable_json(f.value),
+            )
+            for f in filters
+        ]
+
+    def _check_filters(self, resource_id, filters: List[Filter] = []):
+        return self._check_compiled_filters(resource_id, self._compile_filters(filters))
+
+    def _check_compiled_filters(self, resource_id, filters: List[CompiledFilter]):
+        # BLOB DOCUMENTS ARE READ ONCE AND RETURNED WHOLE
+        if self.storage == "blob":
+            document = self._retrieve_document(resource_id)
+
+            for f in filters:
+                value = document.get(f.filter.key)
+                if not f.compare(parse_comparable_json(value), f.comparable):
+                    return
+            return document
+
+        # ALL OF THE FILTERED VALUES ARE FETCHED IN ONE CALL ON BACKENDS WITH
+        # get_many, OTHERWISE ONE AT A TIME UNTIL A FILTER FAILS. STORED VALUES
+        # ARE COMPARED IN THEIR CACHED COMPARABLE FORM, AND ONLY DECODED ONCE
+        # ALL FILTERS PASS
+        values_encoded = iter_many(
+            self.db, [self.key_delim.join([resource_id, f.key_hash]) for f in filters]
+        )
+        matched_values_encoded = []
+
+        for f in filters:
+            value_encoded = next(values_encoded)
+            comparable = (
+                NULL_COMPARABLE
+                if value_encoded is None
+                else self._comparable(value_encoded)
+            )
+            if not f.compare(comparable, f.comparable):
+                return
+            matched_values_encoded.append(value_encoded)
+
+        return {
+            f.filter.key: None if value_encoded is None else self._loads(value_encoded)
+            for f, value_encoded in zip(filters, matched_values_encoded)
+        }
+
+    def _filter_index_lookup(self, filters: List[Filter]):
+        # INTERSECTS THE POSTINGS OF INDEXABLE filters, IN THE ORDER GIVEN
+        indexed_resource_ids = None
+
+        for f in filters:
+            if not self._is_indexable(f):
+                continue
+
+            key_hash = self._hash(f.key)
+
+            if f.operator == "eq":
+                # VALUES WHOSE DUMPS CANNOT BE LISTED ARE NOT INDEXABLE EITHER
+                if (value_dumps := equivalent_dumps(f.value)) is None:
+                    continue
+
+                resource_ids = set()
+
+                for value_dump in value_dumps:
+                    resource_ids.update(
+                        self._iter_filter_index(key_hash, self._hash(value_dump))
+                    )
+            else:
+                resource_ids = set(
+                    self._iter_sort_index_range(key_hash, f.operator, f.value)
+                )
+
+            if indexed_resource_ids is None:
+                indexed_resource_ids = resource_ids
+            else:
+                indexed_resource_ids &= resource_ids
+
+            if not indexed_resource_ids:
+                break
+
+        return indexed_resource_ids
+
+    def _is_indexable(self, f: Filter):
+        # RANGES ARE READ FROM THE KEY'S SORT INDEX, EQUALITY FROM ITS POSTINGS
+        key_hash = self._hash(f.key)
+
+        if f.operator in RANGE_OPERATORS:
+            if not self._reads_sort_index(key_hash):
+                return False
+        elif not self._posts(key_hash):
+            return False
+
+        return self._is_index_filter(f)
+
+    def _is_index_filter(self, f: Filter):
+        if f.operator == "ne" or self._matches_missing(f):
+            return False
+        return f.operator != "eq" or equivalent_dumps(f.value) is not None
+
+    def _matches_missing(self, f: Filter):
+        # RESOURCES WITHOUT THE KEY ARE ABSENT FROM ITS INDICES
+        return getattr(operator, f.operator)(
+            parse_comparable_json(None), parse_comparable_json(f.value)
+        )
+
+    def _sort_resource_ids(self, resource_ids, sort_key, sort_direction, position=None):
+        # TIES ARE ORDERED NEWEST FIRST IN BOTH DIRECTIONS
+        if not sort_key:
+            sorted_resource_ids = sorted(resource_ids, key=int, reverse=True)
+
+            if position:
+                sorted_resource_ids = [
+                    resource_id
+                    for resource_id in sorted_resource_ids
+                    if int(resource_id) < int(position[0])
+                ]
+
+            return [(resource_id, [resource_id]) for resource_id in sorted_resource_ids]
+
+        sort_key_hash = self._hash(sort_key)
+        sort_entries = []
+
+        for resource_id in resource_ids:
+            if self.storage == "blob":
+                document = self._retrieve_document(resource_id)
+                if sort_key not in document:
+                    continue
+                value_encoded = dumps(document[sort_key]).encode()
+            else:
+                value_encoded = self.db.get(
+                    self.key_delim.join([resource_id, sort_key_hash])
+                )
+
+                if value_encoded is None:
+                    continue
+
+            sort_entries.append(
+                (
+                    self._comparable(value_encoded),
+                    -int(resource_id) if sort_direction == "asc" else int(resource_id),
+                    resource_id,
+                    value_encoded,
+                )
+            )
+
+        sort_entries.sort(reverse=sort_direction == "desc")
+
+        if position and len(position) > 1:
+            resource_id, value_dump = position[:2]
+            cursor_entry = (
+                self._comparable(value_dump.encode()),
+                -int(resource_id) if sort_direction == "asc" else int(resource_id),
+            )
+            sort_entries = [
+                sort_entry
+                for sort_entry in sort_entries
+                if (
+                    sort_entry[:2] > cursor_entry
+                    if sort_direction == "asc"
+                    else sort_entry[:2] < cursor_entry
+                )
+            ]
+
+        return [
+            (resource_id, [resource_id, value_encoded.decode()])
+            for _, _, resource_id, value_encoded in sort_entries
+        ]
+
+    def _iter_resource_ids(self, after=None):
+        resource_id_encoded = self.db.get("head")
+
+        if after is not None:
+            # A DELETED RESOURCE HAS NO LINKS LEFT, SO FALL BACK TO SKIPPING
+            # THE NEWER IDS FROM THE HEAD
+            if resource_id_encoded == after.encode() or self.db.get(
+                self.key_delim.join([after, "prev"])
+            ):
+                resource_id_encoded = self.db.get(self.key_delim.join([after, "next"]))
+            else:
+                while resource_id_encoded and int(resource_id_encoded) >= int(after):
+                    resource_id_encoded = self.db.get(
+                        self.key_delim.join([resource_id_encoded.decode(), "next"])
+                    )
+
+        while resource_id_encoded:
+            resource_id = resource_id_encoded.decode()
+            yield resource_id
+
+            resource_id_encoded = self.db.get(
+                self.key_delim.join([resource_id, "next"])
+            )
+
+    def _iter_sort_index(
+        self,
+        key_hash,
+        sort_direction="asc",
+        bounds: List[tuple] = [],
+        position=None,
+    ):
+        # bounds ARE (operator, comparable) RANGES ON THE SORTED KEY, USED TO
+        # SEEK TO THE FIRST VALUE IN RANGE AND TO STOP AT THE LAST. A CURSOR
+        # position SEEKS PAST THEM
+        if sort_direction == "desc":
+            start_prop, link_prop = "head", "next"
+            start_operators, stop_operators = ["lt", "le"], ["gt", "ge"]
+        else:
+            start_prop, link_prop = "toe", "prev"
+            start_operators, stop_operators = ["gt", "ge"], ["lt", "le"]
+
+        value_encoded = self.db.get(self.key_delim.join([key_hash, start_prop]))
+
+        seek_bounds = [
+            (operator_name, comparable_bound)
+            for operator_name, comparable_bound in bounds
+            if operator_name in start_operators
+        ]
+        resume_value_dump = None
+
+        # ONLY THE TIGHTEST START BOUND IS SOUGHT, AS THE OTHERS ARE NOT
+        # CHECKED AGAIN: THE HIGHEST ASCENDING AND THE LOWEST DESCENDING, A
+        # STRICT BOUND BEFORE AN INCLUSIVE ONE ON THE SAME VALUE
+        if sort_direction == "desc":
+            seek_bounds.sort(key=lambda bound: (bound[1], bound[0] == "le"))
+        else:
+            seek_bounds.sort(
+                key=lambda bound: (bound[1], bound[0] == "gt"), reverse=True
+            )
+
+        if position and len(position) > 1:
+            resume_resource_id, resume_value_dump = position[:2]
+            resume_posting_id = position[2] if len(position) > 2 else None
+            seek_bounds = [
+                (
+                    "le" if sort_direction == "desc" else "ge",
+                    self._comparable(resume_value_dump.encode()),
+                )
+            ]
+
+            # A VALUE REMOVED SINCE IS RESUMED FROM THE FIRST EQUAL VALUE
+            if not self._sort_index_contains(key_hash, resume_value_dump):
+                resume_value_dump = None
+
+        for operator_name, comparable_bound in seek_bounds[:1]:
+            compare_func = operator.ge if operator_name in ["ge", "lt"] else operator.gt
+
+            predecessor_encoded, successor_encoded = self._search_sort_index(
+                key_hash, lambda leading: compare_func(leading, comparable_bound)
+            )[0]
+            value_encoded = (
+                successor_encoded if sort_direction == "desc" else predecessor_encoded
+            )
+
+        stop_bounds = [
+            (getattr(operator, operator_name), comparable_bound)
+            for operator_name, comparable_bound in bounds
+            if operator_name in stop_operators
+        ]
+
+        while value_encoded:
+            value_dump = value_encoded.decode()
+
+            if stop_bounds:
+                comparable_value = self._comparable(value_encoded)
+                if not all(
+                    compare_func(comparable_value, comparable_bound)
+                    for compare_func, comparable_bound in stop_bounds
+                ):
+                    return
+
+            value_hash = self._hash(value_dump)
+
+            if resume_value_dump is None:
+                postings = self._iter_postings(key_hash, value_hash)
+            elif value_dump == resume_value_dump:
+                postings = self._iter_postings(key_hash, value_hash, resume_posting_id)
+                if resume_posting_id is None:
+                    postings = (
+                        (resource_id, posting_id)
+                        for resource_id, posting_id in postings
+                        if int(resource_id) < int(resume_resource_id)
+                    )
+                resume_value_dump = None
+            else:
+                # EQUAL VALUES WALKED BEFORE THE CURSOR'S, SUCH AS 1 BEFORE 1.0
+                postings = iter(())
+
+            for resource_id, posting_id in postings:
+                yield resource_id, [resource_id, value_dump, posting_id]
+
+            value_encoded = self.db.get(
+                self._sort_link_key(key_hash, value_hash, link_prop, 0)
+            )
+
+    def _iter_sort_index_range(self, key_hash, operator_name, bound):
+        for value_hash in self._iter_sort_index_values(key_hash, operator_name, bound):
+            yield from self._iter_filter_index(key_hash, value_hash)
+
+    def _iter_sort_index_values(self, key_hash, operator_name, bound):
+        # WALK IN FROM THE END OF THE SORT INDEX THE RANGE IS OPEN TOWARDS
+        compare_func = getattr(operator, operator_name)
+        comparable_bound = parse_comparable_json(bound)
+
+        start_prop = "head" if operator_name in ["gt", "ge"] else "toe"
+        link_prop = "next" if operator_name in ["gt", "ge"] else "prev"
+
+        value_encoded = self.db.get(self.key_delim.join([key_hash, start_prop]))
+
+        while value_encoded:
+            value_dump = value_encoded.decode()
+
+            if not compare_func(self._comparable(value_encoded), comparable_bound):
+                return
+
+            value_hash = self._hash(value_dump)
+            yield value_hash
+
+            value_encoded = self.db.get(
+                self._sort_link_key(key_hash, value_hash, link_prop, 0)
+            )
+
+    def _iter_filter_index(self, key_hash, value_hash):
+        for resource_id, _ in self._iter_postings(key_hash, value_hash):
+            yield resource_id
+
+    def _iter_postings(self, key_hash, value_hash, after=None):
+        # RESOURCE IDS WITH THEIR POSTING IDS, WHICH DESCEND ALONG THE CHAIN,
+        # RESUMING AFTER A POSTING ID. PACKED POSTINGS ARE THEIR RESOURCE IDS
+        if self.posting_format == "packed":
+            for resource_id in self._iter_packed_filter_index(
+                key_hash, value_hash, after
+            ):
+                yield resource_id, resource_id
+            return
+
+        key_value_prefix = self._prefix(key_hash, value_hash)
+
+        if after is None:
+            key_value_id_encoded = self.db.get(key_value_prefix + "head")
+        elif self.db.get(key_value_prefix + after + self.key_delim + "value"):
+            key_value_id_encoded = self.db.get(
+                key_value_prefix + after + self.key_delim + "next"
+            )
+        else:
+            key_value_id_encoded = self.db.get(key_value_prefix + "head")
+
+            while key_value_id_encoded and int(key_value_id_encoded) >= int(after):
+                key_value_id_encoded = self.db.get(
+                    key_value_prefix
+                    + key_value_id_encoded.decode()
+                    + self.key_delim
+                    + "next"
+                )
+
+        while key_value_id_encoded:
+            key_value_id = key_value_id_encoded.decode()
+            key_value_id_prefix = key_value_prefix + key_value_id
+            resource_id_encoded = self.db.get(
+                key_value_id_prefix + self.key_delim + "value"
+            )
+
+            # A POSTING DELETED WHILE READERS WALK THE CHAIN IS SKIPPED
+            if resource_id_encoded:
+                yield resource_id_encoded.decode(), key_value_id
+
+            key_value_id_encoded = self.db.get(
+                key_value_id_prefix + self.key_delim + "next"
+            )
+
+    def _retrieve_resource(
+        self,
+        resource_id: str,
+        keys: Optional[List[str]] = None,
+        retrieved_values: JsonDict = {},
+    ):
+        return self._retrieve_resources([(resource_id, retrieved_values)], keys)[0]
+
+    def _retrieve_resources(self, matches, keys: Optional[List[str]] = None):
+        # matches ARE (resource_id, retrieved_values) PAIRS. EACH ROUND OF
+        # READS FOR THE WHOLE PAGE IS A SINGLE get_many CALL
+        resource_ids = [resource_id for resource_id, _ in matches]
+
+        if self.storage == "blob":
+            blobs = iter(
+                get_many(
+                    self.db,
+                    [
+                        self.key_delim.join([resource_id, "blob"])
+                        for resource_id, retrieved_values in matches
+                        if not retrieved_values
+                    ],
+                )
+            )
+            resources = []
+
+            for resource_id, retrieved_values in matches:
+                if not (document := retrieved_values):
+                    blob = next(blobs)
+                    document = self._loads(blob.decode()) if blob else {}
+
+                resource: JsonDict = {"id": resource_id}
+                if keys:
+                    resource.update({key: document.get(key) for key in keys})
+                else:
+                    resource.update(document)
+                resources.append(resource)
+
+            return resources
+
+        if keys:
+            resource_keys = [keys for _ in matches]
+        else:
+            # KEY IDS RUN FROM THE HEAD DOWN TO 0, EACH LINKED TO THE ONE BELOW
+            heads_encoded = get_many(
+                self.db,
+                [
+                    self.key_delim.join([resource_id, "head"])
+                    for resource_id in resource_ids
+                ],
+            )
+            key_id_keys = [
+                [
+                    self.key_delim.join([resource_id, str(key_id), "value"])
+                    for key_id in range(int(head_encoded.decode()), -1, -1)
+                ]
+                if head_encoded
+                else []
+                for resource_id, head_encoded in zip(resource_ids, heads_encoded)
+            ]
+            keys_encoded = iter(
+                get_many(self.db, [key for keys in key_id_keys for key in keys])
+            )
+            resource_keys = [
+                [
+                    key_encoded.decode()
+                    for key_encoded in [next(keys_encoded) for _ in keys]
+                    if key_encoded is not None
+                ]
+                for keys in key_id_keys
+            ]
+
+        values_encoded = iter(
+            get_many(
+                self.db,
+                [
+                    self.key_delim.join([resource_id, self._hash(key)])
+                    for (resource_id, retrieved_values), keys in zip(
+                        matches, resource_keys
+                    )
+                    for key in keys
+                    if key not in retrieved_values
+                ],
+            )
+        )
+        resources = []
+
+        for (resource_id, retrieved_values), keys in zip(matches, resource_keys):
+            resource = {"id": resource_id}
+
+            for key in keys:
+                if key in retrieved_values:
+                    resource[key] = retrieved_values[key]
+                elif (value_encoded := next(values_encoded)) is not None:
+                    resource[key] = self._loads(value_encoded.decode())
+                else:
+                    resource[key] = None
+
+            resources.append(resource)
+
+        return resources
+
+    def _iter_resource_keys(self, resource_id):
+        key_id_encoded = self.db.get(self.key_delim.join([resource_id, "head"]))
+
+        while key_id_encoded:
+            key_id = key_id_encoded.decode()
+
+            if (key := self._retrieve_key(resource_id, key_id)) is not None:
+                yield key
+
+            key_id_encoded = self.db.get(
+                self.key_delim.join([resource_id, key_id, "next"])
+            )
+
+    def _retrieve_key(self, resource_id, key_id):
+        key = self.db.get(self.key_delim.join([resource_id, key_id, "value"]))
+        if key is not None:
+            return key.decode()
+
+    def _retrieve_value(self, resource_id, key):
+        if self.storage == "blob":
+            return self._retrieve_document(resource_id).get(key)
+
+        key_hash = self._hash(key)
+        value = self.db.get(self.key_delim.join([resource_id, key_hash]))
+
+        if value is not None:
+            return self._loads(value.decode())
+
+    def _retrieve_present_values(self, resource_id, keys: List[str]) -> JsonDict:
+        # THE RESOURCE'S VALUES FOR THOSE OF keys IT HOLDS
+        if self.storage == "blob":
+            document = self._retrieve_document(resource_id)
+            return {key: document[key] for key in keys if key in document}
+
+        values_encoded = get_many(
+            self.db,
+            [self.key_delim.join([resource_id, self._hash(key)]) for key in keys],
+        )
+        return {
+            key: self._loads(value_encoded.decode())
+            for key, value_encoded in zip(keys, values_encoded)
+            if value_encoded is not None
+        }
+
+    def _retrieve_document(self, resource_id):
+        blob = self.db.get(self.key_delim.join([resource_id, "blob"]))
+        return self._loads(blob.decode()) if blob else {}
+
+    def _resource_id(self):
+        return self._resource_ids(1)[0]
+
+    def _resource_ids(self, count):
+        # IDS ARE HANDED OUT IN MEMORY, SO THREADS NEVER SHARE ONE, AND NEVER
+        # BELOW THOSE ALREADY LISTED, WHICH ANOTHER INDEXER MAY HAVE ADDED
+        with self._id_lock:
+            if self.id_lease_size is not None:
+                return self._leased_resource_ids(count)
+
+            head = int(self.db.get("head", b"-1").decode())
+            first_resource_id = max(head + 1, self._next_resource_id)
+            self._next_resource_id = first_resource_id + count
+
+        return [str(first_resource_id + offset) for offset in range(count)]
+
+    def _leased_resource_ids(self, count):
+        resource_ids: List[str] = []
+
+        while len(resource_ids) < count:
+            if self._next_resource_id >= self._lease_end:
+                self._next_resource_id, self._lease_end = self._lease_resource_ids(
+                    max(self.id_lease_size, count - len(resource_ids))
+                )
+
+            taken = min(
+                count - len(resource_ids), self._lease_end - self._next_resource_id
+            )
+            resource_ids.extend(
+                str(self._next_resource_id + offset) for offset in range(taken)
+            )
+            self._next_resource_id += taken
+
+        return resource_ids
+
+    def _lease_resource_ids(self, size):
+        # THE LEASE KEY HOLDS THE FIRST ID NOT YET LEASED. IT IS MOVED WITH
+        # THE BACKEND'S compare_and_set, RETRYING IF ANOTHER PROCESS MOVED IT
+        # FIRST. IT IS WRITTEN STRAIGHT TO THE STORE, EVEN INSIDE A BATCH
+        while True:
+            lease_encoded = self._store.get("lease")
+
+            if lease_encoded:
+                start = int(lease_encoded.decode())
+            else:
+                start = int(self._store.get("head", b"-1").decode()) + 1
+
+            if compare_and_set(
+                self._store, "lease", lease_encoded, str(start + size).encode()
+            ):
+                return start, start + size
+
+    @contextmanager
+    def _list_transaction(self):
+        # THE RESOURCE LIST IS READ AND REWRITTEN IN PLACE, SO OTHER PROCESSES
+        # ARE HELD OFF BY THE BACKEND'S TRANSACTION WHEN IT HAS ONE. INSIDE A
+        # BATCH THE FLUSH RUNS IN ONE INSTEAD
+        transaction = getattr(self._store, "transaction", None)
+
+        with self._list_lock:
+            if transaction is None or isinstance(self.db, WriteBatch):
+                yield
+            else:
+                with transaction():
+                    yield
+
+    def _link_resource_ids(self, resource_ids):
+        # THE LIST RUNS FROM THE NEWEST ID AT THE HEAD. AN ID LINKED AFTER A
+        # NEWER ONE, BY ANOTHER THREAD OR PROCESS, IS INSERTED BEHIND IT
+        with self._list_transaction():
+            head_encoded = self.db.get("head")
+
+            for resource_id in resource_ids:
+                resource_id_encoded = resource_id.encode()
+
+                if not head_encoded or int(head_encoded) < int(resource_id):
+                    prev_encoded, next_encoded = None, head_encoded
+                else:
+                    prev_encoded = head_encoded
+                    next_encoded = self.db.get(
+                        self.key_delim.join([prev_encoded.decode(), "next"])
+                    )
+
+                    while next_encoded and int(next_encoded) > int(resource_id):
+                        prev_encoded = next_encoded
+                        next_encoded = self.db.get(
+                            self.key_delim.join([prev_encoded.decode(), "next"])
+                        )
+
+                if next_encoded:
+                    self.db[self.key_delim.join([resource_id, "next"])] = next_encoded
+                    self.db[
+                        self.key_delim.join([next_encoded.decode(), "prev"])
+                    ] = resource_id_encoded
+
+                if prev_encoded:
+                    self.db[self.key_delim.join([resource_id, "prev"])] = prev_encoded
+                    self.db[
+                        self.key_delim.join([prev_encoded.decode(), "next"])
+                    ] = resource_id_encoded
+                else:
+                    head_encoded = resource_id_encoded
+
+                if self._segmented:
+                    segment_key = self._segment_key(resource_id)
+                    segment_encoded = self.db.get(segment_key)
+
+                    if not segment_encoded or int(segment_encoded) < int(resource_id):
+                        self.db[segment_key] = resource_id_encoded
+
+            if resource_ids:
+                self.db["head"] = head_encoded
+
+                if self._counted:
+                    self._add_count("count", len(resource_ids))
+
+    def _unlink_resource_id(self, resource_id, resource_id_encoded):
+        with self._list_transaction():
+            next_key = self.key_delim.join([resource_id, "next"])
+            prev_key = self.key_delim.join([resource_id, "prev"])
+
+            next_encoded = self.db.get(next_key)
+            prev_encoded = self.db.get(prev_key)
+
+            if not prev_encoded and self.db.get("head") != resource_id_encoded:
+                # STORES WRITTEN BEFORE PREV LINKS EXISTED, SEE migrate
+                prev_encoded = self._find_prev_resource_id(resource_id)
+
+                if not prev_encoded:
+                    return False
+
+            if prev_encoded:
+                prev_next_key = self.key_delim.join([prev_encoded.decode(), "next"])
+                if next_encoded:
+                    self.db[prev_next_key] = next_encoded
+                else:
+                    del self.db[prev_next_key]
+                if prev_key in self.db:
+                    del self.db[prev_key]
+            elif next_encoded:
+                self.db["head"] = next_encoded
+            else:
+                del self.db["head"]
+
+            if next_encoded:
+                next_prev_key = self.key_delim.join([next_encoded.decode(), "prev"])
+                if prev_encoded:
+                    self.db[next_prev_key] = prev_encoded
+                elif next_prev_key in self.db:
+                    del self.db[next_prev_key]
+                del self.db[next_key]
+
+            # A SEGMENT WHOSE NEWEST ID GOES STARTS AT THE NEXT ONE, IF THAT IS
+            # STILL IN IT
+            if self._segmented:
+                segment_key = self._segment_key(resource_id)
+
+                if self.db.get(segment_key) == resource_id_encoded:
+                    if next_encoded and self._segment_key(next_encoded) == segment_key:
+                        self.db[segment_key] = next_encoded
+                    else:
+                        del self.db[segment_key]
+
+            return True
+
+    def _segment_key(self, resource_id):
+        # THE NEWEST LISTED ID OF EACH SEGMENT OF segment_size IDS
+        return self.key_delim.join(
+            ["segment", str(int(resource_id) // self.segment_size)]
+        )
+
+    def _find_prev_resource_id(self, resource_id):
+        lagging_resource_id = None
+
+        for retreived_resource_id in self._iter_resource_ids():
+            if retreived_resource_id == resource_id:
+                return lagging_resource_id and lagging_resource_id.encode()
+
+            lagging_resource_id = retreived_resource_id
+
+    def _create_entries(self, resource_id, resource):
+        if self.storage == "blob":
+            self.db[self.key_delim.join([resource_id, "blob"])] = dumps(
+                resource
+            ).encode()
+
+            for key, value in resource.items():
+                if self._posts(key_hash := self._hash(key)):
+                    value_dump = dumps(value)
+                    yield key_hash, self._hash(value_dump), value_dump.encode(), value
+            return
+
+        self.db[self.key_delim.join([resource_id, "head"])] = str(
+            len(resource) - 1
+        ).encode()
+
+        for index, (key, value) in enumerate(resource.items()):
+            value_dump = dumps(value)
+            encoded_value_dump = value_dump.encode()
+
+            key_hash = self._hash(key)
+
+            self.db[self.key_delim.join([resource_id, key_hash])] = encoded_value_dump
+
+            self._create_key_index(resource_id, index, key)
+
+            # KEYS THE SCHEMA LEAVES OUT ARE ONLY STORED
+            if self._posts(key_hash):
+                yield key_hash, self._hash(value_dump), encoded_value_dump, value
+
+    def _composite_entries(self, values: JsonDict, composite_indexes=None):
+        # EACH COMPOSITE INDEX IS INDEXED LIKE A KEY WHOSE VALUE IS THE LIST OF
+        # THE RESOURCE'S VALUES FOR ITS KEYS, FOR RESOURCES HOLDING THEM ALL
+        if composite_indexes is None:
+            composite_indexes = self.composite_indexes
+
+        for keys in composite_indexes:
+            if all(key in values for key in keys):
+                value = [values[key] for key in keys]
+                value_dump = dumps(value)
+                yield self._composite_key_hash(keys), self._hash(
+                    value_dump
+                ), value_dump.encode(), value
+
+    def _composite_key_hash(self, keys):
+        return self.key_delim.join(["composite", self._hash(dumps(list(keys)))])
+
+    def _composite_keys(self, composite_indexes):
+        return list({key: None for keys in composite_indexes for key in keys})
+
+    def _posts(self, key_hash):
+        # WHETHER THE SCHEMA GIVES THE KEY POSTINGS. COMPOSITE INDEXES ALWAYS
+        # HAVE THEM, AND A SORT INDEX
+        return (
+            self._posted_key_hashes is None
+            or key_hash in self._posted_key_hashes
+            or key_hash.startswith(self._prefix("composite"))
+        )
+
+    def _sorts(self, key_hash):
+        return (
+            self._sorted_key_hashes is None
+            or key_hash in self._sorted_key_hashes
+            or key_hash.startswith(self._prefix("composite"))
+        )
+
+    def _reads_sort_index(self, key_hash):
+        # UNMIGRATED STORES ARE SCANNED AND SORTED IN MEMORY INSTEAD
+        return self._counted and self._sorts(key_hash)
+
+    def _update_composite_entries(self, resource_id, resource_id_encoded, update):
+        # ONLY THE COMPOSITE INDEXES SHARING A KEY WITH THE UPDATE, AND WHOSE
+        # VALUES CHANGE, ARE TOUCHED. UPDATES NEVER REMOVE KEYS, SO EVERY
+        # CURRENT ENTRY HAS A NEW ONE
+        composite_indexes = [
+            keys
+            for keys in self.composite_indexes
+            if not update.keys().isdisjoint(keys)
+        ]
+
+        if not composite_indexes:
+            return
+
+        current_values = self._retrieve_present_values(
+            resource_id, self._composite_keys(composite_indexes)
+        )
+        current_value_hashes = {
+            key_hash: value_hash
+            for key_hash, value_hash, _, _ in self._composite_entries(
+                current_values, composite_indexes
+            )
+        }
+
+        for key_hash, value_hash, encoded_value_dump, value in self._composite_entries(
+            {**current_values, **update}, composite_indexes
+        ):
+            current_value_hash = current_value_hashes.get(key_hash)
+
+            if current_value_hash == value_hash:
+                continue
+
+            if current_value_hash is not None:
+                self._delete_filter_index(
+                    key_hash, current_value_hash, resource_id_encoded
+                )
+            self._create_filter_index(
+                key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+            )
+
+    def _create_key_index(self, resource_id, key_index, key):
+        resource_key_id = str(key_index)
+        self.db[
+            self.key_delim.join([resource_id, resource_key_id, "value"])
+        ] = key.encode()
+
+        if key_index > 0:
+            self.db[self.key_delim.join([resource_id, resource_key_id, "next"])] = str(
+                key_index - 1
+            ).encode()
+
+    def _create_filter_index(
+        self, key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+    ):
+        if not self._posts(key_hash):
+            return
+
+        with self._posting_locks(key_hash, value_hash):
+            self._count_postings(key_hash, value_hash, 1)
+
+            if self.posting_format == "packed":
+                return self._create_packed_filter_index(
+                    key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+                )
+
+            key_value_prefix = self._prefix(key_hash, value_hash)
+            key_value_head_key = key_value_prefix + "head"
+            key_value_head_encoded = self.db.get(key_value_head_key, b"-1")
+            key_value_head = int(key_value_head_encoded.decode())
+
+            if key_value_head == -1:
+                self._create_sort_index(key_hash, value_hash, encoded_value_dump, value)
+
+            key_value_id = str(key_value_head + 1)
+            key_value_id_prefix = key_value_prefix + key_value_id + self.key_delim
+            self.db[key_value_id_prefix + "value"] = resource_id_encoded
+            self.db[
+                self._posting_id_key(resource_id_encoded, key_hash)
+            ] = key_value_id.encode()
+
+            if key_value_head >= 0:
+                self.db[key_value_id_prefix + "next"] = key_value_head_encoded
+                self.db[
+                    key_value_prefix
+                    + key_value_head_encoded.decode()
+                    + self.key_delim
+                    + "prev"
+                ] = key_value_id.encode()
+
+            self.db[key_value_head_key] = key_value_id.encode()
+
+    def _create_filter_index_many(self, key_hash, value_hash, resource_ids_encoded):
+        # APPENDS NEWER RESOURCES TO A POSTING LIST WITHOUT TOUCHING THE SORT
+        # INDEX, RETURNING WHETHER THE LIST WAS EMPTY
+        if not self._posts(key_hash):
+            return False
+
+        with self._posting_locks(key_hash, value_hash):
+            self._count_postings(key_hash, value_hash, len(resource_ids_encoded))
+
+            if self.posting_format == "packed":
+                return self._create_packed_filter_index_many(
+                    key_hash, value_hash, resource_ids_encoded
+                )
+
+            key_value_prefix = self._prefix(key_hash, value_hash)
+            key_value_head_key = key_value_prefix + "head"
+            key_value_head = int(self.db.get(key_value_head_key, b"-1").decode())
+
+            for offset, resource_id_encoded in enumerate(resource_ids_encoded):
+                key_value_id = key_value_head + offset + 1
+                key_value_id_prefix = (
+                    key_value_prefix + str(key_value_id) + self.key_delim
+                )
+                self.db[key_value_id_prefix + "value"] = resource_id_encoded
+                self.db[self._posting_id_key(resource_id_encoded, key_hash)] = str(
+                    key_value_id
+                ).encode()
+
+                if key_value_id > 0:
+                    self.db[key_value_id_prefix + "next"] = str(
+                        key_value_id - 1
+                    ).encode()
+                    self.db[
+                        key_value_prefix
+                        + str(key_value_id - 1)
+                        + self.key_delim
+                        + "prev"
+                    ] = str(key_value_id).encode()
+
+            self.db[key_value_head_key] = str(
+                key_value_head + len(resource_ids_encoded)
+            ).encode()
+
+            return key_value_head == -1
+
+    def _delete_filter_index(self, key_hash, value_hash, resource_id_encoded):
+        if not self._posts(key_hash):
+            return
+
+        with self._posting_locks(key_hash, value_hash):
+            if self.posting_format == "packed":
+                deleted = self._delete_packed_filter_index(
+                    key_hash, value_hash, resource_id_encoded
+                )
+            else:
+                deleted = self._delete_chain_filter_index(
+                    key_hash, value_hash, resource_id_encoded
+                )
+
+            if deleted:
+                self._count_postings(key_hash, value_hash, -1)
+
+    def _delete_chain_filter_index(self, key_hash, value_hash, resource_id_encoded):
+        # EACH RESOURCE KEEPS ITS POSTING ID AND EACH POSTING A PREV LINK, SO
+        # THE POSTING IS UNLINKED IN PLACE. POSTINGS WRITTEN BEFORE THEY
+        # EXISTED ARE FOUND BY WALKING THE CHAIN, SEE migrate
+        key_value_prefix = self._prefix(key_hash, value_hash)
+        posting_id_key = self._posting_id_key(resource_id_encoded, key_hash)
+
+        if key_value_id_encoded := self.db.get(posting_id_key):
+            del self.db[posting_id_key]
+            key_value_id = key_value_id_encoded.decode()
+            key_value_id_prefix = key_value_prefix + key_value_id + self.key_delim
+
+            # ONLY THE HEAD HAS NO PREV LINK
+            if prev_key_value_id_encoded := self.db.get(key_value_id_prefix + "prev"):
+                del self.db[key_value_id_prefix + "prev"]
+        else:
+            key_value_id, prev_key_value_id_encoded = self._find_posting(
+                key_value_prefix, resource_id_encoded
+            )
+
+            if key_value_id is None:
+                return False
+
+            key_value_id_prefix = key_value_prefix + key_value_id + self.key_delim
+
+            if key_value_id_prefix + "prev" in self.db:
+                del self.db[key_value_id_prefix + "prev"]
+
+        next_key_value_id_encoded = self.db.get(key_value_id_prefix + "next")
+
+        if prev_key_value_id_encoded:
+            prev_next_key = (
+                key_value_prefix
+                + prev_key_value_id_encoded.decode()
+                + self.key_delim
+                + "next"
+            )
+            if next_key_value_id_encoded:
+                self.db[prev_next_key] = next_key_value_id_encoded
+            else:
+                del self.db[prev_next_key]
+        elif next_key_value_id_encoded:
+            self.db[key_value_prefix + "head"] = next_key_value_id_encoded
+        else:
+            del self.db[key_value_prefix + "head"]
+            self._delete_sort_index(key_hash, value_hash)
+
+        if next_key_value_id_encoded:
+            next_prev_key = (
+                key_value_prefix
+                + next_key_value_id_encoded.decode()
+                + self.key_delim
+                + "prev"
+            )
+            if prev_key_value_id_encoded:
+                self.db[next_prev_key] = prev_key_value_id_encoded
+            elif next_prev_key in self.db:
+                del self.db[next_prev_key]
+            del self.db[key_value_id_prefix + "next"]
+
+        del self.db[key_value_id_prefix + "value"]
+
+        return True
+
+    def _link_postings(self, key_hash, value_hash):
+        # WRITES THE POSTING IDS AND PREV LINKS OF A CHAIN WRITTEN WITHOUT THEM
+        key_value_prefix = self._prefix(key_hash, value_hash)
+        lagging_key_value_id_encoded = None
+
+        for resource_id, key_value_id in self._iter_postings(key_hash, value_hash):
+            self.db[
+                self._posting_id_key(resource_id.encode(), key_hash)
+            ] = key_value_id.encode()
+
+            if lagging_key_value_id_encoded:
+                self.db[
+                    key_value_prefix + key_value_id + self.key_delim + "prev"
+                ] = lagging_key_value_id_encoded
+
+            lagging_key_value_id_encoded = key_value_id.encode()
+
+    def _find_posting(self, key_value_prefix, resource_id_encoded):
+        # THE POSTING ID OF A RESOURCE, AND THAT OF THE POSTING BEFORE IT
+        lagging_key_value_id_encoded = None
+        key_value_id_encoded = self.db.get(key_value_prefix + "head")
+
+        while key_value_id_encoded:
+            key_value_id_prefix = (
+                key_value_prefix + key_value_id_encoded.decode() + self.key_delim
+            )
+
+            if self.db.get(key_value_id_prefix + "value") == resource_id_encoded:
+                return key_value_id_encoded.decode(), lagging_key_value_id_encoded
+
+            lagging_key_value_id_encoded = key_value_id_encoded
+            key_value_id_encoded = self.db.get(key_value_id_prefix + "next")
+
+        return None, None
+
+    def _posting_id_key(self, resource_id_encoded, key_hash):
+        return self.key_delim.join([resource_id_encoded.decode(), key_hash, "posting"])
+
+    def _iter_packed_filter_index(self, key_hash, value_hash, after=None):
+        for first_id, block_id in reversed(
+            self._retrieve_posting_directory(key_hash, value_hash)
+        ):
+            if after is not None and first_id >= int(after):
+                continue
+
+            for resource_id in reversed(
+                self._retrieve_posting_block(key_hash, value_hash, block_id)
+            ):
+                if after is None or resource_id < int(after):
+                    yield str(resource_id)
+
+    def _create_packed_filter_index(
+        self, key_hash, value_hash, resource_id_encoded, encoded_value_dump, value
+    ):
+        directory = self._retrieve_posting_directory(key_hash, value_hash)
+        resource_id = int(resource_id_encoded.decode())
+
+        if not directory:
+            self._create_sort_index(key_hash, value_hash, encoded_value_dump, value)
+
+            self._store_posting_block(key_hash, value_hash, 0, [resource_id])
+            self._store_posting_directory(key_hash, value_hash, [[resource_id, 0]])
+            return
+
+        index = self._posting_block_index(directory, resource_id)
+        first_id, block_id = directory[index]
+
+        block = self._retrieve_posting_block(key_hash, value_hash, block_id)
+        insort(block, resource_id)
+
+        directory_changed = block[0] != first_id
+        directory[index][0] = block[0]
+
+        if len(block) > self.posting_block_size:
+            # APPENDS START A FRESH BLOCK, INSERTS IN THE MIDDLE SPLIT IN HALF
+            split = len(block) - 1 if block[-1] == resource_id else len(block) // 2
+            new_block_id = max(block_id for _, block_id in directory) + 1
+
+            self._store_posting_block(key_hash, value_hash, new_block_id, block[split:])
+            directory.insert(index + 1, [block[split], new_block_id])
+            block = block[:split]
+            directory_changed = True
+
+        self._store_posting_block(key_hash, value_hash, block_id, block)
+
+        if directory_changed:
+            self._store_posting_directory(key_hash, value_hash, directory)
+
+    def _create_packed_filter_index_many(
+        self, key_hash, value_hash, resource_ids_encoded
+    ):
+        directory = self._retrieve_posting_directory(key_hash, value_hash)
+        resource_ids = sorted(int(encoded.decode()) for encoded in resource_ids_encoded)
+        created = not directory
+
+        if directory:
+            block_id = directory[-1][1]
+            block = self._retrieve_posting_block(key_hash, value_hash, block_id)
+
+            if block[-1] > resource_ids[0]:
+                for resource_id_encoded in resource_ids_encoded:
+                    self._create_packed_filter_index(
+                        key_hash, value_hash, resource_id_encoded, None, None
+                    )
+                return False
+        else:
+            block_id, block = 0, []
+            directory.append([resource_ids[0], block_id])
+
+        block.extend(resource_ids)
+        next_block_id = max(block_id for _, block_id in directory) + 1
+
+        while len(block) > self.posting_block_size:
+            self._store_posting_block(
+                key_hash, value_hash, block_id, block[: self.posting_block_size]
+            )
+            block = block[self.posting_block_size :]
+            block_id, next_block_id = next_block_id, next_block_id + 1
+            directory.append([block[0], block_id])
+
+        self._store_posting_block(key_hash, value_hash, block_id, block)
+        self._store_posting_directory(key_hash, value_hash, directory)
+
+        return created
+
+    def _delete_packed_filter_index(self, key_hash, value_hash, resource_id_encoded):
+        directory = self._retrieve_posting_directory(key_hash, value_hash)
+        resource_id = int(resource_id_encoded.decode())
+
+        if not directory:
+            return
+
+        index = self._posting_block_index(directory, resource_id)
+        first_id, block_id = directory[index]
+
+        block = self._retrieve_posting_block(key_hash, value_hash, block_id)
+        position = bisect_left(block, resource_id)
+
+        if position == len(block) or block[position] != resource_id:
+            return False
+
+        del block[position]
+
+        if block:
+            self._store_posting_block(key_hash, value_hash, block_id, block)
+
+            if position == 0:
+                directory[index][0] = block[0]
+                self._store_posting_directory(key_hash, value_hash, directory)
+
+            return True
+
+        del self.db[self.key_delim.join([key_hash, value_hash, str(block_id), "block"])]
+        del directory[index]
+
+        if directory:
+            self._store_posting_directory(key_hash, value_hash, directory)
+        else:
+            del self.db[self.key_delim.join([key_hash, value_hash, "blocks"])]
+            self._delete_sort_index(key_hash, value_hash)
+
+        return True
+
+    def _posting_block_index(self, directory, resource_id):
+        return max(
+            bisect_right([first_id for first_id, _ in directory], resource_id) - 1, 0
+        )
+
+    def _retrieve_posting_directory(self, key_hash, value_hash):
+        # [FIRST RESOURCE ID, BLOCK ID] PER BLOCK, FIRST IDS AS DELTAS
+        directory_encoded = self.db.get(
+            self.key_delim.join([key_hash, value_hash, "blocks"])
+        )
+
+        if not directory_encoded:
+            return []
+
+        values = decode_varints(directory_encoded)
+        directory = []
+        first_id = 0
+
+        for delta, block_id in zip(values[::2], values[1::2]):
+            first_id += delta
+            directory.append([first_id, block_id])
+
+        return directory
+
+    def _store_posting_directory(self, key_hash, value_hash, directory):
+        values = []
+        lagging_first_id = 0
+
+        for first_id, block_id in directory:
+            values.extend([first_id - lagging_first_id, block_id])
+            lagging_first_id = first_id
+
+        self.db[self.key_delim.join([key_hash, value_hash, "blocks"])] = encode_varints(
+            values
+        )
+
+    def _retrieve_posting_block(self, key_hash, value_hash, block_id):
+        return unpack_ids(
+            self.db.get(
+                self.key_delim.join([key_hash, value_hash, str(block_id), "block"])
+            )
+        )
+
+    def _store_posting_block(self, key_hash, value_hash, block_id, block):
+        self.db[
+            self.key_delim.join([key_hash, value_hash, str(block_id), "block"])
+        ] = pack_ids(block)
+
+    def _create_sort_index(
+        self, key_hash, value_hash, encoded_value_dump, value, finger=None
+    ):
+        # SKIP LIST OVER THE KEY'S DISTINCT VALUES, HIGHEST VALUE AT THE HEAD.
+        # LEVEL 0 IS THE FULL PREV/NEXT CHAIN, HIGHER LEVELS ARE EXPRESS LANES.
+        # RETURNS A FINGER TO SPEED UP INSERTING A LOWER VALUE NEXT
+        if not self._sorts(key_hash):
+            return None
+
+        with self._key_locks(key_hash):
+            comparable_value = parse_comparable_json(value)
+            height = self._sort_index_height(value_hash)
+
+            top_encoded = self.db.get(self.key_delim.join([key_hash, "height"]))
+            top = int(top_encoded.decode()) if top_encoded else 0
+
+            links = self._search_sort_index(
+                key_hash, lambda leading: leading > comparable_value, top, finger
+            )
+
+            for level in range(height + 1):
+                predecessor_encoded, successor_encoded = (
+                    links[level] if level <= top else (None, None)
+                )
+
+                if successor_encoded:
+                    self.db[
+                        self._sort_link_key(key_hash, value_hash, "next", level)
+                    ] = successor_encoded
+                    self.db[
+                        self._sort_link_key(
+                            key_hash,
+                            self._hash(successor_encoded.decode()),
+                            "prev",
+                            level,
+                        )
+                    ] = encoded_value_dump
+                elif level == 0:
+                    self.db[self.key_delim.join([key_hash, "toe"])] = encoded_value_dump
+
+                if predecessor_encoded:
+                    self.db[
+                        self._sort_link_key(key_hash, value_hash, "prev", level)
+                    ] = predecessor_encoded
+                    self.db[
+                        self._sort_link_key(
+                            key_hash,
+                            self._hash(predecessor_encoded.decode()),
+                            "next",
+                            level,
+                        )
+                    ] = encoded_value_dump
+                else:
+                    self.db[self._sort_head_key(key_hash, level)] = encoded_value_dump
+
+            if height > top:
+                self.db[self.key_delim.join([key_hash, "height"])] = str(
+                    height
+                ).encode()
+
+            return {
+                level: encoded_value_dump if level <= height else links[level][0]
+                for level in range(max(top, height) + 1)
+            }
+
+    def _delete_sort_index(self, key_hash, value_hash):
+        if not self._sorts(key_hash):
+            return
+
+        with self._key_locks(key_hash):
+            for level in range(self._sort_index_height(value_hash) + 1):
+                prev_key = self._sort_link_key(key_hash, value_hash, "prev", level)
+                next_key = self._sort_link_key(key_hash, value_hash, "next", level)
+                head_key = self._sort_head_key(key_hash, level)
+
+                prev_encoded_value_dump = self.db.get(prev_key)
+                next_encoded_value_dump = self.db.get(next_key)
+
+                if not prev_encoded_value_dump and level > 0:
+                    head_encoded_value_dump = self.db.get(head_key)
+
+                    # VALUES INSERTED BEFORE THE SKIP LIST ONLY SIT ON LEVEL 0
+                    if (
+                        not head_encoded_value_dump
+                        or self._hash(head_encoded_value_dump.decode()) != value_hash
+                    ):
+                        return
+
+                if prev_encoded_value_dump:
+                    prev_next_key = self._sort_link_key(
+                        key_hash,
+                        self._hash(prev_encoded_value_dump.decode()),
+                        "next",
+                        level,
+                    )
+                    if next_encoded_value_dump:
+                        self.db[prev_next_key] = next_encoded_value_dump
+                    else:
+                        del self.db[prev_next_key]
+                    del self.db[prev_key]
+                elif next_encoded_value_dump:
+                    self.db[head_key] = next_encoded_value_dump
+                else:
+                    del self.db[head_key]
+
+                if next_encoded_value_dump:
+                    next_prev_key = self._sort_link_key(
+                        key_hash,
+                        self._hash(next_encoded_value_dump.decode()),
+                        "prev",
+                        level,
+                    )
+                    if prev_encoded_value_dump:
+                        self.db[next_prev_key] = prev_encoded_value_dump
+                    else:
+                        del self.db[next_prev_key]
+                    del self.db[next_key]
+                elif level == 0:
+                    toe_key = self.key_delim.join([key_hash, "toe"])
+                    if prev_encoded_value_dump:
+                        self.db[toe_key] = prev_encoded_value_dump
+                    else:
+                        del self.db[toe_key]
+
+                        height_key = self.key_delim.join([key_hash, "height"])
+                        if height_key in self.db:
+                            del self.db[height_key]
+
+    def _search_sort_index(self, key_hash, precedes, top=None, finger=None):
+        # FOR EVERY LEVEL, THE LAST VALUE FOR WHICH precedes HOLDS AND THE ONE
+        # AFTER IT, WHERE precedes MUST HOLD FOR A PREFIX OF THE CHAIN. A FINGER
+        # HOLDS VALUES PER LEVEL KNOWN TO PRECEDE, TO START THE WALK FROM
+        if top is None:
+            top_encoded = self.db.get(self.key_delim.join([key_hash, "height"]))
+            top = int(top_encoded.decode()) if top_encoded else 0
+
+        links = {}
+        predecessor_encoded = None
+
+        for level in range(top, -1, -1):
+            finger_encoded = finger.get(level) if finger else None
+
+            if finger_encoded and (
+                not predecessor_encoded
+                or self._comparable(finger_encoded)
+                < self._comparable(predecessor_encoded)
+            ):
+                predecessor_encoded = finger_encoded
+
+            if predecessor_encoded:
+                successor_encoded = self.db.get(
+                    self._sort_link_key(
+                        key_hash,
+                        self._hash(predecessor_encoded.decode()),
+                        "next",
+                        level,
+                    )
+                )
+            else:
+                successor_encoded = self.db.get(self._sort_head_key(key_hash, level))
+
+            while successor_encoded and precedes(self._comparable(successor_encoded)):
+                predecessor_encoded = successor_encoded
+                successor_encoded = self.db.get(
+                    self._sort_link_key(
+                        key_hash,
+                        self._hash(predecessor_encoded.decode()),
+                        "next",
+                        level,
+                    )
+                )
+
+            links[level] = (predecessor_encoded, successor_encoded)
+
+        return links
+
+    def _rebuild_sort_index(self, key_hash, encoded_value_dumps):
+        self._clear_sort_index(key_hash)
+
+        for encoded_value_dump in sorted(
+            encoded_value_dumps,
+            key=self._comparable,
+            reverse=True,
+        ):
+            value_dump = encoded_value_dump.decode()
+            self._create_sort_index(
+                key_hash, self._hash(value_dump), encoded_value_dump, loads(value_dump)
+            )
+
+    def _clear_sort_index(self, key_hash):
+        head_key = self.key_delim.join([key_hash, "head"])
+
+        while head_encoded := self.db.get(head_key):
+            self._delete_sort_index(key_hash, self._hash(head_encoded.decode()))
+
+    def _sort_index_contains(self, key_hash, value_dump):
+        value_hash = self._hash(value_dump)
+        return bool(
+            self.db.get(self._sort_link_key(key_hash, value_hash, "next", 0))
+            or self.db.get(self._sort_link_key(key_hash, value_hash, "prev", 0))
+            or self.db.get(self._sort_head_key(key_hash, 0)) == value_dump.encode()
+        )
 
-            del self.db[toe_key]
-            del self.db[head_key]
+    def _sort_index_height(self, value_hash):
+        # EACH LEVEL HOLDS A QUARTER OF THE ONE BELOW IT
+        height = 0
+        while height < MAX_SORT_INDEX_HEIGHT and value_hash[height] in "0123":
+            height += 1
+        return height
+
+    def _sort_link_key(self, key_hash, value_hash, link_prop, level):
+        if level:
+            return self._prefix(key_hash, value_hash, link_prop) + str(level)
+        return self._prefix(key_hash, value_hash) + link_prop
+
+    def _sort_head_key(self, key_hash, level):
+        if level:
+            return self.key_delim.join([key_hash, "head", str(level)])
+        return self.key_delim.join([key_hash, "head"])
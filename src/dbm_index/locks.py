@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from threading import Condition, RLock, get_ident
+
+
+class StripedLock:
+    """A fixed set of reentrant locks, picked by hashing what they guard."""
+
+    def __init__(self, stripes=64):
+        self.locks = [RLock() for _ in range(stripes)]
+
+    def __call__(self, *parts):
+        return self.locks[hash(parts) % len(self.locks)]
+
+
+class SharedLock:
+    """Held shared by any number of threads, or exclusively by one.
+
+    The exclusive holder may also take it shared, and again exclusively.
+    Threads waiting for it exclusively hold off new shared holders.
+    """
+
+    def __init__(self):
+        self.condition = Condition()
+        self.shared_count = 0
+        self.waiting = 0
+        self.owner = None
+        self.depth = 0
+
+    @contextmanager
+    def shared(self):
+        with self.condition:
+            if self.owner == get_ident():
+                owned = True
+            else:
+                owned = False
+                self.condition.wait_for(lambda: self.owner is None and not self.waiting)
+                self.shared_count += 1
+
+        try:
+            yield
+        finally:
+            if not owned:
+                with self.condition:
+                    self.shared_count -= 1
+                    if not self.shared_count:
+                        self.condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self.condition:
+            if self.owner != get_ident():
+                self.waiting += 1
+                self.condition.wait_for(
+                    lambda: self.owner is None and not self.shared_count
+                )
+                self.waiting -= 1
+                self.owner = get_ident()
+            self.depth += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.depth -= 1
+                if not self.depth:
+                    self.owner = None
+                    self.condition.notify_all()
@@ -0,0 +1,204 @@
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from .backends import compare_and_set, delete_many, get_many, set_many
+
+
+@dataclass
+class OperationStats:
+    """What one or more calls of an operation did, and how long they took.
+
+    The histogram counts calls by wall time, keyed by the power of two
+    microseconds each falls under.
+    """
+
+    calls: int = 0
+    gets: int = 0
+    sets: int = 0
+    deletes: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    hashes: int = 0
+    json_decodes: int = 0
+    seconds: float = 0.0
+    histogram: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, other: "OperationStats"):
+        for stat in fields(self):
+            if stat.name != "histogram":
+                setattr(
+                    self,
+                    stat.name,
+                    getattr(self, stat.name) + getattr(other, stat.name),
+                )
+
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+
+# THE STATS OF THE PUBLIC CALL RUNNING IN THIS THREAD OR TASK, IF ANY
+current_stats: ContextVar[Optional[OperationStats]] = ContextVar(
+    "current_stats", default=None
+)
+
+
+class Metrics:
+    """Collects OperationStats per public Indexer call, and passes each call's
+    stats to the hooks added with add_hook."""
+
+    def __init__(self):
+        self.operations: Dict[str, OperationStats] = {}
+        self.hooks: List[Callable[[str, OperationStats], None]] = []
+        self.lock = Lock()
+
+    def add_hook(self, hook: Callable[[str, OperationStats], None]):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[str, OperationStats], None]):
+        self.hooks.remove(hook)
+
+    @contextmanager
+    def measure(self, operation: str):
+        # CALLS MADE FROM INSIDE ANOTHER PUBLIC CALL COUNT TOWARDS IT
+        if current_stats.get() is not None:
+            yield
+            return
+
+        stats = OperationStats(calls=1)
+        token = current_stats.set(stats)
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            stats.seconds = perf_counter() - start
+            stats.histogram[1 << int(stats.seconds * 1e6).bit_length()] = 1
+            current_stats.reset(token)
+
+            with self.lock:
+                self.operations.setdefault(operation, OperationStats()).add(stats)
+
+            for hook in self.hooks:
+                hook(operation, stats)
+
+    def snapshot(self) -> Dict[str, OperationStats]:
+        with self.lock:
+            snapshot = {}
+            for operation, stats in self.operations.items():
+                snapshot[operation] = OperationStats()
+                snapshot[operation].add(stats)
+            return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
+
+
+def count_hashes(hash_function):
+    def counted_hash_function(value):
+        if (stats := current_stats.get()) is not None:
+            stats.hashes += 1
+        return hash_function(value)
+
+    return counted_hash_function
+
+
+def count_json_decodes(loads):
+    def counted_loads(value):
+        if (stats := current_stats.get()) is not None:
+            stats.json_decodes += 1
+        return loads(value)
+
+    return counted_loads
+
+
+class InstrumentedStore(MutableMapping):
+    """Counts the reads and writes made to a mapping, and their bytes, against
+    the public call making them."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, key):
+        value = self.db[key]
+        self._count_reads([value])
+        return value
+
+    def get(self, key, default=None):
+        value = self.db.get(key)
+        self._count_reads([value])
+        return default if value is None else value
+
+    def get_many(self, keys):
+        values = get_many(self.db, keys)
+        self._count_reads(values)
+        return values
+
+    def __setitem__(self, key, value):
+        self.db[key] = value
+        self._count_writes([value])
+
+    def set_many(self, items):
+        items = list(items)
+        set_many(self.db, items)
+        self._count_writes([value for _, value in items])
+
+    def compare_and_set(self, key, expected, value):
+        self._count_reads([expected])
+        self._count_writes([value])
+        return compare_and_set(self.db, key, expected, value)
+
+    def __delitem__(self, key):
+        del self.db[key]
+        if (stats := current_stats.get()) is not None:
+            stats.deletes += 1
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        delete_many(self.db, keys)
+        if (stats := current_stats.get()) is not None:
+            stats.deletes += len(keys)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.db)
+
+    def __len__(self):
+        return len(self.db)
+
+    def __getattr__(self, name):
+        # TRANSACTIONS, sync AND close GO STRAIGHT TO THE BACKEND
+        return getattr(self.db, name)
+
+    def _count_reads(self, values):
+        if (stats := current_stats.get()) is not None:
+            stats.gets += len(values)
+            stats.bytes_read += sum(len(value) for value in values if value)
+
+    def _count_writes(self, values):
+        if (stats := current_stats.get()) is not None:
+            stats.sets += len(values)
+            stats.bytes_written += sum(len(value) for value in values)
+
+
+def measured(method):
+    # PUBLIC Indexer METHODS ARE MEASURED UNDER THEIR NAME WHEN IT HAS METRICS
+    operation = method.__name__
+
+    @wraps(method)
+    def measured_method(self, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, *args, **kwargs)
+
+        with self.metrics.measure(operation):
+            return method(self, *args, **kwargs)
+
+    return measured_method
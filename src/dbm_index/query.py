@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, List, Literal, Optional, Union
+
+from .helpers import decode_cursor
+from .metrics import measured
+from .schemas import Filter, Page, Plan
+
+
+@dataclass
+class CompiledFilter:
+    """A filter with its key hash, operator and comparable value resolved."""
+
+    filter: Filter
+    key_hash: str
+    compare: Callable[[bytes, bytes], bool]
+    comparable: bytes
+
+
+class PreparedQuery:
+    """A query whose filters are parsed and planned once, to be run again
+    with other offsets, limits and cursors.
+
+    The plan is chosen from the store's counters when the query is
+    prepared. Prepare it again to plan against the store as it is now.
+    """
+
+    def __init__(
+        self,
+        indexer,
+        filters: List[Union[Filter, dict]] = [],
+        keys: Optional[List[str]] = None,
+        sort_key: Optional[str] = None,
+        sort_direction: Literal["asc", "desc"] = "asc",
+    ):
+        self.indexer = indexer
+        self.filters = [Filter(**f) if isinstance(f, dict) else f for f in filters]
+        self.keys = keys
+        self.sort_key = sort_key
+        self.sort_direction = sort_direction
+
+        self.plan: Plan = indexer._plan(self.filters, sort_key)
+        self.check_filters = indexer._compile_filters(self.plan.check_filters)
+
+    @property
+    def metrics(self):
+        return self.indexer.metrics
+
+    @measured
+    def retrieve(
+        self, offset: int = 0, limit: int = 10, cursor: Optional[str] = None
+    ) -> Page:
+        return self.indexer._retrieve_page(
+            self._iter_matches(cursor), self.keys, offset, limit
+        )
+
+    def iter_retrieve(self, cursor: Optional[str] = None):
+        for resource_id, retrieved_values, _ in self._iter_matches(cursor):
+            yield self.indexer._retrieve_resource(
+                resource_id, self.keys, retrieved_values
+            )
+
+    @measured
+    def count(self) -> int:
+        # THE RESOURCES retrieve RETURNS, SO WITH A SORT KEY ONLY THOSE HOLDING
+        # IT. WITHOUT ONE, SINGLE FILTERS ARE ANSWERED FROM THE COUNTERS
+        if not self.sort_key and len(self.filters) <= 1:
+            return self.indexer.count(self.filters)
+        return sum(1 for _ in self._iter_matches(None))
+
+    def explain(self) -> Plan:
+        return self.plan
+
+    def _iter_matches(self, cursor):
+        return self.indexer._iter_planned_matches(
+            self.plan,
+            self.check_filters,
+            self.sort_key,
+            self.sort_direction,
+            decode_cursor(cursor) if cursor else None,
+        )
@@ -1,5 +1,5 @@
-from typing import Literal, List
-from dataclasses import dataclass
+from typing import Literal, List, Optional
+from dataclasses import dataclass, field
 
 from .types import JsonType
 
@@ -9,3 +9,33 @@ class Filter:
     key: str
     value: JsonType
     operator: Literal["lt", "le", "eq", "ne", "ge", "gt"] = "eq"
+
+
+@dataclass
+class Plan:
+    """How a query reads its candidates, and what is checked on each."""
+
+    source: Literal["resources", "sort_index", "postings", "composite"]
+    index_filters: List[Filter]
+    check_filters: List[Filter]
+    estimated_count: Optional[int] = None
+    index_keys: Optional[List[str]] = None
+
+
+@dataclass
+class IndexSchema:
+    """Which keys are indexed. Sortable keys get postings and a sort index,
+    filter-only keys postings alone, and other keys neither."""
+
+    sortable: List[str] = field(default_factory=list)
+    filter_only: List[str] = field(default_factory=list)
+
+    @property
+    def indexed_keys(self) -> List[str]:
+        return [*self.sortable, *self.filter_only]
+
+
+class Page(list):
+    """A page of resources, with the cursor to pass to fetch the next one."""
+
+    cursor: Optional[str] = None
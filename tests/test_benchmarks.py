@@ -0,0 +1,47 @@
+import os
+from json import loads
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from benchmarks.run import main, run_benchmark
+
+
+class TestBenchmarks(TestCase):
+    def test_run_benchmark(self):
+        for backend in ["dict", "sqlite"]:
+            results = list(run_benchmark(backend, 30, fields=2, operations=3))
+
+            self.assertEqual(
+                [result["operation"] for result in results],
+                [
+                    "create_many",
+                    "create",
+                    "retrieve_one",
+                    "retrieve_eq",
+                    "retrieve_range_sorted",
+                    "retrieve_scan",
+                    "count_eq",
+                    "update",
+                    "delete",
+                ],
+            )
+            self.assertEqual(results[1]["operations"], 3)
+            self.assertLessEqual(results[1]["p50_us"], results[1]["p99_us"])
+
+    def test_metrics(self):
+        results = list(run_benchmark("dict", 20, operations=2, metrics=True))
+
+        self.assertGreater(results[0]["sets_per_call"], 0)
+        self.assertGreater(results[2]["gets_per_call"], 0)
+
+    def test_output(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.jsonl")
+            main(["--sizes", "20", "--operations", "2", "--output", path])
+
+            with open(path) as results:
+                result = loads(results.readline())
+
+            self.assertEqual(result["backend"], "dict")
+            self.assertEqual(result["size"], 20)
+            self.assertIn("commit", result)
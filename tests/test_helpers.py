@@ -0,0 +1,119 @@
+from unittest import TestCase
+from random import Random
+from math import inf
+
+from src.dbm_index.helpers import (
+    decode_cursor,
+    decode_varints,
+    encode_cursor,
+    encode_varints,
+    equivalent_dumps,
+    pack_ids,
+    parse_comparable_json,
+    unpack_ids,
+)
+
+
+class TestHelpers(TestCase):
+    def test_varints(self):
+        values = [0, 1, 127, 128, 300, 2**40]
+        self.assertEqual(decode_varints(encode_varints(values)), values)
+
+    def test_pack_ids(self):
+        ids = [3, 4, 10, 1000, 100000]
+        self.assertEqual(unpack_ids(pack_ids(ids)), ids)
+        self.assertEqual(len(pack_ids(list(range(100)))), 100)
+
+    def test_equivalent_dumps(self):
+        self.assertEqual(set(equivalent_dumps(1)), {"1", "1.0"})
+        self.assertEqual(set(equivalent_dumps(0.0)), {"0", "0.0", "-0.0"})
+        self.assertEqual(equivalent_dumps("world"), ['"world"'])
+        self.assertEqual(equivalent_dumps(["world"]), ['["world"]'])
+        self.assertIsNone(equivalent_dumps({"hello": [1]}))
+
+    def test_parse_comparable_json_numbers(self):
+        random = Random(0)
+        numbers = [
+            0,
+            -0.0,
+            1,
+            1.0,
+            -1,
+            10,
+            -10,
+            0.1,
+            -0.1,
+            12,
+            123,
+            -12,
+            -123,
+            2**70,
+            -(2**70),
+            1e300,
+            -1e-300,
+            inf,
+            -inf,
+        ]
+        numbers += [random.uniform(-1000, 1000) for _ in range(50)]
+        numbers += [random.randint(-(10**20), 10**20) for _ in range(50)]
+
+        encoded = sorted(numbers, key=parse_comparable_json)
+        self.assertEqual(encoded, sorted(numbers))
+
+        for a, b in zip(encoded, encoded[1:]):
+            self.assertEqual(
+                a == b, parse_comparable_json(a) == parse_comparable_json(b), (a, b)
+            )
+
+    def test_parse_comparable_json_strings(self):
+        strings = [
+            "",
+            "a",
+            "a\x00",
+            "a\x00b",
+            "ab",
+            "b",
+            "\ud800",
+            "\ue000",
+            "\U00010000",
+            "z" * 10,
+        ]
+
+        for a in strings:
+            for b in strings:
+                self.assertEqual(
+                    a < b, parse_comparable_json(a) < parse_comparable_json(b), (a, b)
+                )
+
+    def test_parse_comparable_json_types(self):
+        values = [
+            None,
+            False,
+            True,
+            -1,
+            0,
+            1.5,
+            "",
+            "a",
+            [],
+            [1],
+            [1, "a"],
+            [2],
+            {},
+            {"a": 1},
+        ]
+        encoded = [parse_comparable_json(value) for value in values]
+        self.assertEqual(encoded, sorted(encoded))
+        self.assertEqual(len(set(encoded)), len(encoded))
+        self.assertEqual(
+            parse_comparable_json([1, {"a": 2}]),
+            parse_comparable_json([1.0, {"a": 2.0}]),
+        )
+
+    def test_cursor(self):
+        position = ["12", '"world"', "3"]
+        self.assertEqual(decode_cursor(encode_cursor(position)), position)
+
+        for cursor in ["not a cursor", encode_cursor([]), encode_cursor([1])]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
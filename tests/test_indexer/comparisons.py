@@ -0,0 +1,48 @@
+from random import Random
+from unittest import TestCase
+
+
+def make_resources(random: Random, count):
+    # UNIQUE created AND text VALUES, SO EVERY PLAN ORDERS THE SAME WAY
+    created = random.sample(range(1000), count)
+    texts = random.sample(range(1000), count)
+    resources = []
+
+    for i in range(count):
+        resource = {
+            "tenant": i % 3,
+            "created": created[i],
+            "text": f"word {texts[i]}",
+            "other": i % 2,
+        }
+        if i % 5:
+            resource["status"] = "open" if i % 4 else "closed"
+        resources.append(resource)
+
+    return resources
+
+
+class ComparisonTestCase(TestCase):
+    """Compares an indexer against an expected one over its queries."""
+
+    queries: list = []
+
+    def assertSameResults(self, indexer, expected):
+        for filters, sort_key in self.queries:
+            self.assertEqual(indexer.count(filters), expected.count(filters))
+
+            for sort_direction in ["asc", "desc"]:
+                self.assertEqual(
+                    indexer.retrieve(
+                        filters,
+                        limit=100,
+                        sort_key=sort_key,
+                        sort_direction=sort_direction,
+                    ),
+                    expected.retrieve(
+                        filters,
+                        limit=100,
+                        sort_key=sort_key,
+                        sort_direction=sort_direction,
+                    ),
+                )
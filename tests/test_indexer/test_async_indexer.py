@@ -0,0 +1,142 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from random import Random
+
+from src.dbm_index import AsyncIndexer, Indexer
+from src.dbm_index.aio import AsyncDictStore
+from src.dbm_index.schemas import Filter
+
+
+QUERIES = [
+    {},
+    {"filters": [Filter("hello", "world")], "keys": ["test"]},
+    {"sort_key": "test", "offset": 3},
+    {"sort_key": "test", "sort_direction": "desc", "limit": 100},
+    {"filters": [Filter("test", 10, "gt"), Filter("test", 40, "le")]},
+    {"filters": [Filter("hello", "there"), Filter("test", 20, "lt")], "limit": 5},
+    {"filters": [Filter("new", None)], "limit": 100},
+]
+
+
+class ConcurrencyStore(AsyncDictStore):
+    def __init__(self):
+        super().__init__(latency=0.001)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, key, default=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().get(key, default)
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncIndexer(IsolatedAsyncioTestCase):
+    async def indexers(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+        ]:
+            random = Random(0)
+            indexer = Indexer({}, **options)
+            store = AsyncDictStore()
+            async_indexer = AsyncIndexer(store, **options)
+
+            resources = [
+                {
+                    "test": random.randint(0, 50),
+                    "hello": random.choice(["world", "there"]),
+                }
+                for _ in range(24)
+            ]
+            indexer.create_many(resources[:10])
+            await async_indexer.create_many(resources[:10])
+
+            for resource in resources[10:]:
+                indexer.create(resource)
+                await async_indexer.create(resource)
+
+            for target in (indexer, async_indexer):
+                for resource_id in ["3", "17"]:
+                    result = target.update(resource_id, {"test": 25, "new": True})
+                    if asyncio.iscoroutine(result):
+                        await result
+                result = target.delete("5")
+                if asyncio.iscoroutine(result):
+                    await result
+
+            self.assertEqual(store.db, indexer.db)
+            yield indexer, async_indexer
+
+    async def test_matches_indexer(self):
+        async for indexer, async_indexer in self.indexers():
+            for query in QUERIES:
+                page = await async_indexer.retrieve(**query)
+                self.assertEqual(page, indexer.retrieve(**query))
+                self.assertEqual(page.cursor, indexer.retrieve(**query).cursor)
+
+                query = {
+                    key: value
+                    for key, value in query.items()
+                    if key not in ["offset", "limit"]
+                }
+                self.assertEqual(
+                    [
+                        resource
+                        async for resource in async_indexer.iter_retrieve(
+                            **query, chunk_size=3
+                        )
+                    ],
+                    list(indexer.iter_retrieve(**query)),
+                )
+
+            for resource_id in ["0", "3", "5"]:
+                self.assertEqual(
+                    await async_indexer.retrieve_one(resource_id),
+                    indexer.retrieve_one(resource_id),
+                )
+            self.assertEqual(
+                await async_indexer.count([Filter("hello", "world")]),
+                indexer.count([Filter("hello", "world")]),
+            )
+
+    async def test_cursor_pages(self):
+        indexer = AsyncIndexer(AsyncDictStore())
+        await indexer.create_many({"test": i % 7} for i in range(30))
+
+        expected = await indexer.retrieve(sort_key="test", limit=100)
+        page = await indexer.retrieve(sort_key="test", limit=4)
+        resources = list(page)
+
+        while page.cursor:
+            page = await indexer.retrieve(sort_key="test", limit=4, cursor=page.cursor)
+            resources.extend(page)
+
+        self.assertEqual(resources, expected)
+
+    async def test_concurrent_writes(self):
+        store = AsyncDictStore()
+        indexer = AsyncIndexer(store)
+
+        await asyncio.gather(*(indexer.create({"test": i}) for i in range(20)))
+
+        self.assertEqual(await indexer.count(), 20)
+        self.assertEqual(
+            sorted(resource["test"] for resource in await indexer.retrieve(limit=100)),
+            list(range(20)),
+        )
+
+    async def test_reads_are_pipelined(self):
+        store = ConcurrencyStore()
+        Indexer(store.db).create_many(
+            {"test": i, "hello": "world", "other": str(i)} for i in range(20)
+        )
+        indexer = AsyncIndexer(store)
+
+        page = await indexer.retrieve([Filter("test", 5, "ne")], limit=10)
+
+        self.assertEqual(len(page), 10)
+        self.assertGreaterEqual(store.max_in_flight, 10)
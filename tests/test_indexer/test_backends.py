@@ -0,0 +1,159 @@
+import dbm.dumb
+import os
+import sqlite3
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+from src.dbm_index import Indexer
+from src.dbm_index.backends import DbmStore, SqliteStore, get_many
+from src.dbm_index.batch import WriteBatch
+from src.dbm_index.cache import CachedStore
+from src.dbm_index.schemas import Filter
+
+try:
+    import dbm.gnu as gnu
+except ImportError:
+    gnu = None
+
+
+class MultiGetDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.get_manys = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        return super().get(key, default)
+
+    def get_many(self, keys):
+        self.get_manys += 1
+        return [super(MultiGetDict, self).get(key) for key in keys]
+
+
+def exercise(indexer):
+    indexer.create_many({"test": i % 3, "hello": str(i)} for i in range(10))
+    indexer.create({"test": 2, "other": [1]})
+    indexer.update("4", {"test": 7, "new": None})
+    indexer.delete("2")
+
+    return [
+        indexer.retrieve(limit=100),
+        indexer.retrieve(
+            [Filter("test", 2), Filter("hello", "5", "ne")], keys=["hello"]
+        ),
+        indexer.retrieve(sort_key="test", sort_direction="desc", limit=4),
+    ]
+
+
+class TestSqliteStore(TestCase):
+    def test_mapping(self):
+        store = SqliteStore(sqlite3.connect(":memory:"))
+        store["a"] = b"1"
+        store.set_many([("b", b"2"), ("c", "3")])
+
+        self.assertEqual(store.get_many(["c", "x", "a"]), [b"3", None, b"1"])
+        self.assertEqual(dict(store), {"a": b"1", "b": b"2", "c": b"3"})
+
+        store.delete_many(["a", "x"])
+        del store["b"]
+        with self.assertRaises(KeyError):
+            del store["b"]
+        self.assertEqual(dict(store), {"c": b"3"})
+
+    def test_get_many_chunks(self):
+        store = SqliteStore(":memory:")
+        store.set_many([(str(i), str(i).encode()) for i in range(1200)])
+
+        keys = [str(i) for i in range(1199, -1, -1)]
+        self.assertEqual(store.get_many(keys), [key.encode() for key in keys])
+
+    def test_transaction(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store.db")
+            store = SqliteStore(path)
+
+            with self.assertRaises(ValueError):
+                with store.transaction():
+                    store["a"] = b"1"
+                    raise ValueError
+
+            with store.transaction():
+                store["b"] = b"2"
+
+            self.assertEqual(dict(SqliteStore(path)), {"b": b"2"})
+
+    def test_indexer(self):
+        expected = Indexer({})
+        store = SqliteStore(":memory:")
+
+        self.assertEqual(exercise(Indexer(store)), exercise(expected))
+        self.assertEqual(dict(store), expected.db)
+
+
+class TestDbmStore(TestCase):
+    def test_dumb(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store")
+            expected = Indexer({})
+            store = DbmStore(dbm.dumb.open(path, "c"))
+
+            self.assertEqual(exercise(Indexer(store)), exercise(expected))
+            self.assertEqual(dict(store), expected.db)
+            store.close()
+
+            store = DbmStore(dbm.dumb.open(path, "r"))
+            self.assertEqual(dict(store), expected.db)
+            store.close()
+
+    @skipUnless(gnu, "dbm.gnu is not installed")
+    def test_gnu(self):
+        with TemporaryDirectory() as directory:
+            expected = Indexer({})
+            store = DbmStore(gnu.open(os.path.join(directory, "store"), "cf"))
+
+            self.assertEqual(exercise(Indexer(store)), exercise(expected))
+            self.assertEqual(dict(store), expected.db)
+            store.close()
+
+
+class TestMultiGet(TestCase):
+    def test_retrieve_reads_page_together(self):
+        db = MultiGetDict()
+        indexer = Indexer(db)
+        indexer.create_many({"test": i, "hello": str(i)} for i in range(50))
+
+        db.gets = db.get_manys = 0
+        page = indexer.retrieve(limit=20)
+
+        self.assertEqual(len(page), 20)
+        self.assertEqual(db.get_manys, 3)
+        self.assertLessEqual(db.gets, 21)
+
+    def test_check_filters_reads_together(self):
+        db = MultiGetDict()
+        indexer = Indexer(db)
+        indexer.create({"a": 1, "b": 2, "c": 3})
+
+        db.gets = db.get_manys = 0
+        filters = [Filter("a", 2, "ne"), Filter("b", 1, "ne"), Filter("c", 0, "ne")]
+        self.assertEqual(indexer._check_filters("0", filters), {"a": 1, "b": 2, "c": 3})
+        self.assertEqual((db.gets, db.get_manys), (0, 1))
+
+    def test_layers(self):
+        db = MultiGetDict()
+        db.update({"a": b"1", "b": b"2"})
+
+        cached = CachedStore(db)
+        cached.get("a")
+        self.assertEqual(cached.get_many(["a", "b", "c"]), [b"1", b"2", None])
+        self.assertEqual(get_many(cached, ["b", "c"]), [b"2", None])
+        self.assertEqual(cached.cache_info()[:2], (3, 3))
+
+        batch = WriteBatch(db)
+        batch["a"] = b"3"
+        del batch["b"]
+        self.assertEqual(batch.get_many(["a", "b", "c"]), [b"3", None, None])
+
+        batch.flush()
+        self.assertEqual(dict(db), {"a": b"3"})
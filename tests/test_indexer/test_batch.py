@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+class RecordingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.transactions = 0
+        self.syncs = 0
+
+    def __setitem__(self, key, value):
+        self.writes += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.writes += 1
+        super().__delitem__(key)
+
+    @contextmanager
+    def transaction(self):
+        self.transactions += 1
+        yield
+
+    def sync(self):
+        self.syncs += 1
+
+
+class TestIndexerBatch(TestCase):
+    def test_batch_matches_unbatched(self):
+        expected = {}
+        indexer = Indexer(expected)
+        for i in range(5):
+            indexer.create({"test": i})
+        indexer.update("2", {"test": 7})
+        indexer.delete("3")
+
+        db = {}
+        indexer = Indexer(db)
+        with indexer.batch():
+            for i in range(5):
+                indexer.create({"test": i})
+            indexer.update("2", {"test": 7})
+            indexer.delete("3")
+
+        self.assertEqual(db, expected)
+
+    def test_batch_reads_own_writes(self):
+        db = {}
+        indexer = Indexer(db)
+
+        with indexer.batch():
+            resource_id = indexer.create({"hello": "world"})
+            self.assertEqual(db, {})
+            self.assertEqual(
+                indexer.retrieve(filters=[Filter("hello", "world")]),
+                [{"id": resource_id, "hello": "world"}],
+            )
+            indexer.delete(resource_id)
+            self.assertEqual(indexer.retrieve(), [])
+
+        self.assertEqual(db, {})
+
+    def test_batch_discarded_on_error(self):
+        db = {}
+        indexer = Indexer(db)
+        indexer.create({"hello": "world"})
+        before = dict(db)
+
+        with self.assertRaises(RuntimeError):
+            with indexer.batch():
+                indexer.create({"hello": "there"})
+                raise RuntimeError
+
+        self.assertEqual(db, before)
+        self.assertIs(indexer.db, db)
+
+    def test_batch_coalesces_writes(self):
+        db = RecordingDict()
+        indexer = Indexer(db)
+
+        with indexer.batch():
+            for i in range(10):
+                indexer.create({"test": i})
+
+        self.assertEqual(db.writes, len(db))
+        self.assertEqual(db.transactions, 1)
+        self.assertEqual(db.syncs, 1)
+
+    def test_nested_batch(self):
+        db = RecordingDict()
+        indexer = Indexer(db)
+
+        with indexer.batch() as outer:
+            with indexer.batch() as inner:
+                indexer.create({"hello": "world"})
+            self.assertIs(inner, outer)
+            self.assertEqual(db.writes, 0)
+
+        self.assertEqual(db.transactions, 1)
+        self.assertEqual(indexer.retrieve(), [{"id": "0", "hello": "world"}])
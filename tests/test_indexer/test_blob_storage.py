@@ -0,0 +1,103 @@
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+class CountingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        return super().get(key, default)
+
+
+class TestIndexerBlobStorage(TestCase):
+    def test_create(self):
+        db = {}
+        indexer = Indexer(db, storage="blob")
+        resource_id = indexer.create({"hello": "world", "test": 1})
+
+        self.assertEqual(db["0#blob"], b'{"hello": "world", "test": 1}')
+        self.assertNotIn("0#head", db)
+        self.assertEqual(
+            list(indexer.retrieve_one(resource_id).items()),
+            [("id", "0"), ("hello", "world"), ("test", 1)],
+        )
+        self.assertEqual(
+            indexer.retrieve_one(resource_id, keys=["test", "missing"]),
+            {"id": "0", "test": 1, "missing": None},
+        )
+
+    def test_retrieve_one_single_read(self):
+        db = CountingDict()
+        indexer = Indexer(db, storage="blob")
+        resource_id = indexer.create({str(i): i for i in range(40)})
+
+        db.gets = 0
+        indexer.retrieve_one(resource_id)
+        self.assertEqual(db.gets, 1)
+
+    def test_matches_keys_storage(self):
+        keys_indexer = Indexer({})
+        blob_indexer = Indexer({}, storage="blob")
+
+        for indexer in (keys_indexer, blob_indexer):
+            for i in range(12):
+                indexer.create({"test": i % 4, "hello": str(i)})
+            indexer.update("2", {"test": 7, "new": True})
+            indexer.delete("5")
+
+        for kwargs in [
+            {},
+            {"filters": [Filter("test", 3)]},
+            {"filters": [Filter("test", 1, "gt")], "sort_key": "hello"},
+            {"filters": [Filter("new", True)], "keys": ["hello"]},
+            {"sort_key": "test", "sort_direction": "desc", "offset": 2},
+        ]:
+            self.assertEqual(
+                blob_indexer.retrieve(**kwargs), keys_indexer.retrieve(**kwargs)
+            )
+
+    def test_filters_missing_key(self):
+        indexer = Indexer({}, storage="blob")
+        indexer.create({"hello": "world"})
+        indexer.create({"hello": "there", "test": 1})
+
+        self.assertEqual(
+            indexer.retrieve(filters=[Filter("test", None)]),
+            [{"id": "0", "hello": "world"}],
+        )
+        self.assertEqual(
+            indexer.retrieve(filters=[Filter("test", None)], keys=["test"]),
+            [{"id": "0", "test": None}],
+        )
+
+    def test_update(self):
+        indexer = Indexer({}, storage="blob")
+        resource_id = indexer.create({"hello": "world", "test": 1})
+        indexer.update(resource_id, {"test": 2, "new": None})
+
+        self.assertEqual(
+            indexer.retrieve_one(resource_id),
+            {"id": "0", "hello": "world", "test": 2, "new": None},
+        )
+        self.assertEqual(indexer.retrieve(filters=[Filter("test", 1)]), [])
+
+    def test_delete(self):
+        db = {}
+        indexer = Indexer(db, storage="blob")
+        resource_id = indexer.create({"hello": "world", "test": 1})
+        indexer.delete(resource_id)
+
+        self.assertEqual(list(db), ["format"])
+
+    def test_storage_persisted(self):
+        db = {}
+        Indexer(db, storage="blob").create({"hello": "world"})
+
+        self.assertEqual(Indexer(db).storage, "blob")
+        with self.assertRaises(ValueError):
+            Indexer(db, storage="keys")
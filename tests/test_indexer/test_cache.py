@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.cache import CachedStore
+from src.dbm_index.schemas import Filter
+
+
+class CountingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        return super().get(key, default)
+
+
+class TestCachedStore(TestCase):
+    def test_eviction(self):
+        store = CachedStore({"a": 1, "b": 2, "c": 3}, max_size=2)
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        self.assertEqual(list(store.cache), ["a", "c"])
+        self.assertEqual(store.cache_info(), (1, 3, 2, 2))
+
+    def test_misses_cached(self):
+        db = CountingDict()
+        store = CachedStore(db)
+
+        self.assertIsNone(store.get("a"))
+        self.assertNotIn("a", store)
+        self.assertEqual(db.gets, 1)
+
+        store["a"] = 1
+        self.assertEqual(store["a"], 1)
+
+        del store["a"]
+        with self.assertRaises(KeyError):
+            store["a"]
+        self.assertEqual(db.gets, 3)
+
+
+class TestIndexerCache(TestCase):
+    def test_cache_matches_uncached(self):
+        expected = {}
+        indexer = Indexer(expected)
+        db = {}
+        cached = Indexer(db, cache_size=8)
+
+        for i in range(20):
+            for target in (indexer, cached):
+                target.create({"test": i % 5, "hello": str(i)})
+        for target in (indexer, cached):
+            target.update("3", {"test": 9})
+            target.delete("4")
+
+        self.assertEqual(db, expected)
+
+        for filters, sort_key in [
+            ([], "test"),
+            ([Filter("test", 2)], None),
+            ([Filter("test", 1, "gt")], "hello"),
+        ]:
+            self.assertEqual(
+                cached.retrieve(filters=filters, sort_key=sort_key),
+                indexer.retrieve(filters=filters, sort_key=sort_key),
+            )
+
+    def test_cache_avoids_repeated_reads(self):
+        db = CountingDict()
+        indexer = Indexer(db, cache_size=4096)
+        for i in range(10):
+            indexer.create({"test": i})
+
+        indexer.retrieve(sort_key="test")
+        gets = db.gets
+        indexer.retrieve(sort_key="test")
+
+        self.assertEqual(db.gets, gets)
+        self.assertGreater(indexer.cache_info().hits, 0)
+
+    def test_cache_with_batch(self):
+        db = {}
+        indexer = Indexer(db, cache_size=4096)
+        indexer.create({"hello": "world"})
+        indexer.retrieve()
+
+        with indexer.batch():
+            indexer.update("0", {"hello": "there"})
+
+        self.assertEqual(indexer.retrieve(), [{"id": "0", "hello": "there"}])
+
+    def test_cache_disabled(self):
+        self.assertIsNone(Indexer({}).cache_info())
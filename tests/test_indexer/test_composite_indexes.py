@@ -0,0 +1,153 @@
+from random import Random
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+from .comparisons import ComparisonTestCase, make_resources
+
+
+COMPOSITE_INDEXES = [("tenant", "status", "created"), ("tenant", "created")]
+
+QUERIES = [
+    ([Filter("tenant", 1), Filter("status", "open")], "created"),
+    ([Filter("tenant", 2), Filter("status", "closed")], "created"),
+    (
+        [Filter("tenant", 0), Filter("status", "open"), Filter("created", 30, "ge")],
+        "created",
+    ),
+    (
+        [
+            Filter("status", "open"),
+            Filter("tenant", 1),
+            Filter("created", 20, "gt"),
+            Filter("created", 70, "le"),
+        ],
+        "created",
+    ),
+    ([Filter("tenant", 1), Filter("status", "open"), Filter("created", 42)], "created"),
+    ([Filter("tenant", 2), Filter("created", 50, "lt")], "created"),
+    ([Filter("tenant", 2), Filter("other", 1, "ne")], "created"),
+    ([Filter("tenant", 3)], "created"),
+    (
+        [
+            Filter("tenant", 1),
+            Filter("created", 100, "gt"),
+            Filter("created", 300, "ge"),
+        ],
+        "created",
+    ),
+]
+
+
+class TestCompositeIndexes(ComparisonTestCase):
+    queries = QUERIES
+
+    def test_matches_unindexed(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+        ]:
+            random = Random(0)
+            indexer = Indexer({}, composite_indexes=COMPOSITE_INDEXES, **options)
+            expected = Indexer({}, **options)
+
+            resources = make_resources(random, 80)
+            indexer.create_many(resources[:40])
+            expected.create_many(resources[:40])
+            for resource in resources[40:]:
+                indexer.create(resource)
+                expected.create(resource)
+
+            self.assertSameResults(indexer, expected)
+
+            for resource_id in random.sample(range(80), 30):
+                update = random.choice(
+                    [
+                        {"status": random.choice(["open", "closed"])},
+                        {"created": 1000 + resource_id},
+                        {"tenant": random.randrange(3), "other": 5},
+                        {"other": 7},
+                    ]
+                )
+                indexer.update(str(resource_id), dict(update))
+                expected.update(str(resource_id), dict(update))
+
+            self.assertSameResults(indexer, expected)
+
+            for resource_id in random.sample(range(80), 30):
+                indexer.delete(str(resource_id))
+                expected.delete(str(resource_id))
+
+            self.assertSameResults(indexer, expected)
+
+    def test_explain(self):
+        indexer = Indexer({}, composite_indexes=COMPOSITE_INDEXES)
+        indexer.create_many(make_resources(Random(0), 20))
+
+        plan = indexer.explain(
+            [Filter("status", "open"), Filter("tenant", 1), Filter("other", 1)],
+            "created",
+        )
+        self.assertEqual(plan.source, "composite")
+        self.assertEqual(plan.index_keys, ["tenant", "status", "created"])
+        self.assertEqual(
+            plan.index_filters, [Filter("tenant", 1), Filter("status", "open")]
+        )
+        self.assertEqual(plan.check_filters, [Filter("other", 1)])
+
+        plan = indexer.explain([Filter("tenant", 1)], "created")
+        self.assertEqual(plan.index_keys, ["tenant", "created"])
+
+        for filters, sort_key in [
+            ([Filter("tenant", 1)], None),
+            ([Filter("tenant", 1, "ge")], "created"),
+            ([Filter("status", "open")], "created"),
+            ([Filter("tenant", 1)], "status"),
+        ]:
+            self.assertNotEqual(indexer.explain(filters, sort_key).source, "composite")
+
+    def test_cursor(self):
+        indexer = Indexer({}, composite_indexes=COMPOSITE_INDEXES)
+        indexer.create_many(make_resources(Random(0), 60))
+
+        filters = [Filter("tenant", 1), Filter("status", "open")]
+        expected = indexer.retrieve(filters, limit=100, sort_key="created")
+        resources = []
+        cursor = None
+
+        while True:
+            page = indexer.retrieve(filters, limit=3, sort_key="created", cursor=cursor)
+            resources.extend(page)
+            if page.cursor is None:
+                break
+            cursor = page.cursor
+
+        self.assertEqual(resources, expected)
+
+    def test_declared_later(self):
+        db = {}
+        expected = Indexer({})
+
+        for indexer in [Indexer(db), expected]:
+            indexer.create_many(make_resources(Random(0), 40))
+            indexer.delete("3")
+            indexer.update("4", {"status": "closed"})
+
+        indexer = Indexer(db, composite_indexes=COMPOSITE_INDEXES)
+        self.assertEqual(
+            db["indexes"],
+            b'{"composite": [["tenant", "status", "created"], ["tenant", "created"]]}',
+        )
+        self.assertSameResults(indexer, expected)
+
+        # THE DECLARATIONS ARE KEPT, AND DROPPING THEM REMOVES THEIR ENTRIES
+        self.assertEqual(Indexer(db).composite_indexes, COMPOSITE_INDEXES)
+
+        Indexer(db, composite_indexes=[])
+        self.assertEqual(dict(db), dict(expected.db))
+
+    def test_invalid(self):
+        for composite_indexes in [[("tenant",)], [("tenant", "tenant")]]:
+            with self.assertRaises(ValueError):
+                Indexer({}, composite_indexes=composite_indexes)
@@ -0,0 +1,99 @@
+import os
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.backends import SqliteStore, compare_and_set
+
+
+def create_resources(path, worker):
+    # EACH WORKER WRITES ITS OWN KEY, SO ONLY IDS AND THE LIST ARE SHARED
+    indexer = Indexer(SqliteStore(path), id_lease_size=8)
+    resource_ids = [indexer.create({f"w{worker}": i}) for i in range(10)]
+    resource_ids += indexer.create_many({f"w{worker}": i} for i in range(10, 20))
+    return resource_ids
+
+
+class TestIdLeasing(TestCase):
+    def test_leases_blocks(self):
+        db = {}
+        first = Indexer(db, id_lease_size=4)
+        second = Indexer(db, id_lease_size=4)
+
+        self.assertEqual(first.create({"test": 1}), "0")
+        self.assertEqual(second.create({"test": 2}), "4")
+        self.assertEqual(first.create({"test": 3}), "1")
+        self.assertEqual(db["lease"], b"8")
+
+        self.assertEqual(
+            second.create_many([{"test": 4}] * 6), ["5", "6", "7", "8", "9", "10"]
+        )
+        self.assertEqual(db["lease"], b"12")
+
+        self.assertEqual(
+            [r["id"] for r in first.retrieve(limit=100)],
+            ["10", "9", "8", "7", "6", "5", "4", "1", "0"],
+        )
+        self.assertEqual(first.count(), 9)
+        self.assertEqual(first.count(), second.count())
+
+    def test_lease_starts_after_head(self):
+        db = {}
+        indexer = Indexer(db)
+        indexer.create_many([{"test": 1}] * 3)
+
+        indexer = Indexer(db, id_lease_size=2)
+        self.assertEqual(indexer.create({"test": 2}), "3")
+        self.assertEqual(db["lease"], b"5")
+
+    def test_out_of_order_commits(self):
+        db = {}
+        first = Indexer(db, id_lease_size=4)
+        second = Indexer(db, id_lease_size=4)
+        first_ids = first._resource_ids(2)
+        second_ids = second._resource_ids(1)
+
+        second._link_resource_ids(second_ids)
+        first._link_resource_ids(first_ids[1:])
+        first._link_resource_ids(first_ids[:1])
+
+        self.assertEqual([r["id"] for r in first.retrieve(limit=100)], ["4", "1", "0"])
+        self.assertEqual(db["4#next"], b"1")
+        self.assertEqual(db["0#prev"], b"1")
+
+    def test_compare_and_set(self):
+        for db in [{}, SqliteStore(":memory:")]:
+            self.assertTrue(compare_and_set(db, "a", None, b"1"))
+            self.assertFalse(compare_and_set(db, "a", None, b"2"))
+            self.assertFalse(compare_and_set(db, "a", b"2", b"3"))
+            self.assertTrue(compare_and_set(db, "a", b"1", b"3"))
+            self.assertEqual(db["a"], b"3")
+
+    def test_processes(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store.db")
+            SqliteStore(path).close()
+
+            with get_context("spawn").Pool(3) as pool:
+                chunks = pool.starmap(create_resources, [(path, n) for n in range(3)])
+
+            resource_ids = [resource_id for chunk in chunks for resource_id in chunk]
+            self.assertEqual(len(set(resource_ids)), 60)
+
+            indexer = Indexer(SqliteStore(path))
+            self.assertEqual(
+                [r["id"] for r in indexer.retrieve(limit=100)],
+                sorted(resource_ids, key=int, reverse=True),
+            )
+            self.assertEqual(indexer.count(), 60)
+
+            for worker in range(3):
+                values = [
+                    resource[f"w{worker}"]
+                    for resource in indexer.retrieve(keys=[f"w{worker}"], limit=100)
+                ]
+                self.assertEqual(
+                    [value for value in values if value is not None],
+                    list(range(19, -1, -1)),
+                )
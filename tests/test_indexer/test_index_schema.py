@@ -0,0 +1,127 @@
+from random import Random
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter, IndexSchema
+
+from .comparisons import ComparisonTestCase, make_resources
+
+
+SCHEMA = IndexSchema(sortable=["created"], filter_only=["status"])
+
+QUERIES = [
+    ([Filter("status", "open")], None),
+    ([Filter("status", "open", "ne")], None),
+    ([Filter("status", "closed", "ge")], "created"),
+    ([Filter("created", 500, "lt")], "created"),
+    ([Filter("created", 500, "lt")], "text"),
+    ([Filter("text", "word 3")], None),
+    ([Filter("text", "word 3", "gt"), Filter("status", "open")], "created"),
+    ([Filter("text", None)], "text"),
+    ([], "text"),
+    ([Filter("created", 100, "gt"), Filter("created", 300, "ge")], "created"),
+]
+
+
+class TestIndexSchema(ComparisonTestCase):
+    queries = QUERIES
+
+    def test_matches_full_index(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+            {"scan_workers": 2, "segment_size": 8},
+        ]:
+            random = Random(0)
+            indexer = Indexer({}, index_schema=SCHEMA, **options)
+            expected = Indexer({}, **options)
+
+            resources = make_resources(random, 60)
+            for target in [indexer, expected]:
+                target.create_many(resources[:30])
+                for resource in resources[30:]:
+                    target.create(resource)
+
+            self.assertSameResults(indexer, expected)
+
+            for resource_id in random.sample(range(60), 20):
+                update = random.choice(
+                    [
+                        {"status": "closed"},
+                        {"created": 1000 + resource_id},
+                        {"text": f"word {1000 + resource_id}"},
+                    ]
+                )
+                indexer.update(str(resource_id), dict(update))
+                expected.update(str(resource_id), dict(update))
+
+            for resource_id in random.sample(range(60), 20):
+                indexer.delete(str(resource_id))
+                expected.delete(str(resource_id))
+
+            self.assertSameResults(indexer, expected)
+
+    def test_skips_unindexed_keys(self):
+        indexer = Indexer({}, index_schema=SCHEMA)
+        indexer.create_many(make_resources(Random(0), 20))
+        indexer.update("3", {"text": "word 1000", "other": 1})
+
+        for key in ["text", "other"]:
+            key_hash = indexer._hash(key)
+            self.assertFalse(any(k.startswith(key_hash) for k in indexer.db))
+
+        status_hash = indexer._hash("status")
+        self.assertIn(f"{status_hash}#count", indexer.db)
+        self.assertNotIn(f"{status_hash}#head", indexer.db)
+        self.assertIn(f"{indexer._hash('created')}#head", indexer.db)
+
+        for filters, sort_key, source in [
+            ([Filter("text", "word 3")], None, "resources"),
+            ([Filter("text", "word 3", "gt")], "text", "resources"),
+            ([Filter("status", "open")], None, "postings"),
+            ([Filter("status", "open", "gt")], "status", "resources"),
+            ([], "created", "sort_index"),
+            ([Filter("status", "open")], "created", "postings"),
+        ]:
+            self.assertEqual(indexer.explain(filters, sort_key).source, source)
+
+    def test_schema_changes(self):
+        resources = make_resources(Random(0), 40)
+
+        db = {}
+        Indexer(db).create_many(resources)
+
+        for index_schema in [
+            SCHEMA,
+            IndexSchema(sortable=["status", "text"]),
+            {"filter_only": ["created", "text"]},
+        ]:
+            expected = Indexer({}, index_schema=index_schema)
+            expected.create_many(resources)
+
+            indexer = Indexer(db, index_schema=index_schema)
+            self.assertEqual(dict(db), dict(expected.db))
+            self.assertSameResults(indexer, expected)
+
+            # THE SCHEMA IS KEPT WHEN THE STORE IS REOPENED
+            self.assertEqual(Indexer(db).index_schema, expected.index_schema)
+
+    def test_composite_index_on_unindexed_keys(self):
+        resources = make_resources(Random(0), 30)
+        indexer = Indexer(
+            {}, index_schema=IndexSchema(), composite_indexes=[("status", "text")]
+        )
+        indexer.create_many(resources)
+        expected = Indexer({})
+        expected.create_many(resources)
+
+        filters = [Filter("status", "open")]
+        self.assertEqual(indexer.explain(filters, "text").source, "composite")
+        self.assertEqual(
+            indexer.retrieve(filters, limit=100, sort_key="text"),
+            expected.retrieve(filters, limit=100, sort_key="text"),
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Indexer({}, index_schema=IndexSchema(sortable=["a"], filter_only=["a"]))
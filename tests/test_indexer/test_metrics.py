@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.metrics import Metrics, OperationStats
+from src.dbm_index.schemas import Filter
+
+
+class CountingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.bytes_read = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        value = super().get(key, default)
+        self.bytes_read += len(value or b"")
+        return value
+
+
+class TestMetrics(TestCase):
+    def test_disabled(self):
+        indexer = Indexer({})
+        indexer.create({"test": 1})
+
+        self.assertIsNone(indexer.metrics_snapshot())
+        self.assertIsInstance(indexer.db, dict)
+
+    def test_counts_backend_calls(self):
+        db = CountingDict()
+        indexer = Indexer(db, metrics=Metrics())
+        resource_id = indexer.create({"test": 1, "hello": "world"})
+
+        db.gets = db.bytes_read = 0
+        indexer.retrieve_one(resource_id)
+        stats = indexer.metrics_snapshot()["retrieve_one"]
+
+        self.assertEqual(stats.calls, 1)
+        self.assertEqual(stats.gets, db.gets)
+        self.assertEqual(stats.json_decodes, 2)
+        self.assertEqual(stats.sets, 0)
+        self.assertEqual(stats.bytes_read, db.bytes_read)
+
+        create = indexer.metrics_snapshot()["create"]
+        self.assertEqual(create.sets, len(db))
+        self.assertEqual(create.bytes_written, sum(len(value) for value in db.values()))
+        self.assertEqual(create.hashes, 4)
+
+        indexer.delete(resource_id)
+        delete = indexer.metrics_snapshot()["delete"]
+        self.assertEqual(delete.deletes, create.sets - len(db))
+
+    def test_hooks_and_histogram(self):
+        metrics = Metrics()
+        calls = []
+        metrics.add_hook(lambda operation, stats: calls.append((operation, stats)))
+
+        indexer = Indexer({}, metrics=metrics)
+        indexer.create_many([{"test": i} for i in range(5)])
+        indexer.retrieve([Filter("test", 2, "ge")], sort_key="test")
+        indexer.count([Filter("test", 3, "ne")])
+
+        self.assertEqual(
+            [operation for operation, _ in calls], ["create_many", "retrieve", "count"]
+        )
+        self.assertTrue(all(stats.calls == 1 for _, stats in calls))
+
+        snapshot = metrics.snapshot()
+        retrieve = snapshot["retrieve"]
+        self.assertEqual(sum(retrieve.histogram.values()), 1)
+        (bucket,) = retrieve.histogram
+        self.assertLessEqual(retrieve.seconds * 1e6, bucket)
+        self.assertGreater(retrieve.seconds * 1e6, bucket / 2 - 1)
+
+        # A SNAPSHOT IS A COPY
+        snapshot["retrieve"].calls = 10
+        self.assertEqual(metrics.snapshot()["retrieve"].calls, 1)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_nested_and_parallel_calls(self):
+        indexer = Indexer({}, metrics=Metrics(), segment_size=2, scan_workers=2)
+        with indexer.batch():
+            indexer.create_many([{"test": i % 3} for i in range(10)])
+
+        stats = indexer.metrics_snapshot()
+        self.assertEqual(list(stats), ["create_many"])
+
+        indexer.metrics.reset()
+        self.assertEqual(len(indexer.retrieve([Filter("test", 1, "ne")])), 7)
+
+        retrieve = indexer.metrics_snapshot()["retrieve"]
+        # FILTERS COMPARE CACHED COMPARABLE FORMS, SO ONLY MATCHES ARE DECODED
+        self.assertEqual(retrieve.json_decodes, 7)
+        self.assertGreater(retrieve.gets, 20)
+
+    def test_add(self):
+        stats = OperationStats(calls=1, gets=2, histogram={4: 1})
+        stats.add(OperationStats(calls=1, gets=3, histogram={4: 1, 8: 1}))
+        self.assertEqual(stats, OperationStats(calls=2, gets=5, histogram={4: 2, 8: 1}))
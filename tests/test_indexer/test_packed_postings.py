@@ -0,0 +1,120 @@
+from unittest import TestCase
+from random import Random
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+from src.dbm_index.helpers import custom_hash
+
+
+class CountingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        return super().get(key, default)
+
+
+class TestIndexerPackedPostings(TestCase):
+    def test_create_and_delete(self):
+        indexer = Indexer({}, posting_format="packed", posting_block_size=2)
+
+        resource_ids = [indexer.create({"status": "active"}) for _ in range(5)]
+
+        key_hash = custom_hash("status")
+        value_hash = custom_hash('"active"')
+
+        self.assertEqual(
+            list(indexer._iter_filter_index(key_hash, value_hash)),
+            resource_ids[::-1],
+        )
+        self.assertEqual(
+            len(indexer._retrieve_posting_directory(key_hash, value_hash)), 3
+        )
+
+        for resource_id in resource_ids:
+            indexer.delete(resource_id)
+
+        self.assertEqual(list(indexer.db), ["format"])
+
+    def test_matches_chained_postings(self):
+        random = Random(0)
+        chained = Indexer({})
+        packed = Indexer({}, posting_format="packed", posting_block_size=4)
+
+        for _ in range(200):
+            resource = {
+                "status": random.choice(["a", "b", "c"]),
+                "n": random.randint(0, 5),
+            }
+            self.assertEqual(chained.create(resource), packed.create(resource))
+
+        for resource_id in random.sample(range(200), 50):
+            update = {"status": random.choice(["a", "b", "c", "d"])}
+            chained.update(str(resource_id), dict(update))
+            packed.update(str(resource_id), dict(update))
+
+        for resource_id in random.sample(range(200), 80):
+            chained.delete(str(resource_id))
+            packed.delete(str(resource_id))
+
+        for filters in [
+            [Filter("status", "a")],
+            [Filter("status", "d"), Filter("n", 3)],
+            [Filter("status", "b"), Filter("n", 2, "gt")],
+        ]:
+            self.assertEqual(
+                chained.retrieve(filters=filters, limit=500),
+                packed.retrieve(filters=filters, limit=500),
+            )
+
+        self.assertEqual(
+            chained.retrieve(sort_key="n", limit=500),
+            packed.retrieve(sort_key="n", limit=500),
+        )
+
+    def test_cursor_pages_stream_postings(self):
+        random = Random(0)
+        chained = Indexer({})
+        packed = Indexer(CountingDict(), posting_format="packed", posting_block_size=4)
+
+        for _ in range(200):
+            resource = {
+                "status": random.choice(["a", "b"]),
+                "n": random.randint(0, 3),
+                "x": random.choice([1, 1.0, 2]),
+            }
+            chained.create(resource)
+            packed.create(resource)
+
+        for resource_id in random.sample(range(200), 40):
+            chained.delete(str(resource_id))
+            packed.delete(str(resource_id))
+
+        for filters in [
+            [Filter("status", "a")],
+            [Filter("status", "a"), Filter("n", 2)],
+            [Filter("x", 1)],
+            [Filter("x", 1), Filter("status", "b"), Filter("n", 1, "ne")],
+        ]:
+            self.assertEqual(packed.explain(filters).source, "postings")
+
+            expected = chained.retrieve(filters=filters, limit=500)
+            resources = []
+            cursor = None
+
+            while True:
+                page = packed.retrieve(filters=filters, limit=7, cursor=cursor)
+                resources.extend(page)
+                if page.cursor is None:
+                    break
+                cursor = page.cursor
+
+            self.assertEqual(resources, expected)
+            self.assertEqual(list(packed.iter_retrieve(filters=filters)), expected)
+
+            # A SHORT PAGE ONLY READS THE BLOCKS IT NEEDS
+            packed.db.gets = 0
+            packed.retrieve(filters=filters, limit=2)
+            self.assertLess(packed.db.gets, 40)
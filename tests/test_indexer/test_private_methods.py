@@ -83,6 +83,9 @@ class TestIndexerPrivateMethods(TestCase):
                 "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#toe": b'"world"',
                 "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#486ea46224d1bb4fb680f34f7c9ad96a8f24ec88be73ea8e5a6c65260e9cb8a7#0#value": b"0",
                 "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#486ea46224d1bb4fb680f34f7c9ad96a8f24ec88be73ea8e5a6c65260e9cb8a7#head": b"0",
+                "0#2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#posting": b"0",
+                "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#count": b"1",
+                "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824#486ea46224d1bb4fb680f34f7c9ad96a8f24ec88be73ea8e5a6c65260e9cb8a7#count": b"1",
             },
         )
 
@@ -200,4 +203,41 @@ class TestIndexerPrivateMethods(TestCase):
         indexer._delete_sort_index(key_hash, value_hash_2)
 
         for value in indexer.db.values():
-            assert value is not None
\ No newline at end of file
+            assert value is not None
+
+    def test_filter_index_lookup(self):
+        indexer = Indexer({})
+        indexer.create({"hello": "world"})
+        indexer.create({"hello": "there"})
+        indexer.create({"hello": "world"})
+
+        resource_ids = indexer._filter_index_lookup(
+            [Filter(key="hello", value="world")]
+        )
+        self.assertEqual(resource_ids, {"0", "2"})
+
+    def test_filter_index_lookup_unindexable(self):
+        indexer = Indexer({})
+        indexer.create({"hello": "world"})
+
+        self.assertIsNone(
+            indexer._filter_index_lookup(
+                [Filter(key="hello", value="world", operator="ne")]
+            )
+        )
+        self.assertIsNone(
+            indexer._filter_index_lookup([Filter(key="hello", value=None)])
+        )
+
+    def test_iter_sort_index_range(self):
+        indexer = Indexer({})
+        for value in [1, 4, 2, 3]:
+            indexer.create({"hello": value})
+
+        key_hash = custom_hash("hello")
+        self.assertEqual(
+            list(indexer._iter_sort_index_range(key_hash, "gt", 2)), ["1", "3"]
+        )
+        self.assertEqual(
+            list(indexer._iter_sort_index_range(key_hash, "le", 2)), ["0", "2"]
+        )
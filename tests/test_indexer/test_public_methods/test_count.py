@@ -0,0 +1,105 @@
+from unittest import TestCase
+from random import Random
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+FILTERS = [
+    [],
+    [Filter("test", 1)],
+    [Filter("test", 1.0)],
+    [Filter("test", 7, "ne")],
+    [Filter("test", None)],
+    [Filter("test", None, "ne")],
+    [Filter("hello", "world")],
+    [Filter("test", 25, "ge")],
+    [Filter("test", 10, "lt")],
+    [Filter("test", None, "le")],
+    [Filter("test", 10, "gt"), Filter("hello", "there")],
+    [{"key": "missing", "value": 1}],
+]
+
+
+class TestIndexerCount(TestCase):
+    def indexers(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+        ]:
+            random = Random(0)
+            indexer = Indexer({}, **options)
+
+            indexer.create_many(
+                {"test": random.choice([random.randint(0, 50), 1, 1.0, None])}
+                for _ in range(20)
+            )
+            for _ in range(40):
+                indexer.create(
+                    {
+                        "test": random.choice([random.randint(0, 50), 1, 1.0]),
+                        "hello": random.choice(["world", "there"]),
+                    }
+                )
+            for resource_id in ["3", "17", "42"]:
+                indexer.update(resource_id, {"test": 25, "hello": "world"})
+            for resource_id in ["5", "30", "31", "1000"]:
+                indexer.delete(resource_id)
+
+            yield indexer
+
+    def assertCounts(self, indexer):
+        for filters in FILTERS:
+            self.assertEqual(
+                indexer.count(filters),
+                len(indexer.retrieve(filters, limit=1000)),
+                filters,
+            )
+
+    def test_count(self):
+        for indexer in self.indexers():
+            self.assertCounts(indexer)
+
+    def test_count_eq_reads_counters(self):
+        indexer = Indexer({})
+        for i in range(100):
+            indexer.create({"test": i % 2})
+
+        self.assertEqual(indexer.count([Filter("test", 1)]), 50)
+        self.assertEqual(indexer.count([Filter("test", 1, "ne")]), 50)
+        self.assertEqual(indexer.count(), 100)
+
+        # THE POSTINGS ARE NOT READ
+        for key in list(indexer.db):
+            if key.endswith("#value") and key.count("#") == 3:
+                del indexer.db[key]
+        self.assertEqual(indexer.count([Filter("test", 1)]), 50)
+
+    def test_count_empties_store(self):
+        indexer = Indexer({})
+        for i in range(3):
+            indexer.create({"test": i})
+        for resource_id in ["0", "1", "2"]:
+            indexer.delete(resource_id)
+
+        self.assertEqual(indexer.count(), 0)
+        self.assertEqual(indexer.db, {})
+
+    def test_count_without_counters(self):
+        for indexer in self.indexers():
+            for key in list(indexer.db):
+                if key.endswith("count"):
+                    del indexer.db[key]
+
+            uncounted = Indexer(indexer.db)
+            self.assertCounts(uncounted)
+
+            uncounted.create({"test": 1})
+            uncounted.delete("0")
+            self.assertFalse(any(key.endswith("count") for key in indexer.db))
+            self.assertCounts(uncounted)
+
+            uncounted.migrate()
+            self.assertIn("count", indexer.db)
+            self.assertCounts(uncounted)
@@ -0,0 +1,59 @@
+from unittest import TestCase
+from random import Random
+
+from src.dbm_index import Indexer
+
+
+class TestIndexerCreateMany(TestCase):
+    def resources(self, seed, count):
+        random = Random(seed)
+        return [
+            {"test": random.randint(0, 50), "hello": random.choice(["world", "there"])}
+            for _ in range(count)
+        ]
+
+    def test_create_many(self):
+        indexer = Indexer({})
+        resource_ids = indexer.create_many([{"test": 123}, {"test": 321}])
+
+        expected = Indexer({})
+        expected.create({"test": 123})
+        expected.create({"test": 321})
+
+        self.assertEqual(resource_ids, ["0", "1"])
+        self.assertEqual(indexer.db, expected.db)
+
+    def test_create_many_matches_create(self):
+        for options in [{}, {"posting_format": "packed", "posting_block_size": 8}]:
+            indexer = Indexer({}, **options)
+            expected = Indexer({}, **options)
+
+            for seed in range(3):
+                resources = self.resources(seed, 100)
+                indexer.create_many(resources)
+
+                for resource in resources:
+                    expected.create(resource)
+
+            self.assertEqual(indexer.db, expected.db)
+
+    def test_create_many_after_delete(self):
+        indexer = Indexer({}, posting_format="packed", posting_block_size=4)
+        expected = Indexer({}, posting_format="packed", posting_block_size=4)
+
+        for current in [indexer, expected]:
+            current.create_many(self.resources(0, 20))
+            current.delete("19")
+            current.delete("3")
+
+        resources = self.resources(1, 20)
+        indexer.create_many(resources)
+        for resource in resources:
+            expected.create(resource)
+
+        self.assertEqual(indexer.db, expected.db)
+
+    def test_create_many_empty(self):
+        indexer = Indexer({})
+        self.assertEqual(indexer.create_many([]), [])
+        self.assertEqual(indexer.db, {})
@@ -1,6 +1,17 @@
 from unittest import TestCase
 
 from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+class CountingDict(dict):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key, default=None):
+        self.gets += 1
+        return super().get(key, default)
 
 
 class TestIndexerDelete(TestCase):
@@ -11,3 +22,84 @@ class TestIndexerDelete(TestCase):
 
         indexer.delete(resource_id)
         self.assertEqual(len(indexer.db), 0)
+
+    def test_delete_multiple(self):
+        indexer = Indexer({})
+
+        for i in range(4):
+            indexer.create({"test": i})
+
+        indexer.delete("2")
+        indexer.delete("0")
+        self.assertEqual([r["id"] for r in indexer.retrieve()], ["3", "1"])
+
+        indexer.delete("3")
+        self.assertEqual([r["id"] for r in indexer.retrieve()], ["1"])
+
+        indexer.delete("1")
+        self.assertEqual(len(indexer.db), 0)
+
+    def test_delete_without_prev_links(self):
+        indexer = Indexer({})
+
+        for i in range(3):
+            indexer.create({"test": i})
+
+        for key in ["0#prev", "1#prev"]:
+            del indexer.db[key]
+
+        indexer.delete("1")
+        self.assertEqual([r["id"] for r in indexer.retrieve()], ["2", "0"])
+        self.assertEqual(indexer.db["0#prev"], b"2")
+
+    def test_delete_reads_are_constant(self):
+        db = CountingDict()
+        indexer = Indexer(db)
+        indexer.create_many({"status": "active", "test": i} for i in range(200))
+
+        for resource_id in ["0", "100", "100", "500"]:
+            db.gets = 0
+            indexer.delete(resource_id)
+            self.assertLess(db.gets, 30)
+
+        self.assertEqual(indexer.count([Filter("status", "active")]), 198)
+        self.assertEqual(
+            [r["id"] for r in indexer.retrieve([Filter("status", "active")], limit=3)],
+            ["199", "198", "197"],
+        )
+
+    def test_delete_without_posting_links(self):
+        expected = Indexer({})
+        indexer = Indexer({})
+
+        for target in [expected, indexer]:
+            for i in range(6):
+                target.create({"status": "active", "test": i % 2})
+            target.delete("4")
+
+        # POSTINGS WRITTEN BEFORE POSTING IDS AND PREV LINKS EXISTED
+        for key in list(indexer.db):
+            if key.endswith("#posting") or (
+                key.endswith("#prev") and key.count("#") == 3
+            ):
+                del indexer.db[key]
+
+        indexer.migrate()
+        self.assertEqual(indexer.db, expected.db)
+
+        for key in list(indexer.db):
+            if key.endswith("#posting"):
+                del indexer.db[key]
+
+        for target in [expected, indexer]:
+            target.delete("2")
+            target.delete("0")
+
+        self.assertEqual(
+            indexer.retrieve([Filter("status", "active")]),
+            expected.retrieve([Filter("status", "active")]),
+        )
+        self.assertEqual(
+            indexer.retrieve([Filter("test", 0)]),
+            expected.retrieve([Filter("test", 0)]),
+        )
@@ -0,0 +1,125 @@
+from unittest import TestCase
+from random import Random
+import operator
+
+from src.dbm_index import Indexer
+from src.dbm_index.helpers import parse_comparable_json
+from src.dbm_index.schemas import Filter, Plan
+
+
+class TestIndexerExplain(TestCase):
+    def indexer(self, **options):
+        indexer = Indexer({}, **options)
+        for i in range(100):
+            indexer.create(
+                {"status": "rare" if i % 50 == 0 else "common", "test": i % 20}
+            )
+        return indexer
+
+    def test_explain_drives_from_most_selective(self):
+        indexer = self.indexer()
+        rare = Filter("status", "rare")
+        common = Filter("status", "common", "ne")
+        test = Filter("test", 3, "ge")
+
+        self.assertEqual(
+            indexer.explain([test, common, rare]),
+            Plan(
+                source="postings",
+                index_filters=[rare],
+                check_filters=[test, common],
+                estimated_count=2,
+            ),
+        )
+
+    def test_explain_intersects_small_postings(self):
+        indexer = self.indexer()
+        rare = Filter("status", "rare")
+        test = Filter("test", 0)
+        common = Filter("status", "common")
+
+        plan = indexer.explain([common, test, rare])
+        self.assertEqual(plan.index_filters, [rare])
+        self.assertEqual(plan.check_filters, [test, common])
+
+        plan = indexer.explain([Filter("test", 19, "ge"), Filter("status", "common")])
+        self.assertEqual(plan.index_filters, [Filter("test", 19, "ge")])
+
+        packed = self.indexer(posting_format="packed", posting_block_size=64)
+        plan = packed.explain([common, test])
+        self.assertEqual(plan.index_filters, [test, common])
+        self.assertEqual(plan.check_filters, [])
+        self.assertEqual(plan.estimated_count, 5)
+
+    def test_explain_sort_index(self):
+        indexer = self.indexer()
+        bound = Filter("test", 18, "gt")
+
+        plan = indexer.explain([bound, Filter("status", "common")], sort_key="test")
+        self.assertEqual(plan.source, "sort_index")
+        self.assertEqual(plan.index_filters, [bound])
+        self.assertEqual(plan.estimated_count, 5)
+
+        plan = indexer.explain([bound, Filter("status", "rare")], sort_key="test")
+        self.assertEqual(plan.source, "postings")
+
+        self.assertEqual(
+            indexer.explain(sort_key="test"),
+            Plan("sort_index", [], [], estimated_count=100),
+        )
+        self.assertEqual(indexer.explain(), Plan("resources", [], [], 100))
+
+    def test_explain_walks_unselective_postings(self):
+        indexer = self.indexer()
+        common = Filter("status", "common")
+
+        self.assertEqual(
+            indexer.explain([common]), Plan("resources", [], [common], 100)
+        )
+        self.assertEqual(
+            indexer.explain([common], sort_key="test"),
+            Plan("sort_index", [], [common], 100),
+        )
+        self.assertEqual(indexer.explain([Filter("status", "rare")]).source, "postings")
+
+        # PACKED POSTINGS OF AN UNSORTED PAGE ARE ALREADY READ LAZILY
+        packed = self.indexer(posting_format="packed", posting_block_size=4)
+        self.assertEqual(packed.explain([common]).source, "postings")
+        self.assertEqual(packed.explain([common], "test").source, "sort_index")
+
+    def test_plans_match_scan(self):
+        random = Random(0)
+
+        for options in [{}, {"posting_format": "packed", "posting_block_size": 4}]:
+            indexer = self.indexer(**options)
+
+            for _ in range(200):
+                filters = [
+                    Filter(
+                        random.choice(["status", "test"]),
+                        random.choice(["rare", "common", 0, 5, 19.0]),
+                        random.choice(["lt", "le", "eq", "ne", "ge", "gt"]),
+                    )
+                    for _ in range(random.randint(1, 3))
+                ]
+                sort_key = random.choice([None, "test", "status"])
+
+                expected = [
+                    resource["id"]
+                    for resource in indexer.retrieve(limit=1000)
+                    if all(
+                        getattr(operator, f.operator)(
+                            parse_comparable_json(resource[f.key]),
+                            parse_comparable_json(f.value),
+                        )
+                        for f in filters
+                    )
+                ]
+                resource_ids = [
+                    resource["id"]
+                    for resource in indexer.retrieve(
+                        filters, limit=1000, sort_key=sort_key
+                    )
+                ]
+
+                self.assertEqual(sorted(resource_ids), sorted(expected))
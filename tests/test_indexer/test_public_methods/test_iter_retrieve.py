@@ -0,0 +1,121 @@
+from unittest import TestCase
+from random import Random
+
+from src.dbm_index import Indexer
+from src.dbm_index.metrics import Metrics
+from src.dbm_index.schemas import Filter
+
+
+QUERIES = [
+    {},
+    {"filters": [Filter("hello", "world")]},
+    {"sort_key": "test"},
+    {"sort_key": "test", "sort_direction": "desc"},
+    {"filters": [Filter("hello", "there")], "sort_key": "test"},
+    {
+        "filters": [Filter("test", 10, "gt"), Filter("test", 40, "le")],
+        "sort_key": "test",
+    },
+    {
+        "filters": [Filter("test", 30, "lt")],
+        "sort_key": "test",
+        "sort_direction": "desc",
+    },
+]
+
+
+class TestIndexerIterRetrieve(TestCase):
+    def indexers(self):
+        for options in [{}, {"posting_format": "packed", "posting_block_size": 4}]:
+            random = Random(0)
+            indexer = Indexer({}, **options)
+
+            for _ in range(60):
+                indexer.create(
+                    {
+                        "test": random.choice([random.randint(0, 50), 1, 1.0]),
+                        "hello": random.choice(["world", "there"]),
+                    }
+                )
+            for resource_id in ["3", "17", "42"]:
+                indexer.update(resource_id, {"test": 25})
+
+            yield indexer
+
+    def paginate(self, indexer, limit, **query):
+        page = indexer.retrieve(limit=limit, **query)
+        resources = list(page)
+
+        while page.cursor:
+            self.assertEqual(len(page), limit)
+            page = indexer.retrieve(limit=limit, cursor=page.cursor, **query)
+            resources.extend(page)
+
+        return resources
+
+    def test_iter_retrieve(self):
+        for indexer in self.indexers():
+            for query in QUERIES:
+                self.assertEqual(
+                    list(indexer.iter_retrieve(**query)),
+                    indexer.retrieve(limit=1000, **query),
+                )
+
+    def test_cursor_pages(self):
+        for indexer in self.indexers():
+            for query in QUERIES:
+                expected = indexer.retrieve(limit=1000, **query)
+
+                for limit in [1, 7]:
+                    self.assertEqual(self.paginate(indexer, limit, **query), expected)
+
+    def test_cursor_pages_over_common_postings(self):
+        for sort_key in [None, "test"]:
+            indexer = Indexer({}, metrics=Metrics())
+            indexer.create_many({"status": "active", "test": i} for i in range(2000))
+            query = {"filters": [Filter("status", "active")], "sort_key": sort_key}
+
+            page = indexer.retrieve(limit=10, **query)
+            resources = list(page)
+
+            for _ in range(20):
+                page = indexer.retrieve(limit=10, cursor=page.cursor, **query)
+                resources.extend(page)
+
+            # EACH PAGE RESUMES FROM THE CURSOR RATHER THAN READING EVERY POSTING
+            self.assertLess(indexer.metrics_snapshot()["retrieve"].gets, 21 * 150)
+            self.assertEqual(resources, indexer.retrieve(limit=210, **query))
+
+    def test_cursor_with_offset(self):
+        indexer = Indexer({})
+        for i in range(10):
+            indexer.create({"test": i})
+
+        page = indexer.retrieve(limit=2, sort_key="test")
+        self.assertEqual(
+            indexer.retrieve(limit=2, offset=2, sort_key="test", cursor=page.cursor),
+            [{"id": "4", "test": 4}, {"id": "5", "test": 5}],
+        )
+
+    def test_cursor_survives_writes(self):
+        for indexer in self.indexers():
+            for query in QUERIES:
+                expected = indexer.retrieve(limit=1000, **query)
+                page = indexer.retrieve(limit=5, **query)
+                if not page:
+                    continue
+
+                # THE LAST RESOURCE RETURNED AND ITS SORT VALUE DISAPPEAR
+                last_id = page[-1]["id"]
+                indexer.delete(last_id)
+
+                rest = list(indexer.iter_retrieve(cursor=page.cursor, **query))
+                self.assertEqual(page + rest, expected)
+
+                indexer.create(
+                    {key: value for key, value in page[-1].items() if key != "id"}
+                )
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            Indexer({}).retrieve(cursor="not a cursor")
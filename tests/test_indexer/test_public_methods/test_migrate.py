@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.helpers import custom_hash
+from src.dbm_index.schemas import Filter
+
+
+class TestIndexerMigrate(TestCase):
+    def test_migrate_prev_links(self):
+        indexer = Indexer({})
+
+        for i in range(3):
+            indexer.create({"test": i})
+
+        expected = dict(indexer.db)
+
+        for key in ["0#prev", "1#prev"]:
+            del indexer.db[key]
+
+        indexer.migrate()
+        self.assertEqual(indexer.db, expected)
+
+    def test_unmigrated_sort_index_not_read(self):
+        db = {}
+        expected = Indexer({})
+
+        for indexer in [Indexer(db), expected]:
+            indexer.create_many({"test": f"{chr(97 + i % 26)}{i}"} for i in range(40))
+
+        # A STORE WRITTEN BEFORE COUNTERS, WITH ITS SORT INDEX IN ANOTHER ORDER
+        indexer = Indexer(db)
+        key_hash = indexer._hash("test")
+        value_dumps = {db[f"{i}#{key_hash}"] for i in range(40)}
+        indexer._comparable = lambda encoded: custom_hash(encoded.decode()).encode()
+        indexer._rebuild_sort_index(key_hash, value_dumps)
+
+        for key in [key for key in db if key.endswith("count")]:
+            del db[key]
+
+        unmigrated = Indexer(db)
+        migrated = Indexer(dict(db))
+        migrated.migrate()
+
+        for filters, sort_key in [
+            ([Filter("test", "y", "gt")], None),
+            ([Filter("test", "m", "le")], "test"),
+            ([], "test"),
+        ]:
+            self.assertEqual(unmigrated.explain(filters, sort_key).source, "resources")
+            self.assertNotEqual(migrated.explain(filters, sort_key).source, "resources")
+
+            for indexer in [unmigrated, migrated]:
+                for sort_direction in ["asc", "desc"]:
+                    self.assertEqual(
+                        indexer.retrieve(
+                            filters,
+                            sort_key=sort_key,
+                            sort_direction=sort_direction,
+                            limit=100,
+                        ),
+                        expected.retrieve(
+                            filters,
+                            sort_key=sort_key,
+                            sort_direction=sort_direction,
+                            limit=100,
+                        ),
+                    )
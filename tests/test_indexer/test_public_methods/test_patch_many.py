@@ -0,0 +1,62 @@
+from random import Random
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+class TestIndexerPatchMany(TestCase):
+    def test_patch_many_matches_update(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+        ]:
+            random = Random(0)
+            resources = [
+                {"test": random.randrange(10), "hello": "world"} for _ in range(30)
+            ]
+            patches = [
+                (
+                    str(random.randrange(30)),
+                    random.choice(
+                        [
+                            {"test": random.randrange(10)},
+                            {"hello": "there", "count": random.randrange(3)},
+                            {"count": random.randrange(3)},
+                        ]
+                    ),
+                )
+                for _ in range(40)
+            ]
+
+            indexer = Indexer({}, **options)
+            indexer.create_many(resources)
+            indexer.patch_many(patches)
+
+            expected = Indexer({}, **options)
+            expected.create_many(resources)
+            for resource_id, update in patches:
+                expected.update(resource_id, update)
+
+            self.assertEqual(indexer.db, expected.db)
+
+            for filters in [
+                [Filter("count", 1)],
+                [Filter("hello", "there"), Filter("test", 5, "lt")],
+            ]:
+                self.assertEqual(
+                    indexer.retrieve(filters, limit=100),
+                    expected.retrieve(filters, limit=100),
+                )
+                self.assertEqual(indexer.count(filters), expected.count(filters))
+
+    def test_patch_many_is_atomic(self):
+        indexer = Indexer({})
+        indexer.create({"test": 1})
+        db = dict(indexer.db)
+
+        with self.assertRaises(KeyError):
+            indexer.patch_many([("0", {"test": 2}), ("1", {"test": 3})])
+
+        self.assertEqual(indexer.db, db)
@@ -0,0 +1,112 @@
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.metrics import Metrics
+from src.dbm_index.schemas import Filter
+
+
+class TestIndexerPrepare(TestCase):
+    def indexer(self, **options):
+        indexer = Indexer({}, **options)
+        indexer.create_many(
+            {"test": i % 7, "hello": f"world {i % 3}", "other": [i % 2]}
+            for i in range(60)
+        )
+        return indexer
+
+    def test_prepared_matches_retrieve(self):
+        for options in [
+            {},
+            {"posting_format": "packed", "posting_block_size": 4},
+            {"storage": "blob"},
+            {"segment_size": 8, "scan_workers": 2},
+        ]:
+            indexer = self.indexer(**options)
+
+            for filters, sort_key in [
+                ([], None),
+                ([Filter("test", 3)], None),
+                ([Filter("hello", "world 1", "ne"), {"key": "test", "value": 2}], None),
+                ([Filter("test", 2, "ge"), Filter("other", [1])], "test"),
+                ([Filter("hello", "world 2", "lt")], "hello"),
+                ([Filter("missing", None), Filter("test", 5, "ne")], None),
+            ]:
+                query = indexer.prepare(filters, keys=["test"], sort_key=sort_key)
+                self.assertEqual(query.explain(), indexer.explain(filters, sort_key))
+
+                for offset, limit in [(0, 10), (3, 5), (0, 100)]:
+                    self.assertEqual(
+                        query.retrieve(offset=offset, limit=limit),
+                        indexer.retrieve(
+                            filters,
+                            keys=["test"],
+                            offset=offset,
+                            limit=limit,
+                            sort_key=sort_key,
+                        ),
+                    )
+
+                self.assertEqual(query.count(), indexer.count(filters))
+                self.assertEqual(
+                    list(query.iter_retrieve()),
+                    list(indexer.iter_retrieve(filters, ["test"], sort_key)),
+                )
+
+    def test_prepared_count_with_sort_key(self):
+        for options in [{}, {"storage": "blob"}]:
+            indexer = Indexer({}, **options)
+            indexer.create_many(
+                [{"a": 1, "b": 2}, {"a": 1, "c": 3}, {"a": 1, "b": 1, "c": 3}]
+            )
+
+            for filters in [
+                [],
+                [Filter("a", 1)],
+                [Filter("a", 1), Filter("c", 3, "ne")],
+                [Filter("a", 1), Filter("a", 0, "gt")],
+            ]:
+                query = indexer.prepare(filters, sort_key="b")
+                self.assertEqual(query.count(), len(list(query.iter_retrieve())))
+                self.assertEqual(
+                    query.count(), len(indexer.retrieve(filters, sort_key="b"))
+                )
+
+    def test_prepared_cursor(self):
+        indexer = self.indexer()
+        query = indexer.prepare(
+            [Filter("hello", "world 0", "ne")], sort_key="test", sort_direction="desc"
+        )
+
+        resources = []
+        page = query.retrieve(limit=7)
+        while True:
+            resources.extend(page)
+            if page.cursor is None:
+                break
+            page = query.retrieve(limit=7, cursor=page.cursor)
+
+        self.assertEqual(resources, query.retrieve(limit=100))
+        self.assertEqual(len(resources), 40)
+
+    def test_prepared_plan_is_reused(self):
+        indexer = self.indexer(metrics=Metrics())
+        query = indexer.prepare([Filter("test", 3), Filter("hello", "world 1")])
+
+        indexer.metrics.reset()
+        query.retrieve()
+        prepared = indexer.metrics_snapshot()["retrieve"]
+
+        indexer.metrics.reset()
+        indexer.retrieve([Filter("test", 3), Filter("hello", "world 1")])
+        adhoc = indexer.metrics_snapshot()["retrieve"]
+
+        # THE COUNTERS ARE READ TO PLAN ONLY WHEN THE QUERY IS PREPARED
+        self.assertLess(prepared.gets, adhoc.gets)
+
+    def test_prepared_sees_new_resources(self):
+        indexer = self.indexer()
+        query = indexer.prepare([Filter("test", 100)])
+        self.assertEqual(query.retrieve(), [])
+
+        resource_id = indexer.create({"test": 100})
+        self.assertEqual(query.retrieve(), [{"id": resource_id, "test": 100}])
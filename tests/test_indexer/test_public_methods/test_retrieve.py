@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 from src.dbm_index import Indexer
+from src.dbm_index.metrics import Metrics
 from src.dbm_index.schemas import Filter
 
 
@@ -85,3 +86,137 @@ class TestIndexerRetrieve(TestCase):
         response = indexer.retrieve(filters=filters)
 
         self.assertEqual(response, [{"id": "2", "test": 3}, {"id": "1", "test": 2}])
+
+    def test_retrieve_eq_filter(self):
+        indexer = Indexer({})
+
+        indexer.create({"test": 1, "hello": "world"})
+        indexer.create({"test": 2, "hello": "there"})
+        indexer.create({"test": 3, "hello": "world"})
+
+        response = indexer.retrieve(filters=[Filter("hello", "world")])
+
+        self.assertEqual(
+            response,
+            [
+                {"id": "2", "test": 3, "hello": "world"},
+                {"id": "0", "test": 1, "hello": "world"},
+            ],
+        )
+
+    def test_retrieve_eq_filter_sort(self):
+        indexer = Indexer({})
+
+        indexer.create({"test": 3, "hello": "world"})
+        indexer.create({"test": 1, "hello": "world"})
+        indexer.create({"test": 2, "hello": "there"})
+        indexer.create({"test": 2, "hello": "world"})
+
+        response = indexer.retrieve(
+            filters=[Filter("hello", "world")], sort_key="test", sort_direction="desc"
+        )
+
+        self.assertEqual([r["id"] for r in response], ["0", "3", "1"])
+
+    def test_retrieve_eq_filter_common_value_reads(self):
+        for options in [{}, {"posting_format": "packed"}]:
+            for sort_key in [None, "test"]:
+                indexer = Indexer({}, metrics=Metrics(), **options)
+                indexer.create_many(
+                    {"status": "active", "test": -i} for i in range(2000)
+                )
+
+                # A PAGE OF A VALUE MOST RESOURCES HOLD STOPS WALKING ONCE FULL
+                response = indexer.retrieve(
+                    [Filter("status", "active")], sort_key=sort_key, limit=10
+                )
+                self.assertEqual(
+                    [r["id"] for r in response],
+                    [str(i) for i in range(1999, 1989, -1)],
+                )
+                self.assertLess(indexer.metrics_snapshot()["retrieve"].gets, 200)
+
+    def test_retrieve_eq_filter_numeric_equivalents(self):
+        indexer = Indexer({})
+
+        indexer.create({"test": 1})
+        indexer.create({"test": 1.0})
+        indexer.create({"test": True})
+        indexer.create({"test": 2})
+
+        response = indexer.retrieve(filters=[Filter("test", 1)])
+
+        self.assertEqual([r["id"] for r in response], ["1", "0"])
+
+    def test_retrieve_eq_filter_missing_key(self):
+        indexer = Indexer({})
+
+        indexer.create({"test": 0})
+        indexer.create({"hello": "world"})
+
+        response = indexer.retrieve(filters=[Filter("test", None)])
+
+        self.assertEqual([r["id"] for r in response], ["1"])
+
+    def test_retrieve_range_filters(self):
+        indexer = Indexer({})
+
+        for value in [-2, 5, -1, 0, 3]:
+            indexer.create({"test": value})
+        indexer.create({"hello": "world"})
+
+        def ids(filters):
+            return [r["id"] for r in indexer.retrieve(filters=filters)]
+
+        self.assertEqual(ids([Filter("test", 0, "gt")]), ["4", "1"])
+        self.assertEqual(ids([Filter("test", 3, "ge")]), ["4", "1"])
+        self.assertEqual(ids([Filter("test", 0, "lt")]), ["5", "2", "0"])
+        self.assertEqual(ids([Filter("test", -1, "le")]), ["5", "2", "0"])
+        self.assertEqual(ids([Filter("test", 0, "le")]), ["5", "3", "2", "0"])
+        self.assertEqual(
+            ids([Filter("test", -2, "gt"), Filter("test", 5, "lt")]), ["4", "3", "2"]
+        )
+
+    def test_retrieve_sorted_same_key_ranges(self):
+        for options in [{}, {"posting_format": "packed", "posting_block_size": 2}]:
+            indexer = Indexer({}, **options)
+            for value in [3, 0, 6, 1, 4, 7, 2, 5]:
+                indexer.create({"test": value})
+
+            def values(filters, sort_direction):
+                return [
+                    r["test"]
+                    for r in indexer.retrieve(
+                        filters,
+                        sort_key="test",
+                        sort_direction=sort_direction,
+                        limit=100,
+                    )
+                ]
+
+            for filters, sort_direction, expected in [
+                (
+                    [Filter("test", -1, "gt"), Filter("test", 3, "gt")],
+                    "asc",
+                    [4, 5, 6, 7],
+                ),
+                (
+                    [Filter("test", 3, "ge"), Filter("test", 3, "gt")],
+                    "asc",
+                    [4, 5, 6, 7],
+                ),
+                ([Filter("test", 3, "gt"), Filter("test", 5, "ge")], "asc", [5, 6, 7]),
+                (
+                    [Filter("test", 8, "lt"), Filter("test", 4, "lt")],
+                    "desc",
+                    [3, 2, 1, 0],
+                ),
+                (
+                    [Filter("test", 4, "le"), Filter("test", 4, "lt")],
+                    "desc",
+                    [3, 2, 1, 0],
+                ),
+                ([Filter("test", 5, "lt"), Filter("test", 2, "le")], "desc", [2, 1, 0]),
+            ]:
+                self.assertEqual(indexer.explain(filters, "test").source, "sort_index")
+                self.assertEqual(values(filters, sort_direction), expected)
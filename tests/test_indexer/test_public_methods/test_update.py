@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 from src.dbm_index import Indexer
+from src.dbm_index.metrics import Metrics
 
 
 class TestIndexerUpdate(TestCase):
@@ -29,3 +30,59 @@ class TestIndexerUpdate(TestCase):
         assert resource["hello"] == "world"
         assert resource["test"] == 123
         assert resource["test1"] is None
+
+    def test_update_unchanged_writes_nothing(self):
+        for options in [{}, {"storage": "blob"}]:
+            indexer = Indexer({}, metrics=Metrics(), **options)
+            resource_id = indexer.create({"hello": "world", "test": 123})
+            db = dict(indexer.db)
+
+            indexer.update(resource_id, {"test": 123, "hello": "world"})
+            stats = indexer.metrics_snapshot()["update"]
+
+            self.assertEqual(indexer.db, db)
+            self.assertEqual(stats.sets + stats.deletes, 0)
+
+    def test_update_reads_only_updated_keys(self):
+        indexer = Indexer({}, metrics=Metrics())
+        resource_id = indexer.create({f"key{i}": i for i in range(50)})
+
+        indexer.update(resource_id, {"key0": -1})
+        stats = indexer.metrics_snapshot()["update"]
+
+        self.assertLess(stats.gets, 20)
+        self.assertEqual(indexer.retrieve_one(resource_id, keys=["key0"])["key0"], -1)
+
+    def test_update_matches_create(self):
+        for options in [{}, {"storage": "blob"}]:
+            indexer = Indexer({}, **options)
+            indexer.create({"hello": "world", "test": 1})
+            indexer.update("0", {"test": 2, "other": [1], "hello": "world"})
+
+            expected = Indexer({}, **options)
+            expected.create({"hello": "world", "test": 2, "other": [1]})
+
+            self.assertEqual(indexer.retrieve_one("0"), expected.retrieve_one("0"))
+            self.assertEqual(
+                {key for key in indexer.db if not key.startswith("0#")},
+                {key for key in expected.db if not key.startswith("0#")},
+            )
+
+    def test_update_missing_resource(self):
+        for options in [{}, {"storage": "blob"}]:
+            indexer = Indexer({}, **options)
+            db = dict(indexer.db)
+
+            with self.assertRaises(KeyError):
+                indexer.update("0", {"test": 1})
+
+            self.assertEqual(indexer.db, db)
+
+            indexer.create({"test": 0})
+            indexer.delete("0")
+            db = dict(indexer.db)
+
+            with self.assertRaises(KeyError):
+                indexer.update("0", {"test": 1})
+
+            self.assertEqual(indexer.db, db)
@@ -0,0 +1,93 @@
+from random import Random
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+
+
+def segment_markers(indexer):
+    markers = {}
+    for resource in indexer.retrieve(keys=["test"], limit=1000):
+        markers.setdefault(
+            f"segment#{int(resource['id']) // indexer.segment_size}",
+            resource["id"].encode(),
+        )
+    return markers
+
+
+class TestSegments(TestCase):
+    def test_markers_follow_list(self):
+        random = Random(0)
+        indexer = Indexer({}, segment_size=4)
+        resource_ids = indexer.create_many({"test": i} for i in range(30))
+
+        for resource_id in random.sample(resource_ids, 20):
+            indexer.delete(resource_id)
+            self.assertEqual(
+                {key: value for key, value in indexer.db.items() if "segment" in key},
+                segment_markers(indexer),
+            )
+
+        indexer.create({"test": 30})
+        self.assertEqual(indexer.db["segment#7"], b"30")
+
+    def test_parallel_scan_matches_serial(self):
+        for options in [{}, {"storage": "blob"}]:
+            db = {}
+            serial = Indexer(db, segment_size=8, **options)
+            for i in range(100):
+                serial.create({"test": i % 7, "hello": str(i % 3)})
+            for i in range(0, 100, 5):
+                serial.delete(str(i))
+
+            parallel = Indexer(db, scan_workers=3, **options)
+
+            for filters in [
+                [Filter("test", 3, "ne")],
+                [Filter("test", 3, "ne"), Filter("hello", "1", "ne")],
+                [Filter("missing", None)],
+            ]:
+                self.assertEqual(parallel.explain(filters).source, "resources")
+                self.assertEqual(
+                    parallel.retrieve(filters, limit=100),
+                    serial.retrieve(filters, limit=100),
+                )
+                self.assertEqual(
+                    parallel.retrieve(filters, offset=7, limit=13),
+                    serial.retrieve(filters, offset=7, limit=13),
+                )
+                self.assertEqual(parallel.count(filters), serial.count(filters))
+
+    def test_parallel_scan_cursor(self):
+        indexer = Indexer({}, segment_size=4, scan_workers=2)
+        indexer.create_many({"test": i % 3} for i in range(40))
+
+        filters = [Filter("test", 1, "ne")]
+        expected = indexer.retrieve(filters, limit=100)
+        resources = []
+        cursor = None
+
+        while True:
+            page = indexer.retrieve(filters, limit=5, cursor=cursor)
+            resources.extend(page)
+            if page.cursor is None:
+                break
+            cursor = page.cursor
+
+        self.assertEqual(resources, expected)
+
+    def test_migrate_adds_markers(self):
+        indexer = Indexer({}, segment_size=4)
+        indexer.create_many({"test": i} for i in range(10))
+        expected = dict(indexer.db)
+
+        for key in ["segment#0", "segment#1", "segment#2"]:
+            del indexer.db[key]
+
+        indexer = Indexer(indexer.db, scan_workers=2)
+        self.assertFalse(indexer._segmented)
+        self.assertEqual(len(indexer.retrieve([Filter("test", 3, "ne")])), 9)
+
+        indexer.migrate()
+        self.assertTrue(indexer._segmented)
+        self.assertEqual(indexer.db, expected)
@@ -0,0 +1,127 @@
+from unittest import TestCase
+from random import Random
+
+import operator
+
+from src.dbm_index import Indexer
+from src.dbm_index.schemas import Filter
+from src.dbm_index.helpers import custom_hash
+
+
+class CountingDict(dict):
+    gets = 0
+
+    def get(self, *args):
+        self.gets += 1
+        return super().get(*args)
+
+
+class TestIndexerSortIndex(TestCase):
+    def assert_sorted_levels(self, indexer, key):
+        key_hash = custom_hash(key)
+        level_0 = []
+
+        for level in range(8):
+            values = []
+            value_encoded = indexer.db.get(indexer._sort_head_key(key_hash, level))
+
+            while value_encoded:
+                values.append(int(value_encoded))
+                value_encoded = indexer.db.get(
+                    indexer._sort_link_key(
+                        key_hash, custom_hash(value_encoded.decode()), "next", level
+                    )
+                )
+
+            self.assertEqual(values, sorted(values, reverse=True))
+            if level == 0:
+                level_0 = values
+            else:
+                self.assertTrue(set(values) <= set(level_0))
+
+        return level_0
+
+    def test_insert_and_delete(self):
+        random = Random(0)
+        indexer = Indexer({})
+        values = random.sample(range(10000), 500)
+
+        for value in values:
+            indexer.create({"test": value})
+
+        self.assertEqual(
+            self.assert_sorted_levels(indexer, "test"), sorted(values, reverse=True)
+        )
+
+        for resource_id in random.sample(range(500), 250):
+            indexer.delete(str(resource_id))
+            values[resource_id] = None
+
+        remaining = sorted([v for v in values if v is not None], reverse=True)
+        self.assertEqual(self.assert_sorted_levels(indexer, "test"), remaining)
+
+        for resource_id, value in enumerate(values):
+            if value is not None:
+                indexer.delete(str(resource_id))
+
+        self.assertEqual(len(indexer.db), 0)
+
+    def test_insert_cost(self):
+        indexer = Indexer(CountingDict())
+
+        for value in range(0, 4000, 2):
+            indexer.create({"test": value})
+
+        indexer.db.gets = 0
+        indexer._create_sort_index(
+            custom_hash("test"), custom_hash("2001"), b"2001", 2001
+        )
+        self.assertLess(indexer.db.gets, 100)
+
+    def test_retrieve_sorted_range(self):
+        random = Random(1)
+        indexer = Indexer({})
+        values = [random.randint(0, 50) for _ in range(200)]
+
+        for value in values:
+            indexer.create({"test": value})
+
+        for sort_direction in ["asc", "desc"]:
+            for filters in [
+                [Filter("test", 20, "gt")],
+                [Filter("test", 20, "ge"), Filter("test", 30, "lt")],
+                [Filter("test", 30, "le"), Filter("test", 10, "gt")],
+            ]:
+                response = indexer.retrieve(
+                    filters=filters,
+                    sort_key="test",
+                    sort_direction=sort_direction,
+                    limit=500,
+                )
+                expected = [
+                    value
+                    for value in sorted(values, reverse=sort_direction == "desc")
+                    if all(
+                        getattr(operator, f.operator)(value, f.value) for f in filters
+                    )
+                ]
+                self.assertEqual([r["test"] for r in response], expected)
+
+    def test_migrate_builds_towers(self):
+        indexer = Indexer({})
+
+        for value in range(100):
+            indexer.create({"test": value})
+
+        expected = dict(indexer.db)
+
+        for key in list(indexer.db):
+            parts = key.split("#")
+            if parts[-1] == "height" or (
+                len(parts) >= 3 and parts[-2] in ["head", "next", "prev"]
+            ):
+                del indexer.db[key]
+
+        self.assertNotEqual(indexer.db, expected)
+        indexer.migrate()
+        self.assertEqual(indexer.db, expected)
@@ -0,0 +1,85 @@
+from unittest import TestCase, skipUnless
+from json import loads
+
+from src.dbm_index import Indexer
+from src.dbm_index.helpers import HASH_FUNCTIONS
+from src.dbm_index.schemas import Filter
+
+
+class TestIndexerStoreFormat(TestCase):
+    def test_default_format_not_written(self):
+        indexer = Indexer({})
+        indexer.create({"hello": "world"})
+        self.assertNotIn("format", indexer.db)
+
+    def test_format_persisted(self):
+        db = {}
+        indexer = Indexer(db, hash_function="blake2b", posting_format="packed")
+        indexer.create({"hello": "world"})
+
+        self.assertEqual(
+            loads(db["format"]),
+            {
+                "version": 1,
+                "posting_format": "packed",
+                "hash_function": "blake2b",
+                "storage": "keys",
+                "segment_size": 1024,
+            },
+        )
+
+        reopened = Indexer(db)
+        self.assertEqual(reopened.hash_function, "blake2b")
+        self.assertEqual(reopened.posting_format, "packed")
+        self.assertEqual(
+            reopened.retrieve(filters=[Filter("hello", "world")]),
+            [{"id": "0", "hello": "world"}],
+        )
+
+    def test_format_mismatch(self):
+        db = {}
+        Indexer(db, hash_function="blake2b")
+
+        with self.assertRaises(ValueError):
+            Indexer(db, hash_function="sha256")
+
+    def test_format_mismatch_legacy_store(self):
+        db = {}
+        Indexer(db).create({"hello": "world"})
+
+        with self.assertRaises(ValueError):
+            Indexer(db, posting_format="packed")
+
+    def test_unknown_hash_function(self):
+        with self.assertRaises(ValueError):
+            Indexer({}, hash_function="md5")
+
+    def test_invalid_options_not_written(self):
+        invalid_options = [
+            {"storage": "bogus"},
+            {"hash_function": "md5"},
+            {"posting_format": "bogus"},
+            {"segment_size": 0},
+        ]
+        if not HASH_FUNCTIONS["xxh3"]:
+            invalid_options.append({"hash_function": "xxh3"})
+
+        for options in invalid_options:
+            db = {}
+
+            with self.assertRaises(ValueError):
+                Indexer(db, **options)
+
+            self.assertEqual(db, {})
+            Indexer(db, storage="blob").create({"hello": "world"})
+
+    @skipUnless(HASH_FUNCTIONS["xxh3"], "xxhash is not installed")
+    def test_xxh3(self):
+        indexer = Indexer({}, hash_function="xxh3")
+        indexer.create({"hello": "world", "test": 1})
+        indexer.create({"hello": "there", "test": 2})
+
+        self.assertEqual(
+            indexer.retrieve(filters=[Filter("test", 1, "gt")], sort_key="hello"),
+            [{"id": "1", "hello": "there", "test": 2}],
+        )
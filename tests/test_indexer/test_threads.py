@@ -0,0 +1,213 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread
+from unittest import TestCase
+
+from src.dbm_index import Indexer
+from src.dbm_index.cache import CachedStore
+from src.dbm_index.locks import SharedLock
+from src.dbm_index.schemas import Filter
+
+
+OPTIONS = [
+    {},
+    {"posting_format": "packed", "posting_block_size": 4},
+    {"storage": "blob"},
+    {"cache_size": 64},
+]
+
+
+def resource(i):
+    return {"test": i % 5, "hello": str(i % 3), "other": [i % 2]}
+
+
+class TestThreads(TestCase):
+    def test_concurrent_writes(self):
+        for options in OPTIONS:
+            indexer = Indexer({}, lock_stripes=4, **options)
+
+            with ThreadPoolExecutor(8) as executor:
+                resource_ids = list(
+                    executor.map(indexer.create, map(resource, range(60)))
+                )
+                list(
+                    executor.map(
+                        lambda i: indexer.update(resource_ids[i], {"test": 7}),
+                        range(0, 60, 4),
+                    )
+                )
+                list(executor.map(indexer.delete, resource_ids[::3]))
+
+            # THREADS MAY TAKE IDS IN ANY ORDER, SO THE SAME WRITES ARE
+            # REPLAYED IN ID ORDER
+            self.assertEqual(sorted(map(int, resource_ids)), list(range(60)))
+            expected = Indexer({}, **options)
+            for _, i in sorted((int(resource_ids[i]), i) for i in range(60)):
+                expected.create(resource(i))
+            for i in range(0, 60, 4):
+                expected.update(resource_ids[i], {"test": 7})
+            for resource_id in resource_ids[::3]:
+                expected.delete(resource_id)
+
+            self.assertEqual(indexer.count(), expected.count())
+            self.assertEqual(indexer.retrieve(limit=100), expected.retrieve(limit=100))
+
+            # POSTINGS ARE CHAINED IN THE ORDER THREADS WROTE THEM
+            for filters, sort_key in [
+                ([Filter("test", 7)], None),
+                ([Filter("hello", "1"), Filter("test", 2, "ge")], "test"),
+                ([], "hello"),
+            ]:
+                self.assertCountEqual(
+                    indexer.retrieve(filters, limit=100, sort_key=sort_key),
+                    expected.retrieve(filters, limit=100, sort_key=sort_key),
+                )
+                self.assertEqual(
+                    indexer.count(filters),
+                    expected.count(filters),
+                )
+
+    def test_concurrent_create_many(self):
+        indexer = Indexer({})
+
+        with ThreadPoolExecutor(4) as executor:
+            chunks = list(
+                executor.map(
+                    indexer.create_many,
+                    [[resource(i) for i in range(n, n + 10)] for n in range(0, 40, 10)],
+                )
+            )
+
+        resource_ids = [resource_id for chunk in chunks for resource_id in chunk]
+        self.assertEqual(sorted(map(int, resource_ids)), list(range(40)))
+        self.assertEqual(
+            [r["id"] for r in indexer.retrieve(limit=100)],
+            [str(i) for i in range(39, -1, -1)],
+        )
+        self.assertEqual(indexer.count([Filter("test", 0)]), 8)
+
+    def test_readers_during_writes(self):
+        indexer = Indexer({})
+        for i in range(20):
+            indexer.create(resource(i))
+
+        done = Event()
+        errors = []
+
+        def read():
+            while not done.is_set():
+                try:
+                    for page in [
+                        indexer.retrieve([Filter("test", 1)], limit=100),
+                        indexer.retrieve(limit=100, sort_key="test"),
+                    ]:
+                        # A RESOURCE DELETED WHILE IT IS READ MAY LOSE ITS KEYS
+                        for r in page:
+                            self.assertIn(r.get("test"), [None, *range(5)])
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [Thread(target=read) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(indexer.create, map(resource, range(20, 60))))
+            list(executor.map(indexer.delete, map(str, range(0, 60, 2))))
+
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(indexer.count(), 30)
+
+    def test_link_out_of_order(self):
+        indexer = Indexer({})
+        first, second = indexer._resource_ids(1) + indexer._resource_ids(1)
+
+        indexer._link_resource_ids([second])
+        indexer._link_resource_ids([first])
+
+        self.assertEqual(indexer.db["head"], b"1")
+        self.assertEqual(indexer.db["1#next"], b"0")
+        self.assertEqual(indexer.db["0#prev"], b"1")
+        self.assertEqual(indexer.db["count"], b"2")
+
+    def test_batch_runs_alone(self):
+        indexer = Indexer({})
+        entered = Event()
+        created = []
+
+        def create():
+            entered.wait()
+            created.append(indexer.create({"test": 1}))
+
+        thread = Thread(target=create)
+        thread.start()
+
+        with indexer.batch():
+            entered.set()
+            indexer.create({"test": 0})
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+
+        thread.join()
+        self.assertEqual(created, ["1"])
+
+
+class TestSharedLock(TestCase):
+    def test_shared_and_exclusive(self):
+        lock = SharedLock()
+        order = []
+
+        with lock.shared():
+
+            def exclusive():
+                with lock.exclusive():
+                    order.append("exclusive")
+
+            thread = Thread(target=exclusive)
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            order.append("shared")
+
+        thread.join()
+        self.assertEqual(order, ["shared", "exclusive"])
+
+    def test_reentrant_exclusive(self):
+        lock = SharedLock()
+
+        with lock.exclusive():
+            with lock.shared():
+                with lock.exclusive():
+                    self.assertEqual(lock.depth, 2)
+
+        self.assertIsNone(lock.owner)
+        self.assertEqual(lock.shared_count, 0)
+
+
+class TestCachedStoreThreads(TestCase):
+    def test_stale_read_is_not_cached(self):
+        class SlowDict(dict):
+            def get(self, key, default=None):
+                value = super().get(key, default)
+                if key == "a" and not written.is_set():
+                    reading.set()
+                    written.wait()
+                return value
+
+        reading = Event()
+        written = Event()
+        cached = CachedStore(SlowDict(a=b"1"))
+
+        thread = Thread(target=cached.get, args=["a"])
+        thread.start()
+        reading.wait()
+
+        cached["a"] = b"2"
+        written.set()
+        thread.join()
+
+        self.assertEqual(cached.get("a"), b"2")